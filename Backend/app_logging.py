@@ -0,0 +1,155 @@
+"""
+Structured, leveled logging for the MADE backend.
+
+Every module logs through `get_logger(name)` (a child of the "made" logger).
+Structured fields go in `extra=fields(...)`. Records are handed to a
+QueueHandler, and a background QueueListener thread does the formatting and
+console I/O, so a log call on a request path is just a queue put.
+
+The hot paths (confidence, reconstruction, priority, per-request detail) log
+at DEBUG, which is off by default. Turning it on brings the old detail back.
+A sampling filter can then thin DEBUG records so batch scoring doesn't
+flood the console.
+
+Environment:
+    LOG_LEVEL              default level (INFO)
+    LOG_LEVELS             per-logger overrides, e.g. "memory=DEBUG,jobs=WARNING"
+    LOG_FORMAT             "text" (default) or "json"
+    LOG_DEBUG_SAMPLE_RATE  fraction of DEBUG records kept (1.0)
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime
+
+ROOT = "made"
+
+_listener = None
+_overrides = set()
+
+
+def fields(**values):
+    return {"fields": values}
+
+
+def get_logger(name):
+    return logging.getLogger(f"{ROOT}.{name}")
+
+
+class StructuredFormatter(logging.Formatter):
+
+    def __init__(self, json_format=False):
+        super().__init__()
+        self.json_format = json_format
+
+    def format(self, record):
+        extra = getattr(record, "fields", None) or {}
+        timestamp = datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds")
+        name = record.name[len(ROOT) + 1:] if record.name.startswith(ROOT + ".") else record.name
+        if self.json_format:
+            payload = {"ts": timestamp, "level": record.levelname, "logger": name, "msg": record.getMessage(), **extra}
+            if record.exc_text:
+                payload["exc"] = record.exc_text
+            return json.dumps(payload, default=str)
+
+        line = f"{timestamp} {record.levelname:<7} {name}: {record.getMessage()}"
+        if extra:
+            line += " " + " ".join(f"{key}={value}" for key, value in extra.items())
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps every record at or above `level` and a `rate` fraction of the rest."""
+
+    def __init__(self, rate=1.0, level=logging.INFO, rng=random.random):
+        super().__init__()
+        self.rate = rate
+        self.level = level
+        self.rng = rng
+        self.dropped = 0
+
+    def filter(self, record):
+        if record.levelno >= self.level or self.rate >= 1.0 or self.rng() < self.rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+
+    def prepare(self, record):
+        # Resolve the message and traceback here (exc_info can't cross the
+        # queue), but leave formatting to the listener's StructuredFormatter
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level=None, json_format=None, sample_rate=None, levels=None, stream=None):
+    global _listener
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    if json_format is None:
+        json_format = os.getenv("LOG_FORMAT", "text").lower() == "json"
+    if sample_rate is None:
+        sample_rate = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+    if levels is None:
+        levels = _parse_levels(os.getenv("LOG_LEVELS"))
+
+    shutdown_logging()
+
+    root = logging.getLogger(ROOT)
+    root.setLevel(level)
+    root.propagate = False
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    records = queue.SimpleQueue()
+    queue_handler = _QueueHandler(records)
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+    root.addHandler(queue_handler)
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(StructuredFormatter(json_format))
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+
+    for name in _overrides - set(levels):
+        get_logger(name).setLevel(logging.NOTSET)
+    for name, name_level in levels.items():
+        get_logger(name).setLevel(name_level)
+    _overrides.clear()
+    _overrides.update(levels)
+    return root
+
+
+def shutdown_logging():
+    # Flushes everything still queued
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
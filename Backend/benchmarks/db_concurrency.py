@@ -0,0 +1,97 @@
+"""
+Request concurrency benchmark for the async data layer.
+
+Fires batches of concurrent `get_ocean_scores` requests at increasing
+concurrency and reports throughput. Runs against the in-memory stand-in with
+an injected round-trip latency by default, or against a real mongod when
+BENCH_MONGO_URL is set.
+
+For comparison, `--blocking` swaps the collection for one that sleeps
+synchronously on every query, which is what the old pymongo calls did to the
+event loop.
+
+Usage (from Backend/):
+    python -m benchmarks.db_concurrency
+    python -m benchmarks.db_concurrency --latency-ms 5 --blocking
+    BENCH_MONGO_URL=mongodb://localhost:27017 python -m benchmarks.db_concurrency
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+from datetime import datetime, timezone
+
+LEVELS = [1, 10, 50, 200]
+
+
+class BlockingCollection:
+
+    def __init__(self, collection, latency):
+        self._collection = collection
+        self._latency = latency
+
+    async def find_one(self, *args, **kwargs):
+        time.sleep(self._latency)
+        return await self._collection.find_one(*args, **kwargs)
+
+
+async def run_level(main, report_ids, concurrency, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(
+            main.get_ocean_scores(report_ids[i % len(report_ids)])
+            for i in range(concurrency)
+        ))
+    elapsed = time.perf_counter() - started
+    return (concurrency * rounds) / elapsed, elapsed
+
+
+async def seed(main, count):
+    report_ids = [f"bench-{i}" for i in range(count)]
+    await main.ocean_collection.delete_many({"report_id": {"$in": report_ids}})
+    normalized = {trait: 0.5 for trait in
+                  ("openness", "conscientiousness", "extraversion", "agreeableness", "neuroticism")}
+    await main.ocean_collection.insert_many([
+        {
+            "report_id": report_id,
+            "p_factor": 1.0,
+            "ocean_scores": normalized,
+            "ocean_normalized": normalized,
+            "saved_at": datetime(2026, 1, 1, tzinfo=timezone.utc),
+        }
+        for report_id in report_ids
+    ])
+    return report_ids
+
+
+async def main_async(args):
+    url = os.getenv("BENCH_MONGO_URL") or f"memory://?latency_ms={args.latency_ms}"
+    os.environ["MONGO_URL"] = url
+
+    import main
+
+    collection = main.ocean_collection
+    report_ids = await seed(main, 100)
+    if args.blocking:
+        main.ocean_collection = BlockingCollection(main.ocean_collection, args.latency_ms / 1000.0)
+
+    mode = "blocking" if args.blocking else "async"
+    print(f"\nBackend: {url} | mode: {mode}")
+    print(f"{'concurrency':>12} {'req/s':>10} {'elapsed (s)':>12}")
+    for level in LEVELS:
+        with contextlib.redirect_stdout(io.StringIO()):
+            throughput, elapsed = await run_level(main, report_ids, level, args.rounds)
+        print(f"{level:>12} {throughput:>10.1f} {elapsed:>12.3f}")
+
+    await collection.delete_many({"report_id": {"$in": report_ids}})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MADE async data layer concurrency benchmark")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--blocking", action="store_true")
+    asyncio.run(main_async(parser.parse_args()))
@@ -0,0 +1,103 @@
+"""
+Hot-query latency before and after index bootstrap.
+
+Seed a large population first (see seed_data.py), e.g.
+    python seed_data.py --count 1000000 --tasks-per-npc 1
+
+then, from Backend/:
+    BENCH_MONGO_URL=mongodb://localhost:27017 python -m benchmarks.index_load --fresh
+
+--fresh drops the declared indexes first so the "before" numbers are
+collection scans. Without a mongod the in-memory stand-in is used and a small
+population is seeded in-process (--seed), which only exercises the harness.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from database import get_client
+from indexes import INDEXES, ensure_indexes, hot_queries, verify_query_plans
+from timeutil import utcnow
+
+
+async def seed(db, count):
+    from seed_data import make_npc_document, make_task_document
+
+    rng = random.Random(42)
+    now = utcnow()
+    for offset in range(0, count, 10000):
+        npcs = [make_npc_document(i, rng, now) for i in range(offset, min(count, offset + 10000))]
+        await db["ocean_scores"].insert_many(npcs, ordered=False)
+        await db["tasks"].insert_many([make_task_document(n["report_id"], rng, now) for n in npcs], ordered=False)
+
+
+async def drop_declared_indexes(db):
+    for collection, models in INDEXES.items():
+        existing = await db[collection].index_information()
+        for model in models:
+            name = model.document["name"]
+            if name in existing:
+                await db[collection].drop_index(name)
+
+
+async def sample_report_ids(db, count):
+    docs = await db["ocean_scores"].find({}, {"report_id": 1}, limit=count * 10).to_list(length=None)
+    rng = random.Random(7)
+    return [rng.choice(docs)["report_id"] for _ in range(count)] if docs else ["missing"] * count
+
+
+async def time_queries(db, report_ids):
+    timings = {}
+    for report_id in report_ids:
+        for collection, description, query, sort in hot_queries(report_id):
+            started = time.perf_counter()
+            await db[collection].find(query, sort=sort, limit=20).to_list(length=None)
+            timings.setdefault(description, []).append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def summarize(timings):
+    return {
+        name: (statistics.median(values), sorted(values)[int(len(values) * 0.95) - 1] if len(values) > 1 else values[0])
+        for name, values in timings.items()
+    }
+
+
+async def main_async(args):
+    url = os.getenv("BENCH_MONGO_URL", "memory://")
+    db = get_client(url)["bigfive"]
+
+    if args.seed:
+        print(f"🌱 Seeding {args.seed} NPCs...")
+        await seed(db, args.seed)
+    if args.fresh:
+        await drop_declared_indexes(db)
+
+    report_ids = await sample_report_ids(db, args.samples)
+    before = summarize(await time_queries(db, report_ids))
+    await ensure_indexes(db)
+    after = summarize(await time_queries(db, report_ids))
+
+    print(f"\nBackend: {url} | documents: {await db['ocean_scores'].count_documents({})}")
+    print(f"{'query':34} {'before p50/p95 (ms)':>22} {'after p50/p95 (ms)':>22}")
+    for name in before:
+        b50, b95 = before[name]
+        a50, a95 = after[name]
+        print(f"{name:34} {b50:>10.2f} /{b95:>9.2f} {a50:>10.2f} /{a95:>9.2f}")
+
+    print("\nQuery plans after bootstrap:")
+    for entry in await verify_query_plans(db, report_ids[0]):
+        status = "IXSCAN" if entry["uses_index"] else "COLLSCAN"
+        print(f"  {status:9} {entry['collection']:14} {entry['query']:32} {', '.join(entry['indexes'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MADE index bootstrap load benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="Seed N synthetic NPCs before measuring")
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--fresh", action="store_true", help="Drop declared indexes before the 'before' run")
+    asyncio.run(main_async(parser.parse_args()))
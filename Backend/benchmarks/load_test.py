@@ -0,0 +1,386 @@
+"""
+Mixed-workload load test for the MADE API.
+
+Drives the FastAPI app in-process through its ASGI interface (no server, no
+network), against the in-memory Mongo stand-in or a real mongod
+(BENCH_MONGO_URL) and the fake LLM backend. It seeds N NPCs with tasks
+through the API, then runs a weighted mix of endpoints at a fixed
+concurrency and reports throughput and p50/p95/p99 per endpoint.
+
+The Gemini quota limiter is lifted for the fake backend (--quota-limiter
+keeps the GEMINI_* limits), and with --cache off, concurrent identical states
+are no longer coalesced into one generation either. LLM calls, throttles and
+fallbacks during the measured run are reported. A run that throttled or fell
+back without --quota-limiter or --llm-error-rate exits non-zero, because its
+latencies measure the limiter, not the API.
+
+Every request is drawn from a seeded RNG, so two runs with the same flags
+send the same sequence. Results can be saved as JSON and compared against
+an earlier run; --compare exits non-zero when any endpoint's p95 regresses
+by more than --tolerance.
+
+Usage (from Backend/):
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --npcs 500 --requests 5000 --concurrency 50 --output before.json
+    python -m benchmarks.load_test --output after.json --compare before.json
+    BENCH_MONGO_URL=mongodb://localhost:27017 python -m benchmarks.load_test --mongo-latency-ms 0
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+
+# Endpoint mix: name -> relative weight
+WORKLOAD = {
+    "save_scores": 10,
+    "get_scores": 30,
+    "list_all": 5,
+    "generate_response": 15,
+    "save_task": 10,
+    "get_tasks": 30,
+}
+
+TRAITS = ("openness", "conscientiousness", "extraversion", "agreeableness", "neuroticism")
+
+
+class ASGIClient:
+    """Minimal in-process HTTP client for an ASGI app."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method, path, body=None, query=""):
+        payload = json.dumps(body).encode("utf-8") if body is not None else b""
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode("utf-8"),
+            "root_path": "",
+            "query_string": query.encode("utf-8"),
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+            "client": ("loadtest", 0),
+            "server": ("loadtest", 80),
+        }
+        status = {}
+        chunks = []
+
+        async def receive():
+            return {"type": "http.request", "body": payload, "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status.get("code", 500), b"".join(chunks)
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5 - 1e-9)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples, elapsed):
+    endpoints = {}
+    for name, entries in sorted(samples.items()):
+        latencies = sorted(ms for ms, _ in entries)
+        errors = sum(1 for _, ok in entries if not ok)
+        endpoints[name] = {
+            "requests": len(entries),
+            "errors": errors,
+            "throughput_rps": round(len(entries) / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+        }
+    total = sum(entry["requests"] for entry in endpoints.values())
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "requests": total,
+        "errors": sum(entry["errors"] for entry in endpoints.values()),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Returns (rows, regressions) comparing p50/p95/p99 and throughput per endpoint."""
+    rows = []
+    regressions = []
+    for name, entry in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if before is None:
+            continue
+        row = {"endpoint": name}
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            row[key] = (before[key], entry[key], entry[key] / before[key] - 1.0 if before[key] else 0.0)
+        rows.append(row)
+        if before["p95_ms"] and entry["p95_ms"] > before["p95_ms"] * (1.0 + tolerance):
+            regressions.append(name)
+    return rows, regressions
+
+
+def ocean_payload(report_id, rng):
+    raw = {trait: rng.randint(24, 120) for trait in TRAITS}
+    return {
+        "report_id": report_id,
+        "timestamp": datetime.now().isoformat() + "Z",
+        "ocean_scores": raw,
+        "ocean_normalized": {trait: score / 120 for trait, score in raw.items()},
+    }
+
+
+def task_payload(report_id, rng):
+    return {
+        "task_name": f"Task {rng.randint(1, 999)}",
+        "importance_kk": round(rng.uniform(0.1, 1.0), 2),
+        "required_time_trk": round(rng.uniform(0.5, 8.0), 2),
+        "available_time_tak": round(rng.uniform(1.0, 24.0), 2),
+        "report_id": report_id,
+    }
+
+
+def build_request(name, report_ids, rng):
+    report_id = rng.choice(report_ids)
+    if name == "save_scores":
+        return "POST", "/api/save-ocean-scores", ocean_payload(report_id, rng), ""
+    if name == "get_scores":
+        return "GET", f"/api/get-ocean-scores/{report_id}", None, ""
+    if name == "list_all":
+        return "GET", "/api/all-ocean-scores", None, "limit=50"
+    if name == "generate_response":
+        return "POST", f"/api/generate-npc-response/{report_id}", None, ""
+    if name == "save_task":
+        return "POST", "/api/save-task", task_payload(report_id, rng), ""
+    if name == "get_tasks":
+        return "GET", f"/api/get-tasks/{report_id}", None, ""
+    raise ValueError(f"unknown endpoint '{name}'")
+
+
+def build_plan(count, report_ids, workload, seed):
+    rng = random.Random(seed)
+    names = list(workload)
+    weights = [workload[name] for name in names]
+    return [(name, build_request(name, report_ids, rng)) for name in rng.choices(names, weights, k=count)]
+
+
+async def seed_population(client, count, tasks_per_npc, concurrency, seed):
+    rng = random.Random(seed)
+    report_ids = [f"load-{seed}-{i:05d}" for i in range(count)]
+    requests = []
+    for report_id in report_ids:
+        requests.append(("POST", "/api/save-ocean-scores", ocean_payload(report_id, rng)))
+        requests.extend(("POST", "/api/save-task", task_payload(report_id, rng)) for _ in range(tasks_per_npc))
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(method, path, body):
+        async with semaphore:
+            status, content = await client.request(method, path, body)
+            if status >= 400:
+                raise RuntimeError(f"seeding {path} failed with {status}: {content[:200]!r}")
+
+    await asyncio.gather(*(send(*request) for request in requests))
+    return report_ids
+
+
+async def run_plan(client, plan, concurrency):
+    samples = {}
+    position = iter(plan)
+
+    async def worker():
+        for name, (method, path, body, query) in position:
+            started = time.perf_counter()
+            try:
+                status, _ = await client.request(method, path, body, query)
+                ok = status < 400
+            except Exception:
+                ok = False
+            samples.setdefault(name, []).append(((time.perf_counter() - started) * 1000.0, ok))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+def configure_environment(args):
+    # Must run before main is imported: the app reads these at import time
+    os.environ["MONGO_URL"] = os.getenv("BENCH_MONGO_URL") or f"memory://?latency_ms={args.mongo_latency_ms}"
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["FAKE_LLM_JITTER_MS"] = str(args.llm_jitter_ms)
+    os.environ["FAKE_LLM_ERROR_RATE"] = str(args.llm_error_rate)
+    os.environ["FAKE_LLM_SEED"] = str(args.seed)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if not args.quota_limiter:
+        # Gemini free-tier limits (15 RPM per model) would throttle the fake backend
+        os.environ["GEMINI_RPM"] = "1e9"
+        os.environ["GEMINI_TPM"] = "1e12"
+    if not args.cache:
+        os.environ["NPC_CACHE_TTL_SECONDS"] = "0"
+        os.environ["NPC_CACHE_COALESCE"] = "0"
+
+
+def llm_counters(main):
+    limits = main.quota_limiter.stats()
+    return {
+        "calls": len(main.llm_backend.calls),
+        "throttled": limits["throttled"],
+        "short_circuited": limits["short_circuited"],
+        "fallbacks": limits["fallbacks"],
+        "cache_hits": main.response_cache.hits,
+    }
+
+
+def degraded(result):
+    """Reasons the measured run did not exercise the API as configured, if any."""
+    config, llm = result["config"], result["llm"]
+    reasons = []
+    if not config["quota_limiter"] and llm["throttled"] + llm["short_circuited"]:
+        reasons.append(f"{llm['throttled']} throttled / {llm['short_circuited']} short-circuited LLM calls")
+    if not (config["llm_error_rate"] or config["quota_limiter"]) and llm["fallbacks"]:
+        reasons.append(f"{llm['fallbacks']} canned fallback responses")
+    return reasons
+
+
+def print_report(result):
+    print(f"\nBackend: {result['config']['mongo_url']} | LLM: fake "
+          f"({result['config']['llm_latency_ms']} ms) | concurrency: {result['config']['concurrency']}")
+    print(f"{'endpoint':20} {'reqs':>6} {'err':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, entry in result["summary"]["endpoints"].items():
+        print(f"{name:20} {entry['requests']:>6} {entry['errors']:>5} {entry['throughput_rps']:>9.1f} "
+              f"{entry['p50_ms']:>9.2f} {entry['p95_ms']:>9.2f} {entry['p99_ms']:>9.2f} {entry['max_ms']:>9.2f}")
+    summary = result["summary"]
+    print(f"{'total':20} {summary['requests']:>6} {summary['errors']:>5} {summary['throughput_rps']:>9.1f}"
+          f"   in {summary['elapsed_s']:.2f}s")
+    llm, config = result["llm"], result["config"]
+    print(f"\nLLM calls {llm['calls']} | throttled {llm['throttled']} | short-circuited {llm['short_circuited']} "
+          f"| fallbacks {llm['fallbacks']} | cache hits {llm['cache_hits']}")
+    print(f"Quota limiter: {'GEMINI_* limits' if config['quota_limiter'] else 'lifted'} | "
+          f"response cache and coalescing: {'on' if config['cache'] else 'off'}")
+
+
+def print_comparison(rows, regressions, tolerance):
+    print(f"\n{'endpoint':20} {'p50 ms':>22} {'p95 ms':>22} {'p99 ms':>22} {'req/s':>22}")
+    for row in rows:
+        cells = [f"{before:>8.2f} -> {after:>8.2f} {delta:>+4.0%}"
+                 for before, after, delta in (row[key] for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"))]
+        print(f"{row['endpoint']:20} " + " ".join(f"{cell:>22}" for cell in cells))
+    if regressions:
+        print(f"\np95 regressed by more than {tolerance:.0%}: {', '.join(regressions)}")
+    else:
+        print(f"\nNo endpoint's p95 regressed by more than {tolerance:.0%}")
+
+
+async def main_async(args):
+    configure_environment(args)
+
+    import main
+
+    workload = dict(WORKLOAD)
+    for item in args.mix or ():
+        name, _, weight = item.partition("=")
+        if name not in WORKLOAD:
+            raise SystemExit(f"unknown endpoint in --mix: {name} (expected one of {', '.join(WORKLOAD)})")
+        workload[name] = float(weight)
+
+    client = ASGIClient(main.app)
+    await main.app.router.startup()
+    try:
+        report_ids = await seed_population(client, args.npcs, args.tasks_per_npc, args.concurrency, args.seed)
+        plan = build_plan(args.requests, report_ids, workload, args.seed)
+        if args.warmup:
+            await run_plan(client, build_plan(args.warmup, report_ids, workload, args.seed + 1), args.concurrency)
+        before = llm_counters(main)
+        samples, elapsed = await run_plan(client, plan, args.concurrency)
+        after = llm_counters(main)
+    finally:
+        await main.app.router.shutdown()
+
+    return {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "mongo_url": os.environ["MONGO_URL"],
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "llm_error_rate": args.llm_error_rate,
+            "npcs": args.npcs,
+            "tasks_per_npc": args.tasks_per_npc,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "cache": args.cache,
+            "quota_limiter": args.quota_limiter,
+            "seed": args.seed,
+            "workload": workload,
+        },
+        "summary": summarize(samples, elapsed),
+        # Measured run only (seeding and warmup excluded)
+        "llm": {name: after[name] - before[name] for name in after},
+    }
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="MADE API mixed-workload load test")
+    parser.add_argument("--npcs", type=int, default=200)
+    parser.add_argument("--tasks-per-npc", type=int, default=2)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--mix", nargs="*", metavar="ENDPOINT=WEIGHT",
+                        help=f"override workload weights ({', '.join(WORKLOAD)})")
+    parser.add_argument("--mongo-latency-ms", type=float, default=1.0,
+                        help="round-trip latency injected into the in-memory store")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--cache", action="store_true",
+                        help="keep the NPC response cache and in-flight coalescing on")
+    parser.add_argument("--quota-limiter", action="store_true",
+                        help="keep the GEMINI_RPM / GEMINI_TPM limits on the fake backend")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="allowed p95 regression (fraction)")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(main_async(args))
+    print_report(result)
+    reasons = degraded(result)
+    if reasons:
+        print(f"\nDEGRADED RUN: {'; '.join(reasons)}. Latencies include limiter waits and fallbacks.")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(result, handle, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        rows, regressions = compare(result["summary"], baseline["summary"], args.tolerance)
+        print_comparison(rows, regressions, args.tolerance)
+        if regressions:
+            return 1
+    return 1 if reasons else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
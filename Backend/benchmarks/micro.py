@@ -0,0 +1,219 @@
+"""
+Micro-benchmarks for the memory model hot functions.
+
+Covers calculate_p_factor, calculate_retention, calculate_confidence,
+reconstruct_memory, calculate_priority and the
+calculate_retention_with_priority model from test_priority.py. Each scalar
+function is timed as a loop over a population and, where there is one, its
+vectorized _batch counterpart over the same population. Functions that log
+are also timed with DEBUG logging on (written to os.devnull through the
+normal queue handler), so the cost of leaving detail logging enabled is
+visible.
+
+Each case is calibrated to run for at least --min-time per round. The best
+of --repeat rounds is reported as nanoseconds per item. Results can be saved
+as a baseline and later runs compared against it; --compare exits non-zero
+when a case is slower than the baseline by more than --tolerance.
+
+Usage (from Backend/):
+    python -m benchmarks.micro
+    python -m benchmarks.micro --quick --save baseline.json
+    python -m benchmarks.micro --quick --compare baseline.json
+    python -m benchmarks.micro --filter confidence --sizes 1000 1000000
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from app_logging import configure_logging
+from memory.confidece import calculate_confidence, calculate_confidence_batch
+from memory.priority import calculate_priority
+from memory.reconstruction import reconstruct_memory, reconstruct_memory_batch
+from memory.retention import calculate_retention, calculate_retention_batch
+from memory.seeding import derive_seeds
+from pfactor import TRAITS, calculate_p_factor, calculate_p_factor_batch
+from test_priority import calculate_retention_with_priority
+
+SIZES = (1_000, 100_000)
+QUICK_SIZES = (1_000,)
+
+# Logging modes: "off" is the production default (INFO), "debug" turns on memory.* detail
+LOG_MODES = ("off", "debug")
+
+
+def population(size, seed=0):
+    rng = np.random.default_rng(seed)
+    scores = rng.uniform(0.0, 1.0, (size, len(TRAITS)))
+    return {
+        "scores": scores,
+        "score_dicts": [dict(zip(TRAITS, row)) for row in scores.tolist()],
+        "p_factors": rng.uniform(0.5, 1.5, size),
+        "days": rng.uniform(0.0, 6.0, size),
+        "retentions": rng.uniform(0.3, 1.0, size),
+        "seeds": derive_seeds([f"npc-{i}" for i in range(size)], [0] * size),
+        "importance": rng.uniform(0.1, 1.0, size),
+        "required": rng.uniform(0.5, 8.0, size),
+        "available": rng.uniform(1.0, 24.0, size),
+    }
+
+
+# name -> (logs at DEBUG, builder(data) -> zero-arg callable over the whole population)
+CASES = {
+    "p_factor.scalar": (False, lambda d: lambda: [calculate_p_factor(s) for s in d["score_dicts"]]),
+    "p_factor.batch": (False, lambda d: lambda: calculate_p_factor_batch(d["scores"])),
+    "retention.scalar": (False, lambda d: lambda: [
+        calculate_retention(p, t) for p, t in zip(d["p_factors"].tolist(), d["days"].tolist())
+    ]),
+    "retention.batch": (False, lambda d: lambda: calculate_retention_batch(d["p_factors"], d["days"])),
+    "confidence.scalar": (True, lambda d: lambda: [
+        calculate_confidence(r, seed=s) for r, s in zip(d["retentions"].tolist(), d["seeds"].tolist())
+    ]),
+    "confidence.batch": (True, lambda d: lambda: calculate_confidence_batch(d["retentions"], d["seeds"])),
+    "reconstruction.scalar": (True, lambda d: lambda: [
+        reconstruct_memory(r, seed=s) for r, s in zip(d["retentions"].tolist(), d["seeds"].tolist())
+    ]),
+    "reconstruction.batch": (True, lambda d: lambda: reconstruct_memory_batch(d["retentions"], d["seeds"])),
+    "priority.scalar": (True, lambda d: lambda: [
+        calculate_priority(k, r, a)
+        for k, r, a in zip(d["importance"].tolist(), d["required"].tolist(), d["available"].tolist())
+    ]),
+    "retention_with_priority.scalar": (False, lambda d: lambda: [
+        calculate_retention_with_priority(300.0, p, k, t * 60.0)
+        for p, k, t in zip(d["p_factors"].tolist(), d["importance"].tolist(), d["days"].tolist())
+    ]),
+}
+
+
+def set_log_mode(mode, sink):
+    if mode == "debug":
+        configure_logging(level="INFO", levels={"memory": "DEBUG"}, sample_rate=1.0, stream=sink)
+    else:
+        configure_logging(level="INFO", levels={}, stream=sink)
+
+
+def measure(func, min_time, repeat):
+    # timeit-style: calibrate the loop count, then keep the best round
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    rounds = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(loops):
+                func()
+            rounds.append((time.perf_counter() - started) / loops)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return loops, sorted(rounds)
+
+
+def run(sizes, min_time, repeat, pattern=None, log_modes=LOG_MODES):
+    results = {}
+    with open(os.devnull, "w") as sink:
+        try:
+            for size in sizes:
+                data = population(size)
+                for name, (logs, build) in CASES.items():
+                    if pattern and pattern not in name:
+                        continue
+                    for mode in (log_modes if logs else ("off",)):
+                        # DEBUG logging only once per function, at the smallest size
+                        if mode != "off" and size != min(sizes):
+                            continue
+                        set_log_mode(mode, sink)
+                        loops, rounds = measure(build(data), min_time, repeat)
+                        key = f"{name}[n={size},log={mode}]"
+                        results[key] = {
+                            "size": size,
+                            "log": mode,
+                            "loops": loops,
+                            "best_ns_per_item": round(rounds[0] / size * 1e9, 2),
+                            "median_ns_per_item": round(rounds[len(rounds) // 2] / size * 1e9, 2),
+                            "items_per_s": round(size / rounds[0], 1),
+                        }
+                        print(f"{key:52} {results[key]['best_ns_per_item']:>12.1f} ns/item "
+                              f"{results[key]['items_per_s']:>14,.0f} items/s")
+        finally:
+            configure_logging()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Returns (rows, regressions); a row is (key, baseline ns, current ns, ratio)."""
+    rows = []
+    regressions = []
+    for key, entry in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        ratio = entry["best_ns_per_item"] / before["best_ns_per_item"] if before["best_ns_per_item"] else 1.0
+        rows.append((key, before["best_ns_per_item"], entry["best_ns_per_item"], ratio))
+        if ratio > 1.0 + tolerance:
+            regressions.append(key)
+    return rows, regressions
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Memory model micro-benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=None)
+    parser.add_argument("--quick", action="store_true", help=f"only n={QUICK_SIZES[0]}")
+    parser.add_argument("--filter", help="only cases whose name contains this")
+    parser.add_argument("--no-logging", action="store_true", help="skip the DEBUG-logging variants")
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per timed round")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (fraction)")
+    args = parser.parse_args(argv)
+
+    sizes = sorted(args.sizes or (QUICK_SIZES if args.quick else SIZES))
+    log_modes = ("off",) if args.no_logging else LOG_MODES
+    print(f"Python {platform.python_version()} | numpy {np.__version__} | sizes {', '.join(map(str, sizes))}\n")
+    results = run(sizes, args.min_time, args.repeat, args.filter, log_modes)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as handle:
+            json.dump({
+                "created_at": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "results": results,
+            }, handle, indent=2)
+        print(f"\nBaseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)["results"]
+        rows, regressions = compare(results, baseline, args.tolerance)
+        print(f"\n{'case':52} {'baseline ns':>12} {'now ns':>12} {'change':>8}")
+        for key, before, after, ratio in rows:
+            flag = "  <-- regression" if key in regressions else ""
+            print(f"{key:52} {before:>12.1f} {after:>12.1f} {ratio - 1.0:>+8.0%}{flag}")
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.tolerance:.0%}")
+            return 1
+        print(f"\nNo case slower than baseline by more than {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
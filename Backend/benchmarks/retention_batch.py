@@ -0,0 +1,45 @@
+"""
+Scalar loop vs. vectorized retention at 1k / 100k / 1M NPCs.
+
+Usage (from Backend/):
+    python -m benchmarks.retention_batch
+    python -m benchmarks.retention_batch --sizes 1000 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from memory.retention import calculate_retention, calculate_retention_batch
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run(sizes, repeat):
+    rng = np.random.default_rng(0)
+    print(f"{'NPCs':>10} {'scalar (s)':>12} {'batch (s)':>12} {'speedup':>9}")
+    for size in sizes:
+        p_factors = rng.uniform(0.5, 1.5, size)
+        days = rng.uniform(0.0, 6.0, size)
+        p_list, day_list = p_factors.tolist(), days.tolist()
+
+        scalar = best_of(lambda: [calculate_retention(p, d) for p, d in zip(p_list, day_list)],
+                         1 if size >= 1_000_000 else repeat)
+        batch = best_of(lambda: calculate_retention_batch(p_factors, days), repeat)
+        print(f"{size:>10} {scalar:>12.4f} {batch:>12.4f} {scalar / batch:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retention scalar vs. batch benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
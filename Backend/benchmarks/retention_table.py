@@ -0,0 +1,114 @@
+"""
+Exact batch retention vs. the precomputed lookup table.
+
+For each --max-error a table is built (or --table loads one as workers
+would, memory-mapped), then timed against calculate_retention_batch at each
+population size. The accuracy report compares the table with the exact
+formula on a random population spanning days 0..6 (past the 0.30 floor):
+max / p99 / mean absolute error of the unrounded value, the share of NPCs
+whose 4-dp retention is identical, and phase disagreements.
+
+Usage (from Backend/):
+    python -m benchmarks.retention_table
+    python -m benchmarks.retention_table --max-error 1e-3 1e-4 --sizes 1000 1000000
+    python -m benchmarks.retention_table --table retention_table.npy --output report.json
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from memory.retention import calculate_retention_batch
+from memory.retention_table import RetentionTable, build, exact_retention
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def accuracy(table, samples, seed=1):
+    rng = np.random.default_rng(seed)
+    p_factors = rng.uniform(0.5, 1.5, samples)
+    days = rng.uniform(0.0, 6.0, samples)
+
+    error = np.abs(table.interpolate(p_factors, days) - exact_retention(p_factors, days))
+    exact, exact_phases, _ = calculate_retention_batch(p_factors, days)
+    looked_up, phases = table.lookup(p_factors, days)
+    return {
+        "samples": samples,
+        "max_error": float(error.max()),
+        "p99_error": float(np.percentile(error, 99)),
+        "mean_error": float(error.mean()),
+        "identical_4dp": float((looked_up == exact).mean()),
+        "phase_mismatches": int((phases != exact_phases).sum()),
+    }
+
+
+def speed(table, sizes, repeat):
+    rng = np.random.default_rng(0)
+    rows = []
+    for size in sizes:
+        p_factors = rng.uniform(0.5, 1.5, size)
+        days = rng.uniform(0.0, 6.0, size)
+        exact = best_of(lambda: calculate_retention_batch(p_factors, days), repeat)
+        lookup = best_of(lambda: table.lookup(p_factors, days), repeat)
+        rows.append({
+            "size": size,
+            "exact_ns_per_item": round(exact / size * 1e9, 2),
+            "table_ns_per_item": round(lookup / size * 1e9, 2),
+            "speedup": round(exact / lookup, 2),
+        })
+    return rows
+
+
+def report(label, table, sizes, repeat, samples):
+    result = {
+        "table": label,
+        "shape": list(table.values.shape),
+        "megabytes": round(table.nbytes / 1e6, 3),
+        "built_max_error": table.max_error,
+        "accuracy": accuracy(table, samples),
+        "speed": speed(table, sizes, repeat),
+    }
+    acc = result["accuracy"]
+    print(f"\n{label}: {table.p_count} x {table.day_count} ({result['megabytes']} MB)")
+    print(f"  error   max {acc['max_error']:.2e}   p99 {acc['p99_error']:.2e}   mean {acc['mean_error']:.2e}")
+    print(f"  4-dp identical {acc['identical_4dp']:.2%}   phase mismatches {acc['phase_mismatches']} / {samples}")
+    print(f"  {'NPCs':>10} {'exact ns':>10} {'table ns':>10} {'speedup':>9}")
+    for row in result["speed"]:
+        print(f"  {row['size']:>10} {row['exact_ns_per_item']:>10.1f} {row['table_ns_per_item']:>10.1f} "
+              f"{row['speedup']:>8.2f}x")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retention lookup table: speed and accuracy")
+    parser.add_argument("--max-error", type=float, nargs="+", default=[1e-2, 1e-3])
+    parser.add_argument("--table", help="load this table (memory-mapped) instead of building")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--samples", type=int, default=1_000_000, help="population for the accuracy report")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    results = []
+    if args.table:
+        results.append(report(args.table, RetentionTable.load(args.table), args.sizes, args.repeat, args.samples))
+    else:
+        for max_error in args.max_error:
+            started = time.perf_counter()
+            table = build(max_error)
+            print(f"\nbuilt max_error={max_error:g} in {time.perf_counter() - started:.2f}s")
+            results.append(report(f"max_error={max_error:g}", table, args.sizes, args.repeat, args.samples))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+        print(f"\nReport written to {args.output}")
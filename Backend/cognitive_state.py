@@ -0,0 +1,289 @@
+"""
+Materialized "current cognitive state" per NPC.
+
+Dashboards used to re-derive every NPC's retention from `saved_at` on each
+view. This module keeps one document per report_id in the `cognitive_state`
+collection instead: retention, phase, confidence band and next threshold
+crossing, readable for the whole population in one indexed query.
+
+A state only changes visibly when its bucket changes:
+    (phase, confidence_label, retention band of BAND_WIDTH)
+Each NPC is kept on an in-memory heap keyed on the earliest moment its
+bucket could change: the next game-day boundary (the confidence seed is
+per game day), the next band edge or the next 0.40 / 0.30 crossing, all in
+closed form. The ticker recomputes the due NPCs in one vectorized pass and
+writes back only those whose bucket actually moved. Stored retention is
+therefore accurate to the band, not to the second.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+from datetime import timedelta
+
+from pymongo import ASCENDING, DeleteOne, IndexModel, UpdateOne
+
+from app_logging import get_logger
+from memory.confidece import calculate_confidence_batch
+from memory.retention import (
+    PHASE_LABELS,
+    STOP_THRESHOLD,
+    calculate_retention_from_timestamps_batch,
+    next_transition,
+    time_to_threshold,
+)
+from memory.seeding import derive_seeds
+from scheduler import Clock
+from timeutil import parse_timestamp
+
+logger = get_logger("cognitive_state")
+
+BAND_WIDTH = 0.05
+
+STATE_INDEXES = [
+    IndexModel([("report_id", ASCENDING)], name="report_id_1", unique=True),
+    # dashboard filters
+    IndexModel([("phase", ASCENDING), ("confidence_label", ASCENDING), ("report_id", ASCENDING)],
+               name="phase_1_confidence_label_1_report_id_1"),
+]
+
+# Nudge past an edge so the recompute lands on the far side of it, even
+# after retention is rounded to 4 dp (~0.06 s of real time)
+_EPSILON_DAYS = 1e-3
+
+
+def retention_band(retention, width=BAND_WIDTH):
+    """Lower edge of the band `retention` falls in."""
+    return round(math.floor(retention / width + 1e-9) * width, 4)
+
+
+def next_refresh_day(p_factor, days, band, width=BAND_WIDTH):
+    # Earliest game day the bucket could change: day boundary, band edge, threshold crossing
+    candidates = [math.floor(days) + 1]
+    if band > STOP_THRESHOLD:
+        crossing = time_to_threshold(p_factor, band)
+        if crossing > days:
+            candidates.append(crossing)
+    upcoming = next_transition(p_factor, days)
+    if upcoming is not None:
+        candidates.append(upcoming[1])
+    return min(candidates) + _EPSILON_DAYS
+
+
+class CognitiveStateView:
+
+    def __init__(self, collection, clock=None, game_time_scale=60, band_width=BAND_WIDTH,
+                 min_interval=1.0, batch_size=1000):
+        self.collection = collection
+        self.clock = clock or Clock()
+        self.game_time_scale = game_time_scale
+        self.band_width = band_width
+        self.min_interval = min_interval
+        self.batch_size = batch_size
+        self._sources = {}
+        self._buckets = {}
+        self._versions = {}
+        self._heap = []
+        self._sequence = itertools.count()
+        # Version tokens are never reused (see DegradationScheduler)
+        self._tokens = itertools.count(1)
+        self._wakeup = asyncio.Event()
+        self._running = False
+        self.recomputed = 0
+        self.written = 0
+        self.ticks = 0
+
+    # -- computation --------------------------------------------------------
+
+    def compute(self, report_ids, p_factors, created_ats, now):
+        """State documents for many NPCs at `now`, in one vectorized pass."""
+        if not report_ids:
+            return []
+        retentions, phase_codes, game_days = calculate_retention_from_timestamps_batch(
+            p_factors, created_ats, now=now, game_time_scale=self.game_time_scale
+        )
+        conf_vals, conf_labels = calculate_confidence_batch(retentions, derive_seeds(report_ids, game_days))
+
+        states = []
+        for report_id, p_factor, created_at, retention, phase_code, days, conf_val, conf_label in zip(
+            report_ids, p_factors, created_ats, retentions.tolist(), phase_codes.tolist(),
+            game_days.tolist(), conf_vals.tolist(), conf_labels
+        ):
+            upcoming = next_transition(p_factor, days)
+            states.append({
+                "report_id": report_id,
+                "p_factor": p_factor,
+                "saved_at": created_at,
+                "game_day": round(days, 2),
+                "retention": retention,
+                "retention_band": retention_band(retention, self.band_width),
+                "phase": PHASE_LABELS[phase_code],
+                "confidence_score": conf_val,
+                "confidence_label": conf_label,
+                "next_transition_threshold": upcoming[0] if upcoming else None,
+                "next_transition_at": self._at_game_day(created_at, upcoming[1]) if upcoming else None,
+                "refreshed_at": now,
+            })
+        return states
+
+    @staticmethod
+    def bucket(state):
+        return state["phase"], state["confidence_label"], state["retention_band"]
+
+    def _at_game_day(self, created_at, day):
+        return created_at + timedelta(seconds=day * self.game_time_scale)
+
+    # -- tracking -----------------------------------------------------------
+
+    def _schedule(self, report_id, state):
+        p_factor, created_at = self._sources[report_id]
+        days = (state["refreshed_at"] - created_at).total_seconds() / self.game_time_scale
+        when = self._at_game_day(created_at, next_refresh_day(p_factor, days, state["retention_band"], self.band_width))
+        heapq.heappush(self._heap, (when, next(self._sequence), report_id, self._versions[report_id]))
+
+    async def _apply(self, states, force=False):
+        # Write only the states whose bucket moved (or everything, when forced)
+        operations = []
+        for state in states:
+            report_id = state["report_id"]
+            bucket = self.bucket(state)
+            if force or self._buckets.get(report_id) != bucket:
+                operations.append(UpdateOne({"report_id": report_id}, {"$set": state}, upsert=True))
+                self._buckets[report_id] = bucket
+            self._schedule(report_id, state)
+        self.recomputed += len(states)
+        for offset in range(0, len(operations), self.batch_size):
+            await self.collection.bulk_write(operations[offset:offset + self.batch_size], ordered=False)
+        self.written += len(operations)
+        return len(operations)
+
+    async def track_many(self, reports):
+        """reports: iterable of (report_id, p_factor, created_at); always written."""
+        reports = list(reports)
+        for report_id, p_factor, created_at in reports:
+            self._versions[report_id] = next(self._tokens)
+            self._sources[report_id] = (p_factor, created_at)
+        states = self.compute(*self._columns(reports), self.clock.now())
+        written = await self._apply(states, force=True)
+        self._wakeup.set()
+        return written
+
+    async def track(self, report_id, p_factor, created_at):
+        return await self.track_many([(report_id, p_factor, created_at)])
+
+    async def untrack(self, report_id):
+        self._sources.pop(report_id, None)
+        self._buckets.pop(report_id, None)
+        self._versions.pop(report_id, None)
+        await self.collection.delete_one({"report_id": report_id})
+
+    def tracking(self, report_id):
+        return report_id in self._sources
+
+    @staticmethod
+    def _columns(reports):
+        report_ids, p_factors, created_ats = [], [], []
+        for report_id, p_factor, created_at in reports:
+            report_ids.append(report_id)
+            p_factors.append(p_factor)
+            created_ats.append(created_at)
+        return report_ids, p_factors, created_ats
+
+    async def rebuild(self, ocean_collection):
+        """
+        Start-up sync from the latest report per NPC. States already stored
+        with the same source and bucket are left alone; states for deleted
+        NPCs are dropped.
+        """
+        latest = {}
+        cursor = ocean_collection.find(
+            {}, {"report_id": 1, "p_factor": 1, "saved_at": 1}, sort=[("report_id", 1), ("saved_at", -1)]
+        )
+        async for doc in cursor:
+            latest.setdefault(doc["report_id"], doc)
+
+        stored = {}
+        async for doc in self.collection.find({}, ["report_id", "saved_at", "phase", "confidence_label", "retention_band"]):
+            stored[doc["report_id"]] = doc
+
+        reports = [
+            (report_id, doc["p_factor"], parse_timestamp(doc["saved_at"])) for report_id, doc in latest.items()
+        ]
+        for report_id, p_factor, created_at in reports:
+            self._versions[report_id] = next(self._tokens)
+            self._sources[report_id] = (p_factor, created_at)
+            previous = stored.get(report_id)
+            if previous is not None and parse_timestamp(previous["saved_at"]) == created_at:
+                self._buckets[report_id] = self.bucket(previous)
+
+        written = await self._apply(self.compute(*self._columns(reports), self.clock.now()))
+        orphans = [DeleteOne({"report_id": report_id}) for report_id in stored if report_id not in latest]
+        if orphans:
+            await self.collection.bulk_write(orphans, ordered=False)
+        self._wakeup.set()
+        return {"tracked": len(reports), "written": written, "removed": len(orphans)}
+
+    # -- ticker -------------------------------------------------------------
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, report_id, version = heapq.heappop(self._heap)
+            if self._versions.get(report_id) == version and report_id in self._sources:
+                due.append(report_id)
+        return due
+
+    async def refresh_due(self):
+        """Recompute every NPC whose bucket may have changed; returns states written."""
+        now = self.clock.now()
+        due = self._pop_due(now)
+        self.ticks += 1
+        if not due:
+            return 0
+        reports = [(report_id, *self._sources[report_id]) for report_id in due]
+        return await self._apply(self.compute(*self._columns(reports), now))
+
+    def _seconds_until_next(self):
+        while self._heap:
+            when, _, report_id, version = self._heap[0]
+            if self._versions.get(report_id) == version and report_id in self._sources:
+                return max(0.0, (when - self.clock.now()).total_seconds())
+            heapq.heappop(self._heap)
+        return None
+
+    async def run(self):
+        self._running = True
+        while self._running:
+            try:
+                await self.refresh_due()
+            except Exception:
+                logger.exception("cognitive state refresh failed")
+            delay = self._seconds_until_next()
+            self._wakeup.clear()
+
+            # Never tick faster than min_interval, so due NPCs are written in batches
+            sleeper = asyncio.ensure_future(self.clock.sleep(max(self.min_interval, delay))) if delay is not None else None
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            pending = {task for task in (sleeper, waiter) if task is not None}
+            try:
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in pending:
+                    task.cancel()
+        self._running = False
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
+
+    def stats(self):
+        return {
+            "running": self._running,
+            "tracked_npcs": len(self._sources),
+            "queue_depth": len(self._heap),
+            "ticks": self.ticks,
+            "recomputed": self.recomputed,
+            "written": self.written,
+            "write_ratio": round(self.written / self.recomputed, 4) if self.recomputed else 0.0,
+        }
@@ -0,0 +1,52 @@
+"""
+Async MongoDB data layer for the MADE API.
+
+`get_client()` returns a Motor client (non-blocking, pooled) for normal
+`mongodb://` / `mongodb+srv://` URLs, or an in-memory stand-in for
+`memory://` URLs. The stand-in (memory_mongo) speaks the subset of the Motor
+collection API used by the backend, so routes, benchmarks and tests can run
+without a mongod.
+
+Clients are tz-aware: BSON dates come back as UTC datetimes (see timeutil).
+
+Pool sizing is configured through the environment:
+    MONGO_MAX_POOL_SIZE   (default 100)
+    MONGO_MIN_POOL_SIZE   (default 0)
+    MONGO_MAX_IDLE_MS     (default 0 = never close idle connections)
+    MONGO_WAIT_QUEUE_MS   (default 0 = wait forever for a free connection)
+
+The in-memory backend accepts `memory://?latency_ms=5` to simulate a network
+round-trip on every operation.
+"""
+
+import os
+from urllib.parse import parse_qs, urlparse
+
+
+def pool_options():
+    options = {
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+    }
+    max_idle = int(os.getenv("MONGO_MAX_IDLE_MS", "0"))
+    if max_idle > 0:
+        options["maxIdleTimeMS"] = max_idle
+    wait_queue = int(os.getenv("MONGO_WAIT_QUEUE_MS", "0"))
+    if wait_queue > 0:
+        options["waitQueueTimeoutMS"] = wait_queue
+    return options
+
+
+def get_client(url, **overrides):
+    if url.startswith("memory://"):
+        query = parse_qs(urlparse(url).query)
+        latency_ms = float(query.get("latency_ms", ["0"])[0])
+        from memory_mongo import MemoryClient
+
+        return MemoryClient(latency=latency_ms / 1000.0)
+
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    options = {"tz_aware": True, **pool_options()}
+    options.update(overrides)
+    return AsyncIOMotorClient(url, **options)
@@ -0,0 +1,93 @@
+"""
+NPC response generation shared by the API and the degradation monitor.
+
+Holds the Mongo collections and generate_for_report(), so monitor.py can
+regenerate responses without importing the FastAPI app. Deferred and bulk
+ingestion put one "initial_generation" job per document on the durable job
+queue (job_queue.JobQueue); its handlers in main.py call into this module.
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+from database import get_client
+from memory.confidece import calculate_confidence
+from memory.linguistic import generate_npc_response_async
+from memory.retention import calculate_retention_from_timestamp, transition_fields
+from memory.seeding import derive_seed
+from metrics import pipeline_timer
+from timeutil import parse_timestamp, utcnow
+
+load_dotenv()
+
+# MongoDB Connection (async Motor client, pool sized via MONGO_*_POOL_SIZE)
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+client = get_client(MONGO_URL)
+db = client["bigfive"]
+ocean_collection = db["ocean_scores"]
+tasks_collection = db["tasks"]
+
+
+class GenerationFailed(Exception):
+    pass
+
+
+def generation_fields(report, response_text, conf_val, retention, generated_at=None):
+    
+    # Shared $set for every path that stores a regenerated response, so the
+    # next_transition_at index never goes stale behind one of them
+    generated_at = generated_at or utcnow()
+    return {
+        "last_linguistic_response": response_text,
+        "confidence_at_generation": conf_val,
+        "retention_at_generation": retention,
+        "generation_timestamp": generated_at,
+        **transition_fields(report["p_factor"], parse_timestamp(report["saved_at"]), now=generated_at)
+    }
+
+async def generate_for_report(report_id, base_memory="The last assigned task", fallback=True, state=None):
+    
+    timed = pipeline_timer("generate_response")
+    
+    # Find the most recent record for this report_id
+    with timed("mongo_find"):
+        report = await ocean_collection.find_one({"report_id": report_id}, sort=[("saved_at", -1)])
+    if not report:
+        return None
+    
+    if state is not None:
+        # Queued job: generate for the state it was enqueued at
+        retention, phase = state["retention_val"], state["phase"]
+        conf_val, conf_label = state["confidence_score"], state["confidence_label"]
+    else:
+        # Calculate current retention
+        with timed("retention"):
+            start_time = parse_timestamp(report["saved_at"])
+            retention, debug, phase = calculate_retention_from_timestamp(report["p_factor"], start_time)
+        
+        # Calculate confidence (same NPC on the same game day -> same label)
+        with timed("confidence"):
+            conf_val, conf_label = calculate_confidence(retention, seed=derive_seed(report_id, debug["game_days"]))
+    
+    # Generate Linguistic Response
+    with timed("llm"):
+        response_text = await generate_npc_response_async(base_memory, conf_label, phase, retention, fallback=fallback)
+    if response_text is None:
+        raise GenerationFailed(f"all models failed for {report_id}")
+    
+    # Persist to DB - Target the specific document using its unique _id
+    update_data = generation_fields(report, response_text, conf_val, retention)
+    
+    with timed("mongo_update"):
+        await ocean_collection.update_one({"_id": report["_id"]}, {"$set": update_data})
+    
+    return {
+        "response": response_text,
+        "metadata": {
+            "confidence_label": conf_label,
+            "confidence_score": conf_val,
+            "retention_val": retention,
+            "phase": phase
+        }
+    }
@@ -0,0 +1,115 @@
+"""
+Index bootstrap and query-plan checks for the MADE collections.
+
+INDEXES declares every index the hot routes rely on. ensure_indexes() creates
+them idempotently at startup (creating an index that already exists with the
+same spec is a no-op). verify_query_plans() runs explain() on each hot query
+and reports whether the winning plan is an index scan.
+
+Usage (from Backend/):
+    python indexes.py            # create indexes and print the plan report
+"""
+
+import asyncio
+import os
+from timeutil import utcnow
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from cognitive_state import STATE_INDEXES
+from job_queue import JOB_INDEXES
+
+INDEXES = {
+    "ocean_scores": [
+        # get-ocean-scores, delete, latest report in generate-npc-response(s)
+        IndexModel([("report_id", ASCENDING), ("saved_at", DESCENDING)], name="report_id_1_saved_at_-1"),
+        # all-ocean-scores keyset pagination
+        IndexModel([("saved_at", DESCENDING), ("_id", DESCENDING)], name="saved_at_-1__id_-1"),
+        # upcoming-transitions range query
+        IndexModel([("next_transition_at", ASCENDING)], name="next_transition_at_1"),
+        # deferred-generation recovery at startup
+        IndexModel([("generation_status", ASCENDING)], name="generation_status_1"),
+    ],
+    "tasks": [
+        # get-tasks
+        IndexModel([("report_id", ASCENDING), ("created_at", DESCENDING)], name="report_id_1_created_at_-1"),
+    ],
+    # durable generation jobs: lease next due job, reclaim expired leases
+    "jobs": JOB_INDEXES,
+    # materialized current state: one document per NPC, dashboard filters
+    "cognitive_state": STATE_INDEXES,
+    "npc_response_cache": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+
+def hot_queries(report_id="sample-report"):
+    return [
+        ("ocean_scores", "get-ocean-scores / delete", {"report_id": report_id}, None),
+        ("ocean_scores", "latest report for generation", {"report_id": report_id}, [("saved_at", -1)]),
+        ("ocean_scores", "all-ocean-scores page", {}, [("saved_at", -1), ("_id", -1)]),
+        ("ocean_scores", "upcoming-transitions", {"next_transition_at": {"$gte": utcnow(), "$lte": utcnow()}},
+         [("next_transition_at", 1)]),
+        ("ocean_scores", "pending generations", {"generation_status": "pending"}, None),
+        ("jobs", "lease next job", {"status": "queued", "available_at": {"$lte": 0}},
+         [("priority", -1), ("created_at", 1)]),
+        ("tasks", "get-tasks", {"report_id": report_id}, [("created_at", -1)]),
+        ("cognitive_state", "dashboard by phase / confidence",
+         {"phase": "Phase 1 (Fast)", "confidence_label": "High Confidence"}, [("report_id", 1)]),
+    ]
+
+
+async def ensure_indexes(db):
+    created = {}
+    for collection, models in INDEXES.items():
+        created[collection] = await db[collection].create_indexes(models)
+    return created
+
+
+def _index_scans(plan):
+    scans = []
+    if plan.get("stage") == "IXSCAN":
+        scans.append(plan.get("indexName"))
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            scans.extend(_index_scans(plan[key]))
+    for child in plan.get("inputStages", []):
+        scans.extend(_index_scans(child))
+    return scans
+
+
+async def verify_query_plans(db, report_id="sample-report"):
+    report = []
+    for collection, description, query, sort in hot_queries(report_id):
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.limit(1).explain()
+        scans = _index_scans(explain["queryPlanner"]["winningPlan"])
+        report.append({
+            "collection": collection,
+            "query": description,
+            "uses_index": bool(scans),
+            "indexes": scans,
+        })
+    return report
+
+
+async def main():
+    from database import get_client
+
+    client = get_client(os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    db = client["bigfive"]
+    created = await ensure_indexes(db)
+    for collection, names in created.items():
+        print(f"📇 {collection}: {', '.join(names)}")
+
+    print("\nQuery plans:")
+    for entry in await verify_query_plans(db):
+        status = "✅ IXSCAN" if entry["uses_index"] else "❌ COLLSCAN"
+        print(f"  {status:12} {entry['collection']:14} {entry['query']:32} {', '.join(entry['indexes'])}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
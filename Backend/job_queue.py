@@ -0,0 +1,444 @@
+"""
+Durable job queue for NPC generation work.
+
+Jobs ("generate an NPC response for report X with base memory Y") are stored
+in a pluggable backend so they survive restarts:
+
+    MongoJobStore(collection)   - a `jobs` collection, shared by API workers
+    SQLiteJobStore(path)        - a local file (or ":memory:"), for offline use and tests
+
+A worker leases the highest-priority due job for `visibility_timeout`
+seconds. If the worker dies, the lease expires and another worker picks the
+job up again; a job whose lease expires on its last attempt (it crashes or
+hangs its worker every time) is dead-lettered instead of looping. Failures
+are retried with capped exponential backoff. A job that keeps hitting HTTP
+429, or fails too many times, is dead-lettered (status "dead") and kept for
+inspection; `on_dead_letter` lets the owner react, e.g. store a fallback.
+
+Jobs put with a `job_id` are idempotent: putting the same id again is a
+no-op, so a producer can safely re-enqueue after a crash.
+
+Idle workers poll with backoff, from `poll_interval` doubling up to
+`max_poll_interval`, so an empty queue costs a few store round trips a minute
+instead of one per worker per second. put() wakes local workers immediately;
+the poll only matters for jobs enqueued by other processes and for retries
+whose delay has run out.
+
+Priority reuses the task priority formula Vk = Kk * (TRk / TAk) from
+memory.priority, so urgent tasks are generated first.
+
+Times are epoch seconds from the injectable `clock`.
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+import uuid
+
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app_logging import fields, get_logger
+from memory.priority import calculate_priority
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+DEAD = "dead"
+
+logger = get_logger("jobs")
+
+JOB_INDEXES = [
+    IndexModel([("status", ASCENDING), ("priority", DESCENDING), ("created_at", ASCENDING)],
+               name="status_1_priority_-1_created_at_1"),
+    IndexModel([("status", ASCENDING), ("lease_until", ASCENDING)], name="status_1_lease_until_1"),
+]
+
+
+def job_priority(importance_kk=1.0, required_time_trk=1.0, available_time_tak=1.0):
+    priority, _ = calculate_priority(importance_kk, required_time_trk, available_time_tak)
+    return priority
+
+
+def is_rate_limited(error):
+    return getattr(error, "status_code", None) == 429 or "429" in str(error)
+
+
+class MongoJobStore:
+
+    def __init__(self, collection, clock=time.time):
+        self.collection = collection
+        self.clock = clock
+
+    async def ensure_indexes(self):
+        return await self.collection.create_indexes(JOB_INDEXES)
+
+    def _document(self, kind, payload, priority, delay, job_id, now):
+        document = {
+            "kind": kind,
+            "payload": payload,
+            "priority": priority,
+            "status": QUEUED,
+            "attempts": 0,
+            "rate_limited": 0,
+            "available_at": now + delay,
+            "lease_owner": None,
+            "lease_until": None,
+            "last_error": None,
+            "created_at": now,
+        }
+        if job_id is not None:
+            document["_id"] = job_id
+        return document
+
+    async def put(self, kind, payload, priority=0.0, delay=0.0, job_id=None):
+        try:
+            result = await self.collection.insert_one(self._document(kind, payload, priority, delay, job_id, self.clock()))
+        except DuplicateKeyError:
+            return job_id
+        return result.inserted_id
+
+    async def put_many(self, kind, payloads, priority=0.0, job_ids=None):
+        now = self.clock()
+        job_ids = job_ids or [None] * len(payloads)
+        documents = [self._document(kind, payload, priority, 0.0, job_id, now) for payload, job_id in zip(payloads, job_ids)]
+        if not documents:
+            return []
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Ids that are already queued are fine; anything else is a real failure
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+        return [document["_id"] for document in documents]
+
+    async def lease(self, owner, visibility_timeout):
+        now = self.clock()
+        # BEFORE shows whether this reclaims an expired lease; the AFTER fields are set below
+        job = await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": QUEUED, "available_at": {"$lte": now}},
+                {"status": LEASED, "lease_until": {"$lte": now}},
+            ]},
+            {"$set": {"status": LEASED, "lease_owner": owner, "lease_until": now + visibility_timeout},
+             "$inc": {"attempts": 1}},
+            sort=[("priority", DESCENDING), ("created_at", ASCENDING)],
+            return_document=ReturnDocument.BEFORE,
+        )
+        if job is None:
+            return None
+        job["reclaimed"] = job["status"] == LEASED
+        job.update(id=job.pop("_id"), status=LEASED, lease_owner=owner, lease_until=now + visibility_timeout,
+                   attempts=job["attempts"] + 1)
+        return job
+
+    async def _finish(self, job_id, owner, fields, rate_limited=False):
+        # Only the current lease holder may settle a job; a worker whose lease
+        # expired (and was re-leased elsewhere) gets False back
+        update = {"$set": {"lease_owner": None, "lease_until": None, **fields}}
+        if rate_limited:
+            update["$inc"] = {"rate_limited": 1}
+        result = await self.collection.update_one({"_id": job_id, "status": LEASED, "lease_owner": owner}, update)
+        return result.modified_count == 1
+
+    async def ack(self, job_id, owner):
+        return await self._finish(job_id, owner, {"status": DONE, "finished_at": self.clock()})
+
+    async def release(self, job_id, owner, delay, error, rate_limited=False):
+        fields = {"status": QUEUED, "available_at": self.clock() + delay, "last_error": error}
+        return await self._finish(job_id, owner, fields, rate_limited)
+
+    async def dead_letter(self, job_id, owner, error):
+        return await self._finish(job_id, owner, {"status": DEAD, "last_error": error, "finished_at": self.clock()})
+
+    async def counts(self):
+        return {status: await self.collection.count_documents({"status": status})
+                for status in (QUEUED, LEASED, DONE, DEAD)}
+
+    async def dead_letters(self, limit=100):
+        jobs = await self.collection.find({"status": DEAD}, sort=[("finished_at", DESCENDING)], limit=limit).to_list(length=None)
+        for job in jobs:
+            job["id"] = str(job.pop("_id"))
+        return jobs
+
+
+class SQLiteJobStore:
+    """
+    Same interface as MongoJobStore on the standard-library sqlite3 module.
+
+    Statements are short local calls, so they run inline on the event loop.
+    Leasing uses BEGIN IMMEDIATE, which keeps it atomic when several processes
+    share the same file.
+    """
+
+    def __init__(self, path=":memory:", clock=time.time):
+        self.clock = clock
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                priority REAL NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                rate_limited INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_until REAL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, priority DESC, created_at);
+        """)
+
+    async def ensure_indexes(self):
+        return ["jobs_due"]
+
+    def _job(self, row):
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    _INSERT = ("INSERT OR IGNORE INTO jobs (id, kind, payload, priority, status, available_at, created_at) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+    async def put(self, kind, payload, priority=0.0, delay=0.0, job_id=None):
+        now = self.clock()
+        job_id = job_id or uuid.uuid4().hex
+        self.conn.execute(self._INSERT, (job_id, kind, json.dumps(payload), priority, QUEUED, now + delay, now))
+        return job_id
+
+    async def put_many(self, kind, payloads, priority=0.0, job_ids=None):
+        now = self.clock()
+        job_ids = [job_id or uuid.uuid4().hex for job_id in (job_ids or [None] * len(payloads))]
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany(self._INSERT, [
+                (job_id, kind, json.dumps(payload), priority, QUEUED, now, now)
+                for payload, job_id in zip(payloads, job_ids)
+            ])
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return job_ids
+
+    async def lease(self, owner, visibility_timeout):
+        now = self.clock()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                """SELECT id, status FROM jobs
+                   WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_until <= ?)
+                   ORDER BY priority DESC, created_at LIMIT 1""",
+                (QUEUED, now, LEASED, now),
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                (LEASED, owner, now + visibility_timeout, row["id"]),
+            )
+            job = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        job = self._job(job)
+        job["reclaimed"] = row["status"] == LEASED
+        return job
+
+    def _finish(self, job_id, owner, assignments, values):
+        cursor = self.conn.execute(
+            f"UPDATE jobs SET lease_owner = NULL, lease_until = NULL, {assignments} "
+            "WHERE id = ? AND status = ? AND lease_owner = ?",
+            (*values, job_id, LEASED, owner),
+        )
+        return cursor.rowcount == 1
+
+    async def ack(self, job_id, owner):
+        return self._finish(job_id, owner, "status = ?, finished_at = ?", (DONE, self.clock()))
+
+    async def release(self, job_id, owner, delay, error, rate_limited=False):
+        return self._finish(
+            job_id, owner,
+            "status = ?, available_at = ?, last_error = ?, rate_limited = rate_limited + ?",
+            (QUEUED, self.clock() + delay, error, int(rate_limited)),
+        )
+
+    async def dead_letter(self, job_id, owner, error):
+        return self._finish(job_id, owner, "status = ?, last_error = ?, finished_at = ?", (DEAD, error, self.clock()))
+
+    async def counts(self):
+        counts = {status: 0 for status in (QUEUED, LEASED, DONE, DEAD)}
+        for row in self.conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+            counts[row["status"]] = row["n"]
+        return counts
+
+    async def dead_letters(self, limit=100):
+        rows = self.conn.execute(
+            "SELECT * FROM jobs WHERE status = ? ORDER BY finished_at DESC LIMIT ?", (DEAD, limit)
+        ).fetchall()
+        return [self._job(row) for row in rows]
+
+
+class JobQueue:
+
+    def __init__(self, store, handlers, concurrency=4, visibility_timeout=60.0, max_attempts=5,
+                 max_rate_limited=3, base_delay=1.0, max_delay=60.0, poll_interval=1.0,
+                 max_poll_interval=30.0, on_dead_letter=None):
+        self.store = store
+        self.handlers = handlers
+        self.on_dead_letter = on_dead_letter
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.max_rate_limited = max_rate_limited
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max(poll_interval, max_poll_interval)
+        self.owner = uuid.uuid4().hex[:8]
+        self._wakeup = None
+        self._tasks = []
+        self._stopping = False
+        self.succeeded = 0
+        self.retried = 0
+        self.rate_limited = 0
+        self.dead_lettered = 0
+        self.lost_leases = 0
+        self.expired_leases = 0
+
+    @property
+    def running(self):
+        return bool(self._tasks)
+
+    async def put(self, kind, payload, priority=0.0, delay=0.0, job_id=None):
+        job_id = await self.store.put(kind, payload, priority, delay, job_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def put_many(self, kind, payloads, priority=0.0, job_ids=None):
+        ids = await self.store.put_many(kind, payloads, priority, job_ids)
+        if ids and self._wakeup is not None:
+            self._wakeup.set()
+        return ids
+
+    def backoff(self, attempt):
+        return min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+    def idle_delay(self, empty_polls):
+        return min(self.max_poll_interval, self.poll_interval * 2 ** (empty_polls - 1))
+
+    async def _dead_letter(self, job, owner, error):
+        self.dead_lettered += 1
+        settled = await self.store.dead_letter(job["id"], owner, error)
+        logger.error("job dead-lettered", extra=fields(job_id=job["id"], attempts=job["attempts"], error=error))
+        if settled and self.on_dead_letter is not None:
+            try:
+                await self.on_dead_letter(job, error)
+            except Exception:
+                logger.exception("dead-letter handler failed", extra=fields(job_id=job["id"]))
+        return settled
+
+    async def process(self, job, owner):
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            await self._dead_letter(job, owner, f"no handler for job kind '{job['kind']}'")
+            return
+        if job.get("reclaimed") and job["attempts"] > self.max_attempts:
+            # The previous lease was the last attempt and expired: the job
+            # crashed or hung its worker each time, so stop handing it out
+            self.expired_leases += 1
+            await self._dead_letter(job, owner, f"lease expired on attempt {job['attempts'] - 1} of {self.max_attempts}")
+            return
+
+        try:
+            await handler(job["payload"])
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            limited = is_rate_limited(e)
+            if limited:
+                self.rate_limited += 1
+            exhausted = (job["rate_limited"] + 1 >= self.max_rate_limited) if limited \
+                else job["attempts"] >= self.max_attempts
+            if exhausted:
+                settled = await self._dead_letter(job, owner, error)
+            else:
+                self.retried += 1
+                settled = await self.store.release(job["id"], owner, self.backoff(job["attempts"]), error, limited)
+        else:
+            self.succeeded += 1
+            settled = await self.store.ack(job["id"], owner)
+
+        if not settled:
+            # Lease expired mid-run and the job went to another worker
+            self.lost_leases += 1
+
+    async def run_once(self, owner=None):
+        owner = owner or self.owner
+        job = await self.store.lease(owner, self.visibility_timeout)
+        if job is None:
+            return False
+        await self.process(job, owner)
+        return True
+
+    async def drain(self):
+        # Process every job that is due now with `concurrency` workers, then return
+        async def worker(index):
+            while await self.run_once(f"{self.owner}-{index}"):
+                pass
+
+        await asyncio.gather(*(worker(i) for i in range(self.concurrency)))
+
+    async def _work(self, index):
+        owner = f"{self.owner}-{index}"
+        empty_polls = 0
+        # The flag backs up cancel(): on 3.11 wait_for() swallows a cancel that
+        # lands in the same tick as the wakeup put() sets
+        while not self._stopping:
+            try:
+                if await self.run_once(owner):
+                    empty_polls = 0
+                    continue
+            except Exception:
+                logger.exception("job worker error", extra=fields(worker=owner))
+            empty_polls += 1
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.idle_delay(empty_polls))
+                empty_polls = 0
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if not self._tasks:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._tasks = [asyncio.create_task(self._work(i)) for i in range(self.concurrency)]
+
+    async def stop(self):
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+
+    async def stats(self):
+        return {
+            "workers": len(self._tasks),
+            "jobs": await self.store.counts(),
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "rate_limited": self.rate_limited,
+            "dead_lettered": self.dead_lettered,
+            "lost_leases": self.lost_leases,
+            "expired_leases": self.expired_leases,
+        }
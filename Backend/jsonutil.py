@@ -0,0 +1,15 @@
+"""
+JSON encoding for stored documents.
+
+Mongo documents carry datetimes (aware UTC, see timeutil) and ObjectIds,
+which json.dumps cannot encode. Pass json_default as `default=` wherever a
+document is serialized by hand (NDJSON listings, SSE payloads).
+"""
+
+from datetime import datetime
+
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
@@ -1,14 +1,27 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from pymongo import MongoClient
-from datetime import datetime
-from typing import Dict, Optional
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from datetime import timedelta
+from typing import Dict, List, Optional
+import asyncio
+import json
+import logging
 import os
 from dotenv import load_dotenv
 
+from app_logging import configure_logging, fields, get_logger
+from metrics import CONTENT_TYPE, MetricsMiddleware, pipeline_timer, registry
+from timeutil import parse_timestamp, utcnow
+
 load_dotenv()
 
+configure_logging()
+logger = get_logger("api")
+
 app = FastAPI(title="Big Five OCEAN API")
 
 app.add_middleware(
@@ -18,20 +31,21 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
-# MongoDB Connection
-MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
-client = MongoClient(MONGO_URL)
-db = client["bigfive"]  
-ocean_collection = db["ocean_scores"]  
-tasks_collection = db["tasks"]         
+# MongoDB collections and generate_for_report live in generation (shared with monitor.py)
+from generation import (
+    MONGO_URL,
+    GenerationFailed,
+    client,
+    db,
+    generate_for_report,
+    generation_fields,
+    ocean_collection,
+    tasks_collection,
+)
 
-print("=" * 60)
-print("🚀 FastAPI Backend Started!")
-print(f"📊 MongoDB Connected: {MONGO_URL}")
-print(f"📦 Database: bigfive")
-print(f"📁 Collection: ocean_scores")
-print("=" * 60)
+logger.info("FastAPI backend started", extra=fields(mongo_url=MONGO_URL, database="bigfive", collection="ocean_scores"))
 
 # Data models
 class OceanScores(BaseModel):
@@ -55,23 +69,83 @@ class TaskItem(BaseModel):
     report_id: str
     created_at: Optional[str] = None
 
-from pfactor import calculate_p_factor
-from memory.retention import calculate_retention, calculate_retention_from_timestamp
+class NpcBatchRequest(BaseModel):
+    report_ids: List[str]
+    base_memory: str = "The last assigned task"
 
-from memory.confidece import calculate_confidence
+from pfactor import calculate_p_factor, calculate_p_factor_batch
+from memory.retention import (
+    PHASE_LABELS,
+    calculate_retention,
+    calculate_retention_from_timestamps_batch,
+    transition_fields,
+)
+
+from memory.confidece import calculate_confidence, calculate_confidence_batch
 from memory.reconstruction import reconstruct_memory
+from memory.seeding import derive_seed, derive_seeds
 from memory.priority import calculate_priority
-from memory.linguistic import generate_npc_response
+from memory.linguistic import fallback_response, generate_npc_response_async, llm_backend, model_pool
+from memory.response_cache import MongoResponseStore, response_cache
+from memory.ratelimit import quota_limiter
+from memory.prompts import token_usage
+from scheduler import DegradationScheduler
+from cognitive_state import CognitiveStateView
+from streaming import RetentionBroadcaster, event_stream
+from indexes import ensure_indexes, verify_query_plans
+from job_queue import JobQueue, MongoJobStore, SQLiteJobStore, job_priority
+from pagination import MAX_PAGE_SIZE, SORT, decode_cursor, encode_cursor, ndjson_lines, parse_fields, to_json
+
+# Max concurrent LLM generations per batch request
+NPC_BATCH_CONCURRENCY = int(os.getenv("NPC_BATCH_CONCURRENCY", "8"))
+
+# In-process degradation scheduler (replaces the per-NPC monitor loops)
+ENABLE_SCHEDULER = os.getenv("DEGRADATION_SCHEDULER", "0") == "1"
+
+# Bulk ingestion: max items per request, items per insert_many
+MAX_INGEST_BATCH = int(os.getenv("MAX_INGEST_BATCH", "5000"))
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "1000"))
+
+# Deferred generation: default for save-ocean-scores, and the cutoff after which
+# startup recovery treats a pre-queue "generating" claim as abandoned
+DEFER_INITIAL_GENERATION = os.getenv("DEFER_INITIAL_GENERATION", "0") == "1"
+GENERATION_STALE_SECONDS = float(os.getenv("GENERATION_STALE_SECONDS", "300"))
+
+# Durable NPC generation jobs (deferred, bulk and enqueued generation):
+# "mongo" (jobs collection) or "sqlite" (JOB_QUEUE_PATH)
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "mongo")
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+JOB_MAX_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_MAX_POLL_INTERVAL_SECONDS", "30"))
+JOB_VISIBILITY_TIMEOUT_SECONDS = float(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_MAX_RATE_LIMITED = int(os.getenv("JOB_MAX_RATE_LIMITED", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "60"))
+
+# Materialized per-NPC cognitive state for dashboards, refreshed by a background ticker
+ENABLE_COGNITIVE_STATE = os.getenv("COGNITIVE_STATE_VIEW", "0") == "1"
+COGNITIVE_STATE_INTERVAL_SECONDS = float(os.getenv("COGNITIVE_STATE_INTERVAL_SECONDS", "1.0"))
+COGNITIVE_STATE_BAND_WIDTH = float(os.getenv("COGNITIVE_STATE_BAND_WIDTH", "0.05"))
+
+# Background sweep that stores the next crossing for NPCs whose stored one has
+# passed, so upcoming-transitions stays a read-only range query
+TRANSITION_SWEEP_SECONDS = float(os.getenv("TRANSITION_SWEEP_SECONDS", "30"))
+TRANSITION_SWEEP_BATCH = int(os.getenv("TRANSITION_SWEEP_BATCH", "1000"))
+
+INITIAL_BASE_MEMORY = "Initial data ingestion and personality assessment."
+
+# Share cached NPC responses across workers through Mongo when enabled
+if os.getenv("NPC_CACHE_PERSIST", "0") == "1":
+    response_cache.store = MongoResponseStore(db["npc_response_cache"])
 
 @app.post("/api/save-ocean-scores")
-async def save_ocean_scores(data: OceanData):
+async def save_ocean_scores(data: OceanData, defer_generation: Optional[bool] = None):
     
+    timed = pipeline_timer("save_ocean_scores")
     try:
-        print("\n" + "=" * 60)
-        print("RECEIVED DATA FROM FRONTEND")
-        print("=" * 60)
-        print(f"Report ID: {data.report_id}")
-        print(f"Timestamp: {data.timestamp}")
+        logger.debug("received ocean scores", extra=fields(report_id=data.report_id, timestamp=data.timestamp))
         
         # Calculate P-Factor
         ocean_dict = {
@@ -81,29 +155,31 @@ async def save_ocean_scores(data: OceanData):
             "agreeableness": data.ocean_normalized.agreeableness,
             "neuroticism": data.ocean_normalized.neuroticism
         }
-        p_factor = calculate_p_factor(ocean_dict)
-        print(f"\n🧠 Calculated P-Factor: {p_factor}")
+        with timed("p_factor"):
+            p_factor = calculate_p_factor(ocean_dict)
         
         # Calculate Retention for logging (but don't store it)
-        retention_val, phase, _ = calculate_retention(p_factor, days=0)
-        print(f"📊 Calculated Retention (Day 0): {retention_val}")
-        
-        # Calculate Confidence based on retention
-        conf_val, conf_label = calculate_confidence(retention_val) 
-        print(f"   Confidence: {conf_val} ({conf_label})")
+        with timed("retention"):
+            retention_val, phase, _ = calculate_retention(p_factor, days=0)
         
-        recon_msg = reconstruct_memory(retention_val)
-        print(f"   Reconstruction: {recon_msg}")
+        # Calculate Confidence based on retention, seeded by (report_id, game day 0)
+        with timed("confidence"):
+            seed = derive_seed(data.report_id, 0)
+            conf_val, conf_label = calculate_confidence(retention_val, seed=seed) 
+            recon_msg = reconstruct_memory(retention_val, seed=seed)
         
         # Priority Calculation
-        prio_val, prio_msg = calculate_priority(0.8, 2.0, 5.0)
-        print(f"   Priority: {prio_msg}")
-
-        # Trigger initial linguistic generation
-        base_memory = "Initial data ingestion and personality assessment."
-        response_text = generate_npc_response(base_memory, conf_label, phase, retention_val)
+        with timed("priority"):
+            prio_val, prio_msg = calculate_priority(0.8, 2.0, 5.0)
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("scored ocean assessment", extra=fields(
+                report_id=data.report_id, p_factor=p_factor, retention=retention_val,
+                confidence=conf_val, confidence_label=conf_label, reconstruction=recon_msg, priority=prio_msg
+            ))
 
-        # Prepare document for MongoDB without retention fields
+        # Prepare document for MongoDB without retention fields (BSON date, UTC)
+        saved_at = utcnow()
         document = {
             "report_id": data.report_id,
             "timestamp": data.timestamp,
@@ -111,19 +187,52 @@ async def save_ocean_scores(data: OceanData):
             "priority_mock": prio_val,
             "ocean_scores": data.ocean_scores.dict(),
             "ocean_normalized": data.ocean_normalized.dict(),
-            "saved_at": datetime.now().isoformat(),
-            "last_linguistic_response": response_text,
-            "confidence_at_generation": conf_val,
-            "retention_at_generation": retention_val,
-            "generation_timestamp": datetime.now().isoformat()
+            "saved_at": saved_at,
+            # Next 0.40 / 0.30 crossing, so schedulers can range-query instead of polling
+            **transition_fields(p_factor, saved_at, now=saved_at)
         }
         
+        deferred = DEFER_INITIAL_GENERATION if defer_generation is None else defer_generation
+        if deferred:
+            # Persist now; a background worker fills in the response
+            document["generation_status"] = "pending"
+            document["generation_attempts"] = 0
+        else:
+            # Trigger initial linguistic generation
+            with timed("llm"):
+                response_text = await generate_npc_response_async(INITIAL_BASE_MEMORY, conf_label, phase, retention_val)
+            document.update({
+                "last_linguistic_response": response_text,
+                "confidence_at_generation": conf_val,
+                "retention_at_generation": retention_val,
+                "generation_timestamp": utcnow(),
+                "generation_status": "done"
+            })
+        
         # Insert into MongoDB
-        result = ocean_collection.insert_one(document)
+        with timed("mongo_insert"):
+            result = await ocean_collection.insert_one(document)
+        
+        if deferred:
+            with timed("enqueue"):
+                await job_queue.put(INITIAL_GENERATION_JOB, initial_generation_payload(document, {
+                    "game_day": 0,
+                    "retention_val": retention_val,
+                    "phase": phase,
+                    "confidence_score": conf_val,
+                    "confidence_label": conf_label
+                }), prio_val, job_id=initial_generation_job_id(result.inserted_id))
+        
+        if ENABLE_SCHEDULER:
+            degradation_scheduler.track(data.report_id, p_factor, saved_at)
         
-        print(f"\n✅ SAVED TO MONGODB")
-        print(f"   MongoDB ID: {result.inserted_id}")
-        print("=" * 60 + "\n")
+        if ENABLE_COGNITIVE_STATE:
+            with timed("state_view"):
+                await cognitive_state.track(data.report_id, p_factor, saved_at)
+        
+        logger.info("saved ocean scores", extra=fields(
+            report_id=data.report_id, mongodb_id=result.inserted_id, generation_status=document["generation_status"]
+        ))
         
         return {
             "success": True,
@@ -131,11 +240,257 @@ async def save_ocean_scores(data: OceanData):
             "data": {
                 "mongodb_id": str(result.inserted_id),
                 "report_id": data.report_id,
-                "p_factor": p_factor
+                "p_factor": p_factor,
+                "generation_status": document["generation_status"]
             }
         }
     except Exception as e:
-        print(f"\n ERROR SAVING TO MONGODB: {str(e)}")
+        logger.exception("failed to save ocean scores")
+        raise HTTPException(status_code=500, detail=str(e))
+
+INITIAL_GENERATION_JOB = "initial_generation"
+
+def npc_state(report_id, p_factor, game_day=0):
+    
+    # Retention / phase / confidence at a game day: the "state Y" a generation job is for
+    retention_val, phase, _ = calculate_retention(p_factor, days=game_day)
+    conf_val, conf_label = calculate_confidence(retention_val, seed=derive_seed(report_id, game_day))
+    return {
+        "game_day": round(game_day, 2),
+        "retention_val": retention_val,
+        "phase": phase,
+        "confidence_score": conf_val,
+        "confidence_label": conf_label
+    }
+
+def initial_generation_job_id(document_id):
+    # One job per document: re-enqueueing it (recovery, a retried request) is a no-op
+    return f"{INITIAL_GENERATION_JOB}:{document_id}"
+
+def initial_generation_payload(document, state=None):
+    return {
+        "document_id": str(document["_id"]),
+        "report_id": document["report_id"],
+        "state": state or npc_state(document["report_id"], document["p_factor"])
+    }
+
+async def complete_initial_generation(document_id, state=None):
+    
+    # Deferred version of the initial generation done inline by save-ocean-scores.
+    # Claim the document first so a duplicate job (retry, restart, second worker) is a no-op.
+    # A claim older than the job lease belongs to a worker that died mid-job and is taken over.
+    abandoned_before = utcnow() - timedelta(seconds=JOB_VISIBILITY_TIMEOUT_SECONDS)
+    claim = await ocean_collection.update_one(
+        {"_id": document_id, "$or": [
+            {"generation_status": "pending"},
+            {"generation_status": "generating", "generation_started_at": {"$lt": abandoned_before}},
+        ]},
+        {"$set": {"generation_status": "generating", "generation_started_at": utcnow()},
+         "$inc": {"generation_attempts": 1}}
+    )
+    if claim.modified_count == 0:
+        return
+    
+    if state is None:
+        report = await ocean_collection.find_one({"_id": document_id}, ["report_id", "p_factor"])
+        state = npc_state(report["report_id"], report["p_factor"])
+    retention_val, phase = state["retention_val"], state["phase"]
+    conf_val, conf_label = state["confidence_score"], state["confidence_label"]
+    try:
+        response_text = await generate_npc_response_async(
+            INITIAL_BASE_MEMORY, conf_label, phase, retention_val, fallback=False
+        )
+        if response_text is None:
+            raise GenerationFailed("all models failed")
+    except Exception:
+        # Release the claim so the retry can pick it up again
+        await ocean_collection.update_one(
+            {"_id": document_id, "generation_status": "generating"},
+            {"$set": {"generation_status": "pending"}}
+        )
+        raise
+    
+    await ocean_collection.update_one({"_id": document_id, "generation_status": "generating"}, {"$set": {
+        "last_linguistic_response": response_text,
+        "confidence_at_generation": conf_val,
+        "retention_at_generation": retention_val,
+        "generation_timestamp": utcnow(),
+        "generation_status": "done"
+    }})
+
+async def give_up_initial_generation(document_id, error):
+    
+    # Out of retries: store the canned response so the NPC still has something to say
+    report = await ocean_collection.find_one({"_id": document_id, "generation_status": {"$in": ["pending", "generating"]}}, ["report_id", "p_factor"])
+    if not report:
+        return
+    
+    state = npc_state(report["report_id"], report["p_factor"])
+    conf_val, conf_label, retention_val = state["confidence_score"], state["confidence_label"], state["retention_val"]
+    await ocean_collection.update_one({"_id": document_id}, {"$set": {
+        "last_linguistic_response": fallback_response(INITIAL_BASE_MEMORY, conf_label),
+        "confidence_at_generation": conf_val,
+        "retention_at_generation": retention_val,
+        "generation_timestamp": utcnow(),
+        "generation_status": "fallback",
+        "generation_error": str(error)
+    }})
+
+async def run_initial_generation_job(payload):
+    
+    await complete_initial_generation(ObjectId(payload["document_id"]), payload.get("state"))
+
+async def recover_pending_generations():
+    
+    # Jobs are durable, but a crash between the insert and the enqueue leaves a
+    # pending document without one; claims from before the queue may be stuck too.
+    # Re-enqueueing is idempotent (one job id per document), so this is safe to rerun.
+    stale_before = utcnow() - timedelta(seconds=GENERATION_STALE_SECONDS)
+    # Claims written before the timestamp migration are local-time ISO strings
+    legacy_stale_before = stale_before.astimezone().replace(tzinfo=None).isoformat()
+    await ocean_collection.update_many(
+        {"generation_status": "generating", "$or": [
+            {"generation_started_at": {"$lt": stale_before}},
+            {"generation_started_at": {"$lt": legacy_stale_before}},
+        ]},
+        {"$set": {"generation_status": "pending"}}
+    )
+    pending = await ocean_collection.find({"generation_status": "pending"}, ["_id", "report_id", "p_factor"]).to_list(length=None)
+    await job_queue.put_many(
+        INITIAL_GENERATION_JOB,
+        [initial_generation_payload(doc) for doc in pending],
+        job_ids=[initial_generation_job_id(doc["_id"]) for doc in pending],
+    )
+    return len(pending)
+
+def _validation_message(error):
+    return "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors())
+
+async def ingest_chunk(items, first_index, errors):
+    
+    # Validate each item on its own so one bad record doesn't sink the batch
+    valid = []
+    for offset, item in enumerate(items):
+        index = first_index + offset
+        if isinstance(item, Exception):
+            errors.append({"index": index, "report_id": None, "error": str(item)})
+            continue
+        try:
+            valid.append((index, OceanData.model_validate(item)))
+        except ValidationError as e:
+            report_id = item.get("report_id") if isinstance(item, dict) else None
+            errors.append({"index": index, "report_id": report_id, "error": _validation_message(e)})
+    if not valid:
+        return 0
+    
+    # One vectorized p-factor pass for the whole chunk
+    p_factors = calculate_p_factor_batch([data.ocean_normalized.dict() for _, data in valid]).tolist()
+    prio_val, _ = calculate_priority(0.8, 2.0, 5.0)
+    saved_at = utcnow()
+    
+    documents = [{
+        "report_id": data.report_id,
+        "timestamp": data.timestamp,
+        "p_factor": p_factor,
+        "priority_mock": prio_val,
+        "ocean_scores": data.ocean_scores.dict(),
+        "ocean_normalized": data.ocean_normalized.dict(),
+        "saved_at": saved_at,
+        "generation_status": "pending",
+        **transition_fields(p_factor, saved_at, now=saved_at)
+    } for (_, data), p_factor in zip(valid, p_factors)]
+    
+    failed_positions = set()
+    try:
+        await ocean_collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        for write_error in e.details.get("writeErrors", []):
+            position = write_error["index"]
+            failed_positions.add(position)
+            index, data = valid[position]
+            errors.append({"index": index, "report_id": data.report_id, "error": write_error.get("errmsg")})
+    
+    stored = [document for position, document in enumerate(documents) if position not in failed_positions]
+    # One durable write for the chunk's generation jobs
+    await job_queue.put_many(
+        INITIAL_GENERATION_JOB,
+        [initial_generation_payload(document) for document in stored],
+        prio_val,
+        job_ids=[initial_generation_job_id(document["_id"]) for document in stored],
+    )
+    inserted = len(stored)
+    if ENABLE_SCHEDULER:
+        for document in stored:
+            degradation_scheduler.track(document["report_id"], document["p_factor"], saved_at)
+    
+    if ENABLE_COGNITIVE_STATE:
+        await cognitive_state.track_many((document["report_id"], document["p_factor"], saved_at) for document in stored)
+    return inserted
+
+async def _ndjson_items(request):
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+def _parse_line(line):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return ValueError(f"Invalid JSON: {str(e)}")
+
+@app.post("/api/save-ocean-scores/batch")
+async def save_ocean_scores_batch(request: Request):
+    
+    try:
+        errors = []
+        inserted = 0
+        received = 0
+        
+        if "ndjson" in request.headers.get("content-type", ""):
+            # NDJSON: collect the raw lines (at most MAX_INGEST_BATCH) before the
+            # first insert, so a 413 never leaves part of the batch stored
+            lines = []
+            async for line in _ndjson_items(request):
+                lines.append(line)
+                if len(lines) > MAX_INGEST_BATCH:
+                    raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_INGEST_BATCH} items")
+            received = len(lines)
+            for start in range(0, received, INGEST_CHUNK_SIZE):
+                chunk = [_parse_line(line) for line in lines[start:start + INGEST_CHUNK_SIZE]]
+                inserted += await ingest_chunk(chunk, start, errors)
+        else:
+            try:
+                items = json.loads(await request.body())
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
+            if not isinstance(items, list):
+                raise HTTPException(status_code=400, detail="Expected a JSON array of OCEAN assessments")
+            if len(items) > MAX_INGEST_BATCH:
+                raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_INGEST_BATCH} items")
+            received = len(items)
+            for start in range(0, received, INGEST_CHUNK_SIZE):
+                inserted += await ingest_chunk(items[start:start + INGEST_CHUNK_SIZE], start, errors)
+        
+        logger.info("bulk ingest", extra=fields(received=received, inserted=inserted, errors=len(errors)))
+        
+        return {
+            "success": not errors,
+            "received": received,
+            "inserted": inserted,
+            "failed": len(errors),
+            "errors": errors,
+            "generation_status": "pending"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("bulk ingest failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/simulate-memory")
@@ -167,23 +522,16 @@ async def simulate_memory(p_factor: float, days: float, strength: float = 2.8):
 async def get_ocean_scores(report_id: str):
     
     try:
-        print(f"\n Searching for report_id: {report_id}")
-        
-        result = ocean_collection.find_one({"report_id": report_id})
+        result = await ocean_collection.find_one({"report_id": report_id})
         
         if not result:
-            print(f" Report not found: {report_id}\n")
+            logger.debug("report not found", extra=fields(report_id=report_id))
             raise HTTPException(status_code=404, detail="Report not found")
         
         # Convert ObjectId to string
         result["_id"] = str(result["_id"])
         
-        print(f"Found report: {report_id}")
-        print(f"   Normalized scores: O={result['ocean_normalized']['openness']:.3f}, "
-              f"C={result['ocean_normalized']['conscientiousness']:.3f}, "
-              f"E={result['ocean_normalized']['extraversion']:.3f}, "
-              f"A={result['ocean_normalized']['agreeableness']:.3f}, "
-              f"N={result['ocean_normalized']['neuroticism']:.3f}\n")
+        logger.debug("found report", extra=fields(report_id=report_id, **result["ocean_normalized"]))
         
         return {
             "success": True,
@@ -192,40 +540,62 @@ async def get_ocean_scores(report_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        print(f" Error: {str(e)}\n")
+        logger.exception("get-ocean-scores failed", extra=fields(report_id=report_id))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/all-ocean-scores")
-async def get_all_ocean_scores():
+async def get_all_ocean_scores(limit: Optional[int] = None, cursor: Optional[str] = None,
+                               projection_fields: Optional[str] = Query(None, alias="fields"),
+                               format: str = "json"):
 
     try:
-        results = list(ocean_collection.find().sort("saved_at", -1))
+        query = decode_cursor(cursor) if cursor else {}
+        projection = parse_fields(projection_fields)
+        
+        # NDJSON: stream documents as the cursor yields them (bounded memory)
+        if format == "ndjson":
+            results = ocean_collection.find(query, projection, sort=SORT, limit=limit or 0)
+            return StreamingResponse(ndjson_lines(results), media_type="application/x-ndjson")
+        
+        # JSON: one page, newest first; fetch one extra to know if there is more
+        page_size = max(1, min(limit or 100, MAX_PAGE_SIZE))
+        results = await ocean_collection.find(query, projection, sort=SORT, limit=page_size + 1).to_list(length=None)
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        next_cursor = encode_cursor(results[-1]) if has_more else None
         
         # Convert ObjectId to string
         for result in results:
-            result["_id"] = str(result["_id"])
+            to_json(result)
         
-        print(f"\n📊 Retrieved {len(results)} OCEAN score records from MongoDB\n")
+        logger.debug("retrieved ocean score page", extra=fields(count=len(results), has_more=has_more))
         
         return {
             "success": True,
             "count": len(results),
-            "data": results
+            "data": results,
+            "next_cursor": next_cursor
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        print(f" Error: {str(e)}\n")
+        logger.exception("all-ocean-scores failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/delete-ocean-scores/{report_id}")
 async def delete_ocean_scores(report_id: str):
    
     try:
-        result = ocean_collection.delete_one({"report_id": report_id})
+        result = await ocean_collection.delete_one({"report_id": report_id})
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Report not found")
         
-        print(f"🗑️ Deleted report: {report_id}\n")
+        degradation_scheduler.untrack(report_id)
+        if ENABLE_COGNITIVE_STATE:
+            await cognitive_state.untrack(report_id)
+        
+        logger.info("deleted report", extra=fields(report_id=report_id))
         
         return {
             "success": True,
@@ -234,7 +604,7 @@ async def delete_ocean_scores(report_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        print(f" Error: {str(e)}\n")
+        logger.exception("delete failed", extra=fields(report_id=report_id))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/save-task")
@@ -242,15 +612,15 @@ async def save_task(task: TaskItem):
     
     try:
         task_dict = task.dict()
-        task_dict["created_at"] = datetime.now().isoformat()
+        task_dict["created_at"] = utcnow()
         
         # Ensure numeric types
         task_dict["importance_kk"] = float(task_dict["importance_kk"])
         task_dict["required_time_trk"] = float(task_dict["required_time_trk"])
         task_dict["available_time_tak"] = float(task_dict["available_time_tak"])
         
-        result = tasks_collection.insert_one(task_dict)
-        print(f"📝 Task Assigned: {task.task_name} | ID: {result.inserted_id}")
+        result = await tasks_collection.insert_one(task_dict)
+        logger.info("task assigned", extra=fields(report_id=task.report_id, task=task.task_name, task_id=result.inserted_id))
         
         return {
             "success": True,
@@ -258,14 +628,14 @@ async def save_task(task: TaskItem):
             "task_id": str(result.inserted_id)
         }
     except Exception as e:
-        print(f" Error saving task: {str(e)}")
+        logger.exception("failed to save task")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/get-tasks/{report_id}")
 async def get_tasks(report_id: str):
    
     try:
-        tasks = list(tasks_collection.find({"report_id": report_id}).sort("created_at", -1))
+        tasks = await tasks_collection.find({"report_id": report_id}).sort("created_at", -1).to_list(length=None)
         for t in tasks:
             t["_id"] = str(t["_id"])
         
@@ -274,54 +644,571 @@ async def get_tasks(report_id: str):
             "tasks": tasks
         }
     except Exception as e:
-        print(f" Error fetching tasks: {str(e)}")
+        logger.exception("failed to fetch tasks", extra=fields(report_id=report_id))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/generate-npc-response/{report_id}")
 async def generate_response(report_id: str, base_memory: str = "The last assigned task"):
     
     try:
-        # Find the most recent record for this report_id
-        report = ocean_collection.find_one({"report_id": report_id}, sort=[("saved_at", -1)])
+        result = await generate_for_report(report_id, base_memory)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Report not found")
+        
+        logger.debug("generated response", extra=fields(report_id=report_id, response=result["response"][:30]))
+        
+        return {
+            "success": True,
+            **result
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("generation failed", extra=fields(report_id=report_id))
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def run_npc_response_job(payload):
+    
+    # Job handler: a 429 or model failure propagates so the queue retries / dead-letters it
+    await generate_for_report(payload["report_id"], payload.get("base_memory", "The last assigned task"),
+                              fallback=False, state=payload.get("state"))
+
+async def handle_dead_job(job, error):
+    
+    # Out of retries: the NPC still gets the canned response instead of staying "pending"
+    if job["kind"] == INITIAL_GENERATION_JOB:
+        await give_up_initial_generation(ObjectId(job["payload"]["document_id"]), error)
+
+if JOB_QUEUE_BACKEND == "sqlite":
+    job_store = SQLiteJobStore(JOB_QUEUE_PATH)
+else:
+    job_store = MongoJobStore(db["jobs"])
+
+job_queue = JobQueue(
+    job_store,
+    {"npc_response": run_npc_response_job, INITIAL_GENERATION_JOB: run_initial_generation_job},
+    concurrency=JOB_WORKERS,
+    visibility_timeout=JOB_VISIBILITY_TIMEOUT_SECONDS,
+    max_attempts=JOB_MAX_ATTEMPTS,
+    max_rate_limited=JOB_MAX_RATE_LIMITED,
+    base_delay=JOB_RETRY_BASE_SECONDS,
+    max_delay=JOB_RETRY_MAX_SECONDS,
+    poll_interval=JOB_POLL_INTERVAL_SECONDS,
+    max_poll_interval=JOB_MAX_POLL_INTERVAL_SECONDS,
+    on_dead_letter=handle_dead_job,
+)
+
+@app.on_event("startup")
+async def start_job_workers():
+    if JOB_WORKERS > 0:
+        job_queue.start()
+    else:
+        logger.warning("job workers disabled (JOB_WORKERS=0): queued generations wait for another process")
+    recovered = await recover_pending_generations()
+    if recovered:
+        logger.info("re-queued pending NPC generations", extra=fields(count=recovered))
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await job_queue.stop()
+
+@app.post("/api/jobs/npc-response/{report_id}")
+async def enqueue_npc_response(report_id: str, base_memory: str = "The last assigned task",
+                               importance_kk: Optional[float] = None,
+                               required_time_trk: Optional[float] = None,
+                               available_time_tak: Optional[float] = None):
+    
+    if not job_queue.running:
+        raise HTTPException(status_code=503, detail="No job workers are running (set JOB_WORKERS > 0)")
+    
+    try:
+        report = await ocean_collection.find_one({"report_id": report_id}, ["report_id", "p_factor", "saved_at"],
+                                                 sort=[("saved_at", -1)])
         if not report:
             raise HTTPException(status_code=404, detail="Report not found")
         
-        # Calculate current retention
-        start_time = datetime.fromisoformat(report["saved_at"])
-        retention, debug, phase = calculate_retention_from_timestamp(report["p_factor"], start_time)
+        if importance_kk is None:
+            # Rank by the NPC's most recent task when no explicit priority inputs are given
+            task = await tasks_collection.find_one({"report_id": report_id}, sort=[("created_at", -1)])
+            if task:
+                importance_kk = task["importance_kk"]
+                required_time_trk = task["required_time_trk"]
+                available_time_tak = task["available_time_tak"]
         
-        # Calculate confidence
-        conf_val, conf_label = calculate_confidence(retention)
+        priority = 0.0
+        if importance_kk is not None:
+            priority = job_priority(importance_kk, required_time_trk or 1.0,
+                                    available_time_tak if available_time_tak is not None else 1.0)
         
-        # Generate Linguistic Response
-        response_text = generate_npc_response(base_memory, conf_label, phase, retention)
+        # Snapshot of the NPC's state now: the job generates for this state, not the one at run time
+        game_day = (utcnow() - parse_timestamp(report["saved_at"])).total_seconds() / 60
+        state = npc_state(report_id, report["p_factor"], game_day)
+        job_id = await job_queue.put("npc_response", {"report_id": report_id, "base_memory": base_memory, "state": state},
+                                     priority)
         
-        # Persist to DB - Target the specific document using its unique _id
-        update_data = {
-            "last_linguistic_response": response_text,
-            "confidence_at_generation": conf_val,
-            "retention_at_generation": retention,
-            "generation_timestamp": datetime.now().isoformat()
+        return {
+            "success": True,
+            "job_id": str(job_id),
+            "priority": priority,
+            "state": state
         }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("job enqueue failed", extra=fields(report_id=report_id))
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/jobs/stats")
+async def job_stats():
+    
+    return {
+        "success": True,
+        "backend": JOB_QUEUE_BACKEND,
+        **(await job_queue.stats())
+    }
+
+@app.get("/api/jobs/dead-letters")
+async def job_dead_letters(limit: int = 100):
+    
+    jobs = await job_store.dead_letters(max(1, min(limit, 1000)))
+    return {
+        "success": True,
+        "count": len(jobs),
+        "jobs": jobs
+    }
+
+async def handle_degradation_event(event):
+    
+    # Day boundary or threshold crossing: regenerate in-process, no self-HTTP
+    result = await generate_for_report(event["report_id"])
+    if result is None:
+        degradation_scheduler.untrack(event["report_id"])
+        return
+    
+    logger.debug("degradation event", extra=fields(
+        report_id=event["report_id"], kind=event["kind"], game_day=event["game_day"],
+        threshold=event.get("threshold"), response=result["response"][:40]
+    ))
+    
+    # Computed once per tick, fanned out to every live-stream subscriber
+    retention_broadcaster.publish(event["report_id"], event["kind"], {
+        "report_id": event["report_id"],
+        "kind": event["kind"],
+        "game_day": event["game_day"],
+        "threshold": event.get("threshold"),
+        "at": event["fired_at"],
+        "response": result["response"],
+        **result["metadata"]
+    })
+
+async def publish_stream_tick(event):
+    
+    # Stream-only ticks while the degradation scheduler is off: the same
+    # retention / phase / confidence payload, without regenerating the response
+    hold = _stream_holds.get(event["report_id"])
+    if hold is None:
+        return
+    retention_val, phase, _ = calculate_retention(hold["p_factor"], days=event["game_day"])
+    conf_val, conf_label = calculate_confidence(retention_val, seed=derive_seed(event["report_id"], event["game_day"]))
+    retention_broadcaster.publish(event["report_id"], event["kind"], {
+        "report_id": event["report_id"],
+        "kind": event["kind"],
+        "game_day": event["game_day"],
+        "threshold": event.get("threshold"),
+        "at": event["fired_at"],
+        "response": None,
+        "confidence_label": conf_label,
+        "confidence_score": conf_val,
+        "retention_val": retention_val,
+        "phase": phase
+    })
+
+degradation_scheduler = DegradationScheduler(handle_degradation_event, max_concurrency=NPC_BATCH_CONCURRENCY)
+stream_ticker = DegradationScheduler(publish_stream_tick, max_concurrency=NPC_BATCH_CONCURRENCY)
+retention_broadcaster = RetentionBroadcaster()
+_scheduler_task = None
+_stream_ticker_task = None
+
+def ensure_scheduler_running():
+    global _scheduler_task
+    if _scheduler_task is None or _scheduler_task.done():
+        _scheduler_task = asyncio.create_task(degradation_scheduler.run())
+
+@app.on_event("startup")
+async def start_degradation_scheduler():
+    if ENABLE_SCHEDULER:
+        tracked = await degradation_scheduler.load(ocean_collection)
+        ensure_scheduler_running()
+        logger.info("degradation scheduler started", extra=fields(tracked=tracked))
+
+@app.on_event("shutdown")
+async def stop_degradation_scheduler():
+    degradation_scheduler.stop()
+    stream_ticker.stop()
+
+@app.get("/api/scheduler/metrics")
+async def scheduler_metrics():
+    
+    return {
+        "success": True,
+        "enabled": ENABLE_SCHEDULER,
+        "scheduler": degradation_scheduler.metrics(),
+        "stream_ticker": stream_ticker.metrics(),
+        "cognitive_state": cognitive_state.stats(),
+        "streaming": retention_broadcaster.stats()
+    }
+
+cognitive_state = CognitiveStateView(
+    db["cognitive_state"], band_width=COGNITIVE_STATE_BAND_WIDTH, min_interval=COGNITIVE_STATE_INTERVAL_SECONDS
+)
+_cognitive_state_task = None
+
+@app.on_event("startup")
+async def start_cognitive_state_view():
+    global _cognitive_state_task
+    if ENABLE_COGNITIVE_STATE:
+        summary = await cognitive_state.rebuild(ocean_collection)
+        _cognitive_state_task = asyncio.create_task(cognitive_state.run())
+        logger.info("cognitive state view started", extra=fields(**summary))
+
+@app.on_event("shutdown")
+async def stop_cognitive_state_view():
+    cognitive_state.stop()
+
+@app.get("/api/dashboard/cognitive-state")
+async def dashboard_cognitive_state(phase: Optional[str] = None, confidence_label: Optional[str] = None,
+                                    limit: int = 1000):
+    
+    if not ENABLE_COGNITIVE_STATE:
+        raise HTTPException(status_code=503, detail="Cognitive state view is disabled (set COGNITIVE_STATE_VIEW=1)")
+    
+    try:
+        # One indexed read of the materialized view; nothing is re-derived per NPC
+        query = {}
+        if phase:
+            query["phase"] = phase
+        if confidence_label:
+            query["confidence_label"] = confidence_label
+        states = await db["cognitive_state"].find(
+            query, {"_id": 0}, sort=[("report_id", 1)], limit=max(1, min(limit, 10000))
+        ).to_list(length=None)
         
-        ocean_collection.update_one({"_id": report["_id"]}, {"$set": update_data})
-        
-        print(f"🗣️ Generated Response for {report_id}: {response_text[:30]}...")
+        summary = {"by_phase": {}, "by_confidence": {}}
+        for state in states:
+            summary["by_phase"][state["phase"]] = summary["by_phase"].get(state["phase"], 0) + 1
+            summary["by_confidence"][state["confidence_label"]] = summary["by_confidence"].get(state["confidence_label"], 0) + 1
         
         return {
             "success": True,
-            "response": response_text,
-            "metadata": {
-                "confidence_label": conf_label,
-                "confidence_score": conf_val,
-                "retention_val": retention,
-                "phase": phase
+            "count": len(states),
+            "summary": summary,
+            "states": states
+        }
+    except Exception as e:
+        logger.exception("cognitive state dashboard failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# report_id -> open streams, the scheduler ticking it for them, and the version
+# of the tracking a stream added (None if the NPC was already tracked)
+_stream_holds = {}
+
+def stream_scheduler():
+    
+    # The degradation scheduler when it runs (ticks carry a fresh response),
+    # otherwise the stream-only ticker, started on first use
+    global _stream_ticker_task
+    if degradation_scheduler.running:
+        return degradation_scheduler
+    if _stream_ticker_task is None or _stream_ticker_task.done():
+        _stream_ticker_task = asyncio.create_task(stream_ticker.run())
+    return stream_ticker
+
+def hold_for_streams(reports):
+    
+    # Keep streamed NPCs on a scheduler for as long as someone is watching them
+    held = []
+    for report in reports:
+        report_id = report["report_id"]
+        hold = _stream_holds.get(report_id)
+        if hold is None:
+            scheduler = stream_scheduler()
+            version = None
+            if not scheduler.tracking(report_id):
+                version = scheduler.track(report_id, report["p_factor"], parse_timestamp(report["saved_at"]))
+            hold = _stream_holds[report_id] = {
+                "streams": 0, "scheduler": scheduler, "version": version, "p_factor": report["p_factor"]
             }
+        hold["streams"] += 1
+        held.append(report_id)
+    return held
+
+def release_streams(held):
+    
+    for report_id in held:
+        hold = _stream_holds.get(report_id)
+        if hold is None:
+            continue
+        hold["streams"] -= 1
+        if hold["streams"] == 0:
+            del _stream_holds[report_id]
+            if hold["version"] is not None:
+                # Untouched since the stream tracked it (a re-save keeps its own tracking)
+                hold["scheduler"].untrack(report_id, version=hold["version"])
+
+async def retention_events(request, reports, snapshots):
+    
+    # Holds are taken once the body starts streaming and released when it ends,
+    # so a client gone before the first byte never pins anything
+    held = hold_for_streams(reports)
+    try:
+        async for chunk in event_stream(retention_broadcaster, [report["report_id"] for report in reports],
+                                        snapshots, request.is_disconnected):
+            yield chunk
+    finally:
+        release_streams(held)
+
+@app.get("/api/stream/retention")
+async def stream_retention(request: Request, report_ids: str):
+    
+    ids = [report_id.strip() for report_id in report_ids.split(",") if report_id.strip()]
+    if not ids:
+        raise HTTPException(status_code=400, detail="report_ids is required")
+    
+    reports = await fetch_latest_reports(ids, extra_fields=("last_linguistic_response",))
+    if not reports:
+        raise HTTPException(status_code=404, detail="Report not found")
+    
+    # Current state as the opening snapshot for each stream
+    found = list(reports.values())
+    retentions, phase_codes, game_days = calculate_retention_from_timestamps_batch(
+        [report["p_factor"] for report in found],
+        [parse_timestamp(report["saved_at"]) for report in found],
+    )
+    conf_vals, conf_labels = calculate_confidence_batch(
+        retentions, derive_seeds([report["report_id"] for report in found], game_days)
+    )
+    snapshots = []
+    for report, retention, phase_code, days, conf_val, conf_label in zip(
+        found, retentions.tolist(), phase_codes.tolist(), game_days.tolist(), conf_vals.tolist(), conf_labels
+    ):
+        snapshots.append({
+            "report_id": report["report_id"],
+            "game_day": round(days, 2),
+            "retention_val": retention,
+            "phase": PHASE_LABELS[phase_code],
+            "confidence_label": conf_label,
+            "confidence_score": conf_val,
+            "response": report.get("last_linguistic_response")
+        })
+        
+    
+    return StreamingResponse(
+        retention_events(request, found, snapshots),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.on_event("startup")
+async def create_indexes():
+    try:
+        await ensure_indexes(db)
+    except Exception:
+        # Mongo unreachable or refusing the spec: serve anyway, queries just run unindexed
+        logger.exception("index bootstrap failed; starting without it")
+        return
+    
+    if os.getenv("VERIFY_QUERY_PLANS", "0") == "1":
+        for entry in await verify_query_plans(db):
+            if not entry["uses_index"]:
+                logger.warning("query plan is a collection scan", extra=fields(collection=entry["collection"], query=entry["query"]))
+
+async def advance_overdue_transitions(now, limit=TRANSITION_SWEEP_BATCH):
+    
+    # Crossings already in the past, oldest first: store the next one (None past
+    # the floor), so they drop out of the upcoming range instead of crowding it
+    cursor = ocean_collection.find(
+        {"next_transition_at": {"$lt": now}}, ["p_factor", "saved_at"],
+        sort=[("next_transition_at", 1)], limit=limit
+    )
+    operations = [
+        UpdateOne(
+            {"_id": doc["_id"]},
+            {"$set": transition_fields(doc["p_factor"], parse_timestamp(doc["saved_at"]), now=now)}
+        )
+        async for doc in cursor
+    ]
+    if operations:
+        await ocean_collection.bulk_write(operations, ordered=False)
+    return len(operations)
+
+async def sweep_overdue_transitions():
+    
+    while True:
+        try:
+            # Full batches mean a backlog: keep going until it is worked off
+            while await advance_overdue_transitions(utcnow()) == TRANSITION_SWEEP_BATCH:
+                pass
+        except Exception:
+            logger.exception("transition sweep failed")
+        await asyncio.sleep(TRANSITION_SWEEP_SECONDS)
+
+_transition_sweep_task = None
+
+@app.on_event("startup")
+async def start_transition_sweep():
+    global _transition_sweep_task
+    if TRANSITION_SWEEP_SECONDS > 0:
+        _transition_sweep_task = asyncio.create_task(sweep_overdue_transitions())
+
+@app.on_event("shutdown")
+async def stop_transition_sweep():
+    if _transition_sweep_task is not None:
+        _transition_sweep_task.cancel()
+
+@app.get("/api/upcoming-transitions")
+async def upcoming_transitions(within_seconds: float = 60, limit: int = 500):
+    
+    try:
+        now = utcnow()
+        horizon = now + timedelta(seconds=within_seconds)
+        
+        # Indexed range query over crossings still ahead of us
+        cursor = ocean_collection.find(
+            {"next_transition_at": {"$gte": now, "$lte": horizon}},
+            {"report_id": 1, "p_factor": 1, "next_transition_at": 1, "next_transition_threshold": 1},
+            sort=[("next_transition_at", 1)],
+            limit=limit,
+        )
+        transitions = []
+        async for doc in cursor:
+            transitions.append({
+                "report_id": doc["report_id"],
+                "p_factor": doc["p_factor"],
+                "threshold": doc["next_transition_threshold"],
+                "next_transition_at": parse_timestamp(doc["next_transition_at"]).isoformat(),
+                "seconds_until": round((parse_timestamp(doc["next_transition_at"]) - now).total_seconds(), 2)
+            })
+        
+        return {
+            "success": True,
+            "count": len(transitions),
+            "transitions": transitions
+        }
+    except Exception as e:
+        logger.exception("upcoming-transitions failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def fetch_latest_reports(report_ids, extra_fields=()):
+    # One $in query; sorted so the first document seen per report_id is the latest
+    cursor = ocean_collection.find(
+        {"report_id": {"$in": report_ids}},
+        ["report_id", "p_factor", "saved_at", *extra_fields],
+        sort=[("report_id", 1), ("saved_at", -1)],
+    )
+    latest = {}
+    async for report in cursor:
+        latest.setdefault(report["report_id"], report)
+    return latest
+
+@app.post("/api/generate-npc-responses")
+async def generate_responses(batch: NpcBatchRequest):
+    
+    try:
+        report_ids = list(dict.fromkeys(batch.report_ids))
+        reports = await fetch_latest_reports(report_ids)
+        missing = [report_id for report_id in report_ids if report_id not in reports]
+        
+        # Score the whole batch in one vectorized pass before touching the LLM
+        found = [reports[report_id] for report_id in report_ids if report_id in reports]
+        retentions, phase_codes, game_days = calculate_retention_from_timestamps_batch(
+            [report["p_factor"] for report in found],
+            [parse_timestamp(report["saved_at"]) for report in found],
+        )
+        conf_vals, conf_labels = calculate_confidence_batch(
+            retentions, derive_seeds([report["report_id"] for report in found], game_days)
+        )
+        states = [
+            (report, retention, PHASE_LABELS[phase_code], conf_val, conf_label)
+            for report, retention, phase_code, conf_val, conf_label
+            in zip(found, retentions.tolist(), phase_codes.tolist(), conf_vals.tolist(), conf_labels)
+        ]
+        
+        # Identical states collapse onto one call through the response cache
+        semaphore = asyncio.Semaphore(NPC_BATCH_CONCURRENCY)
+        
+        async def generate(state):
+            report, retention, phase, conf_val, conf_label = state
+            async with semaphore:
+                return await generate_npc_response_async(batch.base_memory, conf_label, phase, retention)
+        
+        texts = await asyncio.gather(*(generate(state) for state in states))
+        
+        generated_at = utcnow()
+        operations = []
+        results = []
+        for (report, retention, phase, conf_val, conf_label), response_text in zip(states, texts):
+            operations.append(UpdateOne(
+                {"_id": report["_id"]},
+                {"$set": generation_fields(report, response_text, conf_val, retention, generated_at)}
+            ))
+            results.append({
+                "report_id": report["report_id"],
+                "response": response_text,
+                "metadata": {
+                    "confidence_label": conf_label,
+                    "confidence_score": conf_val,
+                    "retention_val": retention,
+                    "phase": phase
+                }
+            })
+        
+        if operations:
+            await ocean_collection.bulk_write(operations, ordered=False)
+        
+        logger.info("batch generation", extra=fields(generated=len(results), missing=len(missing)))
+        
+        return {
+            "success": True,
+            "count": len(results),
+            "results": results,
+            "missing": missing
         }
     except Exception as e:
-        print(f" Generation Error: {str(e)}")
+        logger.exception("batch generation failed")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/npc-cache/stats")
+async def npc_cache_stats():
+    
+    return {
+        "success": True,
+        "cache": response_cache.stats()
+    }
+
+@app.get("/api/llm/limits")
+async def llm_limits():
+    
+    return {
+        "success": True,
+        "backend": llm_backend.name,
+        "limits": quota_limiter.stats(),
+        "clients": model_pool.stats()
+    }
+
+@app.get("/api/llm/usage")
+async def llm_usage():
+    
+    return {
+        "success": True,
+        "usage": token_usage.stats()
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    
+    # Prometheus scrape endpoint: route latency, pipeline stages, LLM fallthrough
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
 @app.get("/")
 async def root():
     
@@ -331,12 +1218,25 @@ async def root():
         "database": "MongoDB connected",
         "endpoints": {
             "POST /api/save-ocean-scores": "Save OCEAN test results to MongoDB",
+            "POST /api/save-ocean-scores/batch": "Bulk-save OCEAN results (JSON array or NDJSON)",
             "GET /api/get-ocean-scores/{report_id}": "Get results by report ID",
-            "GET /api/all-ocean-scores": "Get all saved results",
+            "GET /api/all-ocean-scores": "Get saved results (paged: limit, cursor, fields, format=ndjson)",
             "DELETE /api/delete-ocean-scores/{report_id}": "Delete results by report ID",
             "POST /api/save-task": "Assign a task to an NPC",
             "GET /api/get-tasks/{report_id}": "Get all tasks for a specific NPC",
-            "POST /api/generate-npc-response/{report_id}": "Generate linguistic NPC response"
+            "POST /api/generate-npc-response/{report_id}": "Generate linguistic NPC response",
+            "POST /api/generate-npc-responses": "Generate NPC responses for many report IDs at once",
+            "GET /api/upcoming-transitions": "NPCs crossing the 40% / 30% thresholds in the next N seconds",
+            "GET /api/scheduler/metrics": "Degradation scheduler queue depth and lag",
+            "GET /api/stream/retention?report_ids=a,b": "Server-sent events with live retention per game-day tick",
+            "GET /api/npc-cache/stats": "NPC response cache hit/miss counters",
+            "GET /api/llm/limits": "Per-model Gemini quota buckets, circuit breakers, fallbacks and client pool",
+            "GET /api/llm/usage": "Prompt / response token usage per style bucket",
+            "POST /api/jobs/npc-response/{report_id}": "Queue a durable NPC generation job (prioritized by task Vk)",
+            "GET /api/jobs/stats": "Job queue counts, retries and dead letters",
+            "GET /api/jobs/dead-letters": "Jobs that exhausted their retries",
+            "GET /api/dashboard/cognitive-state": "Materialized retention / phase / confidence for every NPC (COGNITIVE_STATE_VIEW=1)",
+            "GET /metrics": "Prometheus metrics: per-route latency, pipeline stage timings, LLM fallthrough / fallback"
         }
     }
 
@@ -345,7 +1245,7 @@ async def health_check():
    
     try:
         # Test MongoDB connection
-        client.server_info()
+        await client.server_info()
         return {
             "status": "healthy",
             "mongodb": "connected",
@@ -364,7 +1264,5 @@ app = app
 
 if __name__ == "__main__":
     import uvicorn
-    print("\n🔥 Starting FastAPI server...")
-    print("📍 Server will run on: http://localhost:8000")
-    print("📚 API docs available at: http://localhost:8000/docs\n")
+    logger.info("starting FastAPI server on http://localhost:8000 (docs at /docs)")
     uvicorn.run(app, host="0.0.0.0", port=8000)
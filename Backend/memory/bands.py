@@ -0,0 +1,21 @@
+import numpy as np
+
+# Lower bounds of the five confidence / reconstruction bands, highest first
+THRESHOLDS = (0.8, 0.6, 0.4, 0.3)
+
+def band_label(value, labels):
+    # Unrolled THRESHOLDS: this runs once per NPC per call on the scalar path
+    if value >= 0.8:
+        return labels[0]
+    if value >= 0.6:
+        return labels[1]
+    if value >= 0.4:
+        return labels[2]
+    if value >= 0.3:
+        return labels[3]
+    return labels[4]
+
+def band_labels(values, labels):
+    # Vectorized band_label
+    codes = np.searchsorted(-np.array(THRESHOLDS), -values, side="left")
+    return [labels[code] for code in codes]
@@ -0,0 +1,98 @@
+"""
+Pool of warm LLM model handles.
+
+One handle is built per model name on first use and then reused, so its
+HTTP session stays open across requests. The SDK is configured lazily, on
+the first handle, instead of at import time.
+
+The pool also learns from the results it sees:
+    - the model that last succeeded is tried first next time
+    - models that answer "not found" / "unsupported" (e.g. retired names)
+      are skipped for `dead_ttl` seconds instead of costing a failing
+      round-trip on every request
+"""
+
+import threading
+import time
+
+DEAD_MARKERS = ("404", "not found", "is not supported", "deprecated")
+
+
+def is_dead_model_error(error):
+    message = str(error).lower()
+    return any(marker in message for marker in DEAD_MARKERS)
+
+
+class ModelPool:
+
+    def __init__(self, factory, configure=None, dead_ttl=6 * 3600.0, clock=time.monotonic):
+        self.factory = factory
+        self.configure = configure
+        self.dead_ttl = dead_ttl
+        self.clock = clock
+        self._handles = {}
+        self._dead = {}
+        self._lock = threading.Lock()
+        self._configured = configure is None
+        self.last_success = None
+        self.created = 0
+        self.reused = 0
+        self.skipped = 0
+
+    def get(self, model_name):
+        handle = self._handles.get(model_name)
+        if handle is not None:
+            self.reused += 1
+            return handle
+        # Sync callers run on the LLM thread pool, so guard construction
+        with self._lock:
+            if not self._configured:
+                self.configure()
+                self._configured = True
+            handle = self._handles.get(model_name)
+            if handle is None:
+                handle = self.factory(model_name)
+                self._handles[model_name] = handle
+                self.created += 1
+        return handle
+
+    def is_dead(self, model_name):
+        marked_at = self._dead.get(model_name)
+        if marked_at is None:
+            return False
+        if self.clock() - marked_at >= self.dead_ttl:
+            del self._dead[model_name]
+            return False
+        return True
+
+    def order(self, model_names):
+        live = [name for name in model_names if not self.is_dead(name)]
+        self.skipped += len(model_names) - len(live)
+        if not live:
+            # Everything looks dead: try the full list rather than go silent
+            return list(model_names)
+        if self.last_success in live:
+            live.remove(self.last_success)
+            live.insert(0, self.last_success)
+        return live
+
+    def record_success(self, model_name):
+        self.last_success = model_name
+        self._dead.pop(model_name, None)
+
+    def record_error(self, model_name, error):
+        if is_dead_model_error(error):
+            self._dead[model_name] = self.clock()
+            self._handles.pop(model_name, None)
+            if self.last_success == model_name:
+                self.last_success = None
+
+    def stats(self):
+        return {
+            "handles": sorted(self._handles),
+            "last_success": self.last_success,
+            "dead_models": sorted(name for name in list(self._dead) if self.is_dead(name)),
+            "created": self.created,
+            "reused": self.reused,
+            "skipped_dead": self.skipped,
+        }
@@ -1,26 +1,41 @@
+import logging
 import random
 
-def calculate_confidence(retention):
-    
-    print(f"Confidence calculation triggered for Retention: {retention}")
+import numpy as np
+
+from app_logging import fields, get_logger
+from memory.bands import band_label, band_labels
+from memory.seeding import CONFIDENCE_SALT, seeded_uniform_one, variations
+
+LABELS = ("High Confidence", "Medium Confidence", "Low Confidence", "Very Low Confidence", "Confused")
+
+logger = get_logger("memory.confidence")
+
+def calculate_confidence(retention, seed=None, rng=None):
     
     # Random variation between -0.15 and +0.15
-    variation = random.uniform(-0.15, 0.15)
+    # seed (see memory.seeding.derive_seed) or a numpy Generator makes it reproducible
+    if rng is not None:
+        variation = rng.uniform(-0.15, 0.15)
+    elif seed is not None:
+        variation = seeded_uniform_one(seed, -0.15, 0.15, CONFIDENCE_SALT)
+    else:
+        variation = random.uniform(-0.15, 0.15)
     confidence = retention + variation
     
     # Clamp confidence between 0.0 and 1.0
     confidence = max(0.0, min(1.0, confidence))
     
     # Determine confidence band
-    if confidence >= 0.8:
-        label = "High Confidence"
-    elif confidence >= 0.6:
-        label = "Medium Confidence"
-    elif confidence >= 0.4:
-        label = "Low Confidence"
-    elif confidence >= 0.3:
-        label = "Very Low Confidence"
-    else:
-        label = "Confused"
-        
-    return round(confidence, 4), label
+    # Built-in round: numpy scalars cost several times the whole calculation
+    result = round(confidence, 4), band_label(confidence, LABELS)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("confidence", extra=fields(retention=retention, confidence=result[0], label=result[1]))
+    return result
+
+def calculate_confidence_batch(retentions, seeds=None, rng=None):
+    
+    # Vectorized calculate_confidence; matches the scalar path for the same seeds / rng stream
+    retentions = np.asarray(retentions, dtype=np.float64)
+    confidence = np.clip(retentions + variations(retentions.size, 0.15, seeds, rng, CONFIDENCE_SALT), 0.0, 1.0)
+    return np.round(confidence, 4), band_labels(confidence, LABELS)
@@ -1,84 +1,236 @@
 import os
-import google.generativeai as genai
+import random
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from app_logging import fields, get_logger
+from metrics import LLM_ATTEMPTS, LLM_FALLBACKS, LLM_FALLTHROUGH
+from memory.llm_backend import get_backend
+from memory.prompts import render_prompt, token_usage
+from memory.ratelimit import quota_limiter
+from memory.response_cache import cache_key, response_cache
+
 load_dotenv()
 
-# Configure Gemini
-api_key = os.getenv("GEMINI_API_KEY")
-if api_key:
-    genai.configure(api_key=api_key)
-else:
-    print("⚠️ WARNING: GEMINI_API_KEY not found in environment.")
+logger = get_logger("memory.linguistic")
+
+# Gemini by default; LLM_BACKEND=fake runs fully offline
+llm_backend = get_backend()
+if not llm_backend.available:
+    logger.warning("GEMINI_API_KEY not found in environment; using canned responses")
+
+# Warm model handles for the active backend
+model_pool = llm_backend.pool
+
+# Async generation settings
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "15"))
+LLM_HEDGE_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "2.0"))
+LLM_THREAD_POOL_SIZE = int(os.getenv("LLM_THREAD_POOL_SIZE", "8"))
+
+# How long a request may wait for a throttled model's bucket to refill,
+# and the output tokens reserved against the tokens/min quota per call
+LLM_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("LLM_LIMIT_MAX_WAIT_SECONDS", "1.0"))
+LLM_OUTPUT_TOKEN_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKEN_ESTIMATE", "100"))
+
+_executor = ThreadPoolExecutor(max_workers=LLM_THREAD_POOL_SIZE, thread_name_prefix="llm")
+
+def build_prompt(base_memory, confidence_label, phase, retention_pct):
+
+    # Style bucket templates are precompiled in memory.prompts
+    prompt, _, _, _ = render_prompt(base_memory, confidence_label, phase, retention_pct)
+    return prompt
 
 def generate_npc_response(base_memory, confidence_label, phase, retention_pct):
     
-    if not api_key:
+    if not llm_backend.available:
         return f"[Fallback] I remember {base_memory} with {confidence_label} confidence."
 
-    # Map Phase and Retention to Linguistic Style
-    # Phase 1 (>40%): Direct Recall (Ref: Kornell et al., 2011)
-    # Phase 2 (<40%): Reconstructive Language (Ref: Kornell et al., 2011)
-    # <30%: Gist-only (Ref: Parks & Yonelinas, 2009)
-    
-    ret_value = min(1.0, retention_pct) * 100
-    
-    style_guide = ""
-    if retention_pct < 0.30:
-        style_guide = "Use Gist-only language. Do not provide specific details. Sound vague and focus only on the general idea. Example: 'I don't have the details, but the general idea was...'"
-    elif phase == "Phase 2 (Slow)" or retention_pct < 0.40:
-        style_guide = "Use Reconstructive language. Sound uncertain and speculative. Use fillers like 'I think', 'maybe', 'if I recall correctly'. Example: 'If I recall correctly, I think it was...'"
-    else:
-        style_guide = "Use Direct Recall language. Sound clear, precise, and certain about the facts. Example: 'I clearly remember it happened at...'"
-
-    prompt = f"""
-    You are an AI NPC in a high-fidelity simulation. 
-    Your current cognitive state is:
-    - Memory Retention: {ret_value:.1f}%
-    - Confidence Level: {confidence_label}
-    - Decay Phase: {phase}
-    
-    Style Guide: {style_guide}
-    
-    Memory to recall: "{base_memory}"
-    
-    Response requirements:
-    1. Stay in character as a futuristic NPC.
-    2. Do NOT mention your retention percentage or confidence level explicitly in the spoken text.
-    3. Reflect the required linguistic style perfectly based on the Style Guide.
-    4. Keep the response concise (1-2 sentences).
-    
-    NPC Response:
-    """
-
-    # Updated list to prioritize more widely available Free Tier models
-    model_names = [
-        'gemini-1.5-flash', 
-        'gemini-1.5-flash-latest', 
-        'gemini-1.5-flash-lite-latest',
-        'gemini-2.0-flash-lite',
-        'gemini-2.0-flash'
-    ]
+    prompt, bucket, prompt_tokens, truncated = render_prompt(base_memory, confidence_label, phase, retention_pct)
+    token_usage.record_prompt(bucket, prompt_tokens, truncated)
     
     last_error = ""
-    for model_name in model_names:
+    for index, model_name in enumerate(model_pool.order(llm_backend.model_names)):
+        if index:
+            LLM_FALLTHROUGH.inc(reason="error")
         try:
-            model = genai.GenerativeModel(model_name)
+            model = model_pool.get(model_name)
             response = model.generate_content(prompt)
-            return response.text.strip().replace('"', '')
+            model_pool.record_success(model_name)
+            LLM_ATTEMPTS.inc(model=model_name, outcome="success")
+            text = response.text.strip().replace('"', '')
+            token_usage.record_response(text)
+            return text
         except Exception as e:
             last_error = str(e)
+            model_pool.record_error(model_name, e)
             if "429" in last_error:
                 # If we hit quota, don't keep hammering, just log and move to fallback
-                print(f"⚠️ [Linguistic Engine] Quota Exceeded (429) for {model_name}. Attempting fallback...")
+                LLM_ATTEMPTS.inc(model=model_name, outcome="rate_limited")
+                logger.warning("quota exceeded (429)", extra=fields(model=model_name))
                 break
+            LLM_ATTEMPTS.inc(model=model_name, outcome="error")
             continue
 
+    LLM_FALLBACKS.inc(path="sync")
+    return fallback_response(base_memory, confidence_label)
+
+class QuotaExceeded(Exception):
+    """Every model tried was rate limited (HTTP 429)."""
+
+    status_code = 429
+
+
+async def _attempt(model_factory, model_name, prompt, timeout):
+    model = model_factory(model_name)
+    if hasattr(model, "generate_content_async"):
+        call = model.generate_content_async(prompt)
+    else:
+        # Sync-only clients run on the bounded pool so the event loop stays free
+        call = asyncio.get_running_loop().run_in_executor(_executor, model.generate_content, prompt)
+    response = await asyncio.wait_for(call, timeout)
+    return response.text.strip().replace('"', '')
+
+async def _hedged_generate(prompt, model_names, model_factory, timeout, hedge_delay, limiter=None, pool=None,
+                           prompt_tokens=None):
+    # Start with the first model; launch the next one when the current attempt
+    # fails or has not answered within hedge_delay. First success wins.
+    # With a limiter, throttled or circuit-open models are skipped.
+    remaining = list(model_names)
+    in_flight = {}
+    quota_hit = False
+    tokens = (prompt_tokens or 0) + LLM_OUTPUT_TOKEN_ESTIMATE
+
+    def launch(model_name):
+        task = asyncio.create_task(_attempt(model_factory, model_name, prompt, timeout))
+        in_flight[task] = model_name
+
+    def launch_next(reason=None):
+        while remaining:
+            model_name = remaining.pop(0)
+            if limiter is None or limiter.try_acquire(model_name, tokens):
+                if reason is not None:
+                    LLM_FALLTHROUGH.inc(reason=reason)
+                launch(model_name)
+                return
+
+    if limiter is None:
+        launch_next()
+    else:
+        first = await limiter.acquire(remaining, tokens, LLM_LIMIT_MAX_WAIT_SECONDS)
+        if first is None:
+            # Every model is over quota locally: don't spend a round-trip on a certain 429
+            raise QuotaExceeded("429: local rate limit reached for all models")
+        remaining.remove(first)
+        launch(first)
+    try:
+        while in_flight:
+            can_hedge = remaining and not quota_hit
+            done, _ = await asyncio.wait(
+                in_flight, timeout=hedge_delay if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                launch_next("hedge")
+                continue
+
+            for task in done:
+                model_name = in_flight.pop(task)
+                error = task.exception()
+                if error is None:
+                    LLM_ATTEMPTS.inc(model=model_name, outcome="success")
+                    if limiter is not None:
+                        limiter.record_success(model_name)
+                    if pool is not None:
+                        pool.record_success(model_name)
+                    return task.result()
+                if pool is not None:
+                    pool.record_error(model_name, error)
+                if "429" in str(error):
+                    LLM_ATTEMPTS.inc(model=model_name, outcome="rate_limited")
+                    logger.warning("quota exceeded (429)", extra=fields(model=model_name))
+                    quota_hit = True
+                    if limiter is not None:
+                        limiter.record_rate_limited(model_name)
+                    continue
+                if isinstance(error, asyncio.TimeoutError):
+                    LLM_ATTEMPTS.inc(model=model_name, outcome="timeout")
+                    logger.warning("model timed out", extra=fields(model=model_name, timeout=timeout))
+                else:
+                    LLM_ATTEMPTS.inc(model=model_name, outcome="error")
+                    logger.info("model attempt failed", extra=fields(model=model_name, error=str(error)[:200]))
+                if limiter is not None:
+                    limiter.record_error(model_name)
+
+            if not quota_hit and not in_flight:
+                launch_next("error")
+        if quota_hit:
+            raise QuotaExceeded("429: quota exceeded for all attempted models")
+        return None
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+async def generate_npc_response_async(base_memory, confidence_label, phase, retention_pct,
+                                      timeout=None, hedge_delay=None, model_names=None,
+                                      model_factory=None, cache=response_cache, fallback=True,
+                                      limiter=quota_limiter, pool=None, token_budget=None, usage=token_usage):
+    
+    if model_factory is None:
+        if pool is None:
+            if not llm_backend.available:
+                return f"[Fallback] I remember {base_memory} with {confidence_label} confidence."
+            pool = model_pool
+        model_factory = pool.get
+
+    names = model_names or llm_backend.model_names
+    if pool is not None:
+        # Last good model first, known-dead names dropped
+        names = pool.order(names)
+
+    async def generate():
+        prompt, bucket, prompt_tokens, truncated = render_prompt(
+            base_memory, confidence_label, phase, retention_pct, budget=token_budget
+        )
+        if usage is not None:
+            usage.record_prompt(bucket, prompt_tokens, truncated)
+        text = await _hedged_generate(
+            prompt,
+            names,
+            model_factory,
+            timeout if timeout is not None else LLM_TIMEOUT_SECONDS,
+            hedge_delay if hedge_delay is not None else LLM_HEDGE_DELAY_SECONDS,
+            limiter,
+            pool,
+            prompt_tokens,
+        )
+        if text is not None and usage is not None:
+            usage.record_response(text)
+        return text
+
+    try:
+        if cache is None:
+            text = await generate()
+        else:
+            key = cache_key(base_memory, confidence_label, phase, retention_pct)
+            text = await cache.get_or_generate(key, generate)
+    except QuotaExceeded:
+        # Callers with their own retry policy (job queue) need to see the 429
+        if not fallback:
+            raise
+        text = None
+
+    if text is not None or not fallback:
+        return text
+    if limiter is not None:
+        limiter.record_fallback()
+    LLM_FALLBACKS.inc(path="async")
+    return fallback_response(base_memory, confidence_label)
+
+def fallback_response(base_memory, confidence_label):
+
     # If all models fail, provide a high-fidelity semi-dynamic response
     # This ensures the user can ALWAYS demonstrate the project even during API outages.
-    print(f"📡 [Linguistic Engine] API Bypass Active: Simulating neural output for '{confidence_label}' state.")
-    
-    import random
+    logger.info("using fallback response", extra=fields(confidence_label=confidence_label))
     
     # Research-backed personality-driven fallbacks
     fallbacks = {
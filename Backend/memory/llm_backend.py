@@ -0,0 +1,161 @@
+"""
+LLM backends for the linguistic engine.
+
+A backend supplies the model names to try and a ModelPool of handles. A
+handle exposes the `generate_content` / `generate_content_async` calls of
+`genai.GenerativeModel`, returning an object with `.text`.
+
+    GeminiBackend  - google.generativeai (needs GEMINI_API_KEY)
+    FakeBackend    - offline stand-in: deterministic replies, injectable
+                     latency, errors and 429s, for tests, benchmarks and
+                     load runs with no network
+
+Selected with LLM_BACKEND=gemini|fake. The fake backend reads its knobs
+from FAKE_LLM_* variables (see fake_backend_from_env).
+"""
+
+import asyncio
+import hashlib
+import os
+import random
+import re
+import time
+
+from memory.client_pool import ModelPool
+
+# Updated list to prioritize more widely available Free Tier models
+MODEL_NAMES = [
+    'gemini-1.5-flash',
+    'gemini-1.5-flash-latest',
+    'gemini-1.5-flash-lite-latest',
+    'gemini-2.0-flash-lite',
+    'gemini-2.0-flash'
+]
+
+
+class GeminiBackend:
+
+    name = "gemini"
+
+    def __init__(self, api_key, model_names=None, dead_ttl=6 * 3600.0):
+        import google.generativeai as genai
+
+        self.api_key = api_key
+        self.model_names = list(model_names or MODEL_NAMES)
+        # One warm GenerativeModel per name; genai is configured on first use
+        self.pool = ModelPool(
+            genai.GenerativeModel,
+            configure=lambda: genai.configure(api_key=api_key),
+            dead_ttl=dead_ttl,
+        )
+
+    @property
+    def available(self):
+        return bool(self.api_key)
+
+
+class FakeResponse:
+
+    def __init__(self, text):
+        self.text = text
+
+
+_MEMORY_PATTERN = re.compile(r'Memory to recall: "(.*?)"', re.S)
+
+
+def default_reply(model_name, prompt):
+    # Deterministic per prompt so cached / replayed runs compare exactly
+    match = _MEMORY_PATTERN.search(prompt)
+    memory = match.group(1) if match else "that"
+    digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:6]
+    return f"I recall {memory} [{model_name}:{digest}]"
+
+
+class FakeModel:
+
+    def __init__(self, backend, model_name):
+        self.backend = backend
+        self.model_name = model_name
+
+    def _outcome(self, prompt):
+        spec = self.backend.spec(self.model_name)
+        rng = self.backend.rng
+        latency = max(0.0, spec["latency"] + rng.uniform(-spec["jitter"], spec["jitter"]))
+        roll = rng.random()
+        error = spec["error"]
+        if error is None and roll < spec["rate_limit_rate"]:
+            error = "429 Resource has been exhausted (fake quota)"
+        elif error is None and roll < spec["rate_limit_rate"] + spec["error_rate"]:
+            error = "500 Internal error (fake)"
+        self.backend.calls.append(self.model_name)
+        return latency, error
+
+    def _respond(self, prompt, error):
+        if error:
+            raise Exception(error)
+        return FakeResponse(self.backend.reply(self.model_name, prompt))
+
+    async def generate_content_async(self, prompt):
+        latency, error = self._outcome(prompt)
+        await asyncio.sleep(latency)
+        return self._respond(prompt, error)
+
+    def generate_content(self, prompt):
+        latency, error = self._outcome(prompt)
+        time.sleep(latency)
+        return self._respond(prompt, error)
+
+
+class FakeBackend:
+    """
+    Offline LLM stand-in.
+
+    `models` maps a model name to overrides of the defaults, e.g.
+    {"slow": {"latency": 2.0}, "retired": {"error": "404 not found"}}.
+    Names not listed use the defaults.
+    """
+
+    name = "fake"
+    available = True
+
+    def __init__(self, model_names=("fake-primary", "fake-secondary"), latency=0.05, jitter=0.0,
+                 error_rate=0.0, rate_limit_rate=0.0, models=None, reply=default_reply, seed=0):
+        self.model_names = list(model_names)
+        self.defaults = {
+            "latency": latency,
+            "jitter": jitter,
+            "error": None,
+            "error_rate": error_rate,
+            "rate_limit_rate": rate_limit_rate,
+        }
+        self.models = models or {}
+        self.reply = reply
+        self.rng = random.Random(seed)
+        self.calls = []
+        self.pool = ModelPool(lambda model_name: FakeModel(self, model_name))
+
+    def spec(self, model_name):
+        return {**self.defaults, **self.models.get(model_name, {})}
+
+
+def fake_backend_from_env():
+    return FakeBackend(
+        model_names=os.getenv("FAKE_LLM_MODELS", "fake-primary,fake-secondary").split(","),
+        latency=float(os.getenv("FAKE_LLM_LATENCY_MS", "50")) / 1000.0,
+        jitter=float(os.getenv("FAKE_LLM_JITTER_MS", "0")) / 1000.0,
+        error_rate=float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+        rate_limit_rate=float(os.getenv("FAKE_LLM_429_RATE", "0")),
+        seed=int(os.getenv("FAKE_LLM_SEED", "0")),
+    )
+
+
+def get_backend(name=None):
+    name = (name or os.getenv("LLM_BACKEND", "gemini")).lower()
+    if name == "fake":
+        return fake_backend_from_env()
+    if name == "gemini":
+        return GeminiBackend(
+            os.getenv("GEMINI_API_KEY"),
+            dead_ttl=float(os.getenv("LLM_DEAD_MODEL_TTL_SECONDS", "21600")),
+        )
+    raise ValueError(f"Unknown LLM_BACKEND '{name}' (expected 'gemini' or 'fake')")
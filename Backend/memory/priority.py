@@ -1,6 +1,13 @@
+import logging
+
+from app_logging import fields, get_logger
+
+logger = get_logger("memory.priority")
+
 def calculate_priority(importance_kk, required_time_trk, available_time_tak):
     
-    print(f"Priority calculation triggered: Kk={importance_kk}, TRk={required_time_trk}, TAk={available_time_tak}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("priority", extra=fields(kk=importance_kk, trk=required_time_trk, tak=available_time_tak))
     
     if available_time_tak <= 0:
         priority = 10.0
@@ -0,0 +1,166 @@
+"""
+Precompiled NPC prompt templates and token accounting.
+
+The prompt is mostly fixed boilerplate. Only retention, confidence label,
+phase and the memory text vary, and the style guide is one of three. Each
+style bucket is compiled once into literal chunks plus field slots, and its
+fixed token count is measured once. Rendering a prompt then just joins
+strings, and counting its tokens only looks at the variable parts.
+
+Style buckets (same rules the engine always used):
+    gist            retention < 30%            (Parks & Yonelinas, 2009)
+    reconstructive  Phase 2 or retention < 40% (Kornell et al., 2011)
+    direct          otherwise                  (Kornell et al., 2011)
+
+The template keeps the original wording but drops the source-code
+indentation that used to be sent with every request.
+"""
+
+import os
+import string
+import threading
+
+from memory.ratelimit import estimate_tokens
+
+STYLE_GUIDES = {
+    "gist": "Use Gist-only language. Do not provide specific details. Sound vague and focus only on the general idea. Example: 'I don't have the details, but the general idea was...'",
+    "reconstructive": "Use Reconstructive language. Sound uncertain and speculative. Use fillers like 'I think', 'maybe', 'if I recall correctly'. Example: 'If I recall correctly, I think it was...'",
+    "direct": "Use Direct Recall language. Sound clear, precise, and certain about the facts. Example: 'I clearly remember it happened at...'",
+}
+
+TEMPLATE = """You are an AI NPC in a high-fidelity simulation.
+Your current cognitive state is:
+- Memory Retention: {retention}%
+- Confidence Level: {confidence_label}
+- Decay Phase: {phase}
+
+Style Guide: {style_guide}
+
+Memory to recall: "{base_memory}"
+
+Response requirements:
+1. Stay in character as a futuristic NPC.
+2. Do NOT mention your retention percentage or confidence level explicitly in the spoken text.
+3. Reflect the required linguistic style perfectly based on the Style Guide.
+4. Keep the response concise (1-2 sentences).
+
+NPC Response:
+"""
+
+# <30% gist-only, <40% (or Phase 2) reconstructive, otherwise direct recall
+GIST_THRESHOLD = 0.30
+RECONSTRUCTIVE_THRESHOLD = 0.40
+
+# Max prompt tokens per request; longer memories are truncated to fit (0 = no limit)
+PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "400"))
+
+
+def style_bucket(phase, retention_pct):
+    if retention_pct < GIST_THRESHOLD:
+        return "gist"
+    if phase == "Phase 2 (Slow)" or retention_pct < RECONSTRUCTIVE_THRESHOLD:
+        return "reconstructive"
+    return "direct"
+
+
+class PromptTemplate:
+
+    def __init__(self, template, **constants):
+        # Bake the constants in, then split into (literal, field) pairs once
+        self.parts = []
+        literal = ""
+        for text, field, _, _ in string.Formatter().parse(template):
+            literal += text
+            if field is None:
+                continue
+            if field in constants:
+                literal += constants[field]
+            else:
+                self.parts.append((literal, field))
+                literal = ""
+        self.tail = literal
+        self.fields = [field for _, field in self.parts]
+        self.static_tokens = estimate_tokens("".join(text for text, _ in self.parts) + self.tail)
+
+    def render(self, **values):
+        chunks = []
+        for text, field in self.parts:
+            chunks.append(text)
+            chunks.append(values[field])
+        chunks.append(self.tail)
+        return "".join(chunks)
+
+    def count_tokens(self, **values):
+        return self.static_tokens + sum(estimate_tokens(values[field]) for field in self.fields)
+
+
+TEMPLATES = {bucket: PromptTemplate(TEMPLATE, style_guide=guide) for bucket, guide in STYLE_GUIDES.items()}
+
+
+class TokenUsage:
+    """Aggregated prompt / response token counts, overall and per style bucket."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.prompts = 0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.responses = 0
+        self.truncated = 0
+        self.by_bucket = {bucket: {"prompts": 0, "prompt_tokens": 0} for bucket in STYLE_GUIDES}
+
+    def record_prompt(self, bucket, tokens, truncated=False):
+        with self._lock:
+            self.prompts += 1
+            self.prompt_tokens += tokens
+            self.truncated += truncated
+            self.by_bucket[bucket]["prompts"] += 1
+            self.by_bucket[bucket]["prompt_tokens"] += tokens
+
+    def record_response(self, text):
+        with self._lock:
+            self.responses += 1
+            self.response_tokens += estimate_tokens(text)
+
+    def stats(self):
+        return {
+            "prompts": self.prompts,
+            "prompt_tokens": self.prompt_tokens,
+            "avg_prompt_tokens": round(self.prompt_tokens / self.prompts, 1) if self.prompts else 0.0,
+            "responses": self.responses,
+            "response_tokens": self.response_tokens,
+            "avg_response_tokens": round(self.response_tokens / self.responses, 1) if self.responses else 0.0,
+            "truncated_prompts": self.truncated,
+            "budget": PROMPT_TOKEN_BUDGET,
+            "by_bucket": {bucket: dict(counts) for bucket, counts in self.by_bucket.items()},
+        }
+
+
+token_usage = TokenUsage()
+
+
+def render_prompt(base_memory, confidence_label, phase, retention_pct, budget=None):
+    """Returns (prompt, bucket, prompt_tokens, truncated)."""
+    bucket = style_bucket(phase, retention_pct)
+    template = TEMPLATES[bucket]
+    values = {
+        "retention": f"{min(1.0, retention_pct) * 100:.1f}",
+        "confidence_label": confidence_label,
+        "phase": phase,
+        "base_memory": base_memory,
+    }
+    tokens = template.count_tokens(**values)
+
+    budget = PROMPT_TOKEN_BUDGET if budget is None else budget
+    truncated = False
+    if budget and tokens > budget:
+        # The memory text is the only unbounded field: cut it to fit (~4 chars/token)
+        spare = budget - (tokens - estimate_tokens(base_memory))
+        values["base_memory"] = base_memory[:max(0, spare * 4 - 3)].rstrip() + "..."
+        tokens = template.count_tokens(**values)
+        truncated = True
+
+    return template.render(**values), bucket, tokens, truncated
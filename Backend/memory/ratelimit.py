@@ -0,0 +1,225 @@
+"""
+Client-side Gemini quota management.
+
+Each model gets two token buckets, one for requests/min and one for
+tokens/min, plus a circuit breaker. Model selection skips any model whose
+bucket is empty or whose breaker is open. When every model is only
+throttled, selection waits (briefly) for the earliest refill. The effect is
+to send requests at the quota ceiling instead of hammering into 429s.
+
+Breaker states:
+    closed     - requests flow
+    open       - a 429 was seen; nothing is sent until `cooldown` elapses
+    half_open  - after the cooldown one trial request is let through;
+                 success closes the breaker, another 429 reopens it
+"""
+
+import asyncio
+import json
+import os
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English text
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount=1):
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def try_acquire(self, amount=1):
+        if self.wait_time(amount) > 0:
+            return False
+        self.tokens -= min(amount, self.capacity)
+        return True
+
+
+class CircuitBreaker:
+
+    def __init__(self, threshold=1, cooldown=60.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started = None
+        self.opens = 0
+
+    def allow(self):
+        if self.state == CLOSED:
+            return True
+        now = self.clock()
+        if self.state == OPEN:
+            if now - self.opened_at < self.cooldown:
+                return False
+            self.state = HALF_OPEN
+            self.trial_started = None
+        # Half-open: a single trial at a time; a trial that never reported back
+        # (e.g. cancelled hedge) frees the slot after another cooldown
+        if self.trial_started is None or now - self.trial_started >= self.cooldown:
+            self.trial_started = now
+            return True
+        return False
+
+    def retry_after(self):
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.cooldown - (self.clock() - self.opened_at))
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.trial_started = None
+
+    def record_rate_limited(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            if self.state != OPEN:
+                self.opens += 1
+            self.state = OPEN
+            self.opened_at = self.clock()
+            self.trial_started = None
+
+    def record_error(self):
+        # Non-quota errors say nothing about quota; just free the trial slot
+        self.trial_started = None
+
+
+class QuotaLimiter:
+
+    def __init__(self, rpm=15, tpm=1_000_000, breaker_threshold=1, breaker_cooldown=60.0,
+                 model_limits=None, clock=time.monotonic):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.model_limits = model_limits or {}
+        self.clock = clock
+        self._models = {}
+        self.fallbacks = 0
+
+    def _model(self, model_name):
+        state = self._models.get(model_name)
+        if state is None:
+            limits = self.model_limits.get(model_name, {})
+            state = {
+                "requests": TokenBucket(limits.get("rpm", self.rpm), clock=self.clock),
+                "tokens": TokenBucket(limits.get("tpm", self.tpm), clock=self.clock),
+                "breaker": CircuitBreaker(self.breaker_threshold, self.breaker_cooldown, self.clock),
+                "granted": 0,
+                "throttled": 0,
+                "short_circuited": 0,
+                "rate_limited": 0,
+            }
+            self._models[model_name] = state
+        return state
+
+    def _wait_time(self, state, tokens):
+        return max(state["requests"].wait_time(1), state["tokens"].wait_time(tokens))
+
+    def try_acquire(self, model_name, tokens=1):
+        state = self._model(model_name)
+        if self._wait_time(state, tokens) > 0:
+            state["throttled"] += 1
+            return False
+        if not state["breaker"].allow():
+            state["short_circuited"] += 1
+            return False
+        state["requests"].try_acquire(1)
+        state["tokens"].try_acquire(tokens)
+        state["granted"] += 1
+        return True
+
+    def select(self, model_names, tokens=1):
+        for model_name in model_names:
+            if self.try_acquire(model_name, tokens):
+                return model_name
+        return None
+
+    async def acquire(self, model_names, tokens=1, max_wait=0.0, sleep=asyncio.sleep):
+        # First admissible model in preference order; if all are merely
+        # throttled, sleep until the earliest refill (within max_wait)
+        waited = 0.0
+        while True:
+            model_name = self.select(model_names, tokens)
+            if model_name is not None:
+                return model_name
+            waits = [self._wait_time(self._model(m), tokens) for m in model_names
+                     if self._model(m)["breaker"].state != OPEN]
+            waits = [w for w in waits if w > 0]
+            if not waits or waited + min(waits) > max_wait:
+                return None
+            delay = min(waits)
+            await sleep(delay)
+            waited += delay
+
+    def record_success(self, model_name):
+        self._model(model_name)["breaker"].record_success()
+
+    def record_rate_limited(self, model_name):
+        state = self._model(model_name)
+        state["rate_limited"] += 1
+        state["breaker"].record_rate_limited()
+
+    def record_error(self, model_name):
+        self._model(model_name)["breaker"].record_error()
+
+    def record_fallback(self):
+        self.fallbacks += 1
+
+    def stats(self):
+        models = {}
+        for model_name, state in self._models.items():
+            breaker = state["breaker"]
+            models[model_name] = {
+                "breaker": breaker.state,
+                "breaker_opens": breaker.opens,
+                "retry_after_seconds": round(breaker.retry_after(), 2),
+                "granted": state["granted"],
+                "throttled": state["throttled"],
+                "short_circuited": state["short_circuited"],
+                "rate_limited": state["rate_limited"],
+                "requests_available": round(state["requests"].tokens, 2),
+                "tokens_available": round(state["tokens"].tokens, 0),
+            }
+        return {
+            "throttled": sum(m["throttled"] for m in models.values()),
+            "short_circuited": sum(m["short_circuited"] for m in models.values()),
+            "breaker_opens": sum(m["breaker_opens"] for m in models.values()),
+            "fallbacks": self.fallbacks,
+            "models": models,
+        }
+
+
+quota_limiter = QuotaLimiter(
+    rpm=float(os.getenv("GEMINI_RPM", "15")),
+    tpm=float(os.getenv("GEMINI_TPM", "1000000")),
+    breaker_threshold=int(os.getenv("GEMINI_BREAKER_THRESHOLD", "1")),
+    breaker_cooldown=float(os.getenv("GEMINI_BREAKER_COOLDOWN_SECONDS", "60")),
+    # e.g. {"gemini-2.0-flash": {"rpm": 15, "tpm": 1000000}}
+    model_limits=json.loads(os.getenv("GEMINI_MODEL_LIMITS", "{}")),
+)
@@ -1,24 +1,37 @@
+import logging
 import random
 
-def reconstruct_memory(retention):
+import numpy as np
 
-    print(f"Memory reconstruction triggered for Retention: {retention}")
-    
-    variation = random.uniform(-0.15, 0.15)
+from app_logging import fields, get_logger
+from memory.bands import band_label, band_labels
+from memory.seeding import RECONSTRUCTION_SALT, seeded_uniform_one, variations
+
+LABELS = ("High Reconstruction", "Medium Reconstruction", "Low Reconstruction", "Very Low Reconstruction", "Confused")
+
+logger = get_logger("memory.reconstruction")
+
+def reconstruct_memory(retention, seed=None, rng=None):
+
+    if rng is not None:
+        variation = rng.uniform(-0.15, 0.15)
+    elif seed is not None:
+        variation = seeded_uniform_one(seed, -0.15, 0.15, RECONSTRUCTION_SALT)
+    else:
+        variation = random.uniform(-0.15, 0.15)
     reconstruction = retention + variation
     
     reconstruction = max(0.0, min(1.0, reconstruction))
     
     # Determine reconstruction band
-    if reconstruction >= 0.8:
-        label = "High Reconstruction"
-    elif reconstruction >= 0.6:
-        label = "Medium Reconstruction"
-    elif reconstruction >= 0.4:
-        label = "Low Reconstruction"
-    elif reconstruction >= 0.3:
-        label = "Very Low Reconstruction"
-    else:
-        label = "Confused"
-        
-    return round(reconstruction, 4), label
\ No newline at end of file
+    # Built-in round: numpy scalars cost several times the whole calculation
+    result = round(reconstruction, 4), band_label(reconstruction, LABELS)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("reconstruction", extra=fields(retention=retention, reconstruction=result[0], label=result[1]))
+    return result
+
+def reconstruct_memory_batch(retentions, seeds=None, rng=None):
+    
+    retentions = np.asarray(retentions, dtype=np.float64)
+    reconstruction = np.clip(retentions + variations(retentions.size, 0.15, seeds, rng, RECONSTRUCTION_SALT), 0.0, 1.0)
+    return np.round(reconstruction, 4), band_labels(reconstruction, LABELS)
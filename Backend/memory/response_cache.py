@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import os
+import random
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from memory.prompts import style_bucket
+from timeutil import parse_timestamp, utcnow
+
+
+def cache_key(base_memory, confidence_label, phase, retention_pct):
+    # Retention is quantized to the prompt's style bucket: same bucket, same prompt style
+    return (base_memory, confidence_label, phase, style_bucket(phase, retention_pct))
+
+
+class MongoResponseStore:
+    """Optional shared tier so several API workers reuse each other's responses."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    @staticmethod
+    def _doc_id(key):
+        return hashlib.sha1("\x1f".join(key).encode("utf-8")).hexdigest()
+
+    async def load(self, key):
+        doc = await self.collection.find_one({"_id": self._doc_id(key)})
+        if not doc or parse_timestamp(doc["expires_at"]) <= utcnow():
+            return None
+        return doc["variants"]
+
+    async def save(self, key, variants, ttl_seconds):
+        base_memory, confidence_label, phase, bucket = key
+        await self.collection.update_one(
+            {"_id": self._doc_id(key)},
+            {"$set": {
+                "base_memory": base_memory,
+                "confidence_label": confidence_label,
+                "phase": phase,
+                "retention_bucket": bucket,
+                "variants": variants,
+                # UTC BSON date, so the TTL index expires it on time
+                "expires_at": utcnow() + timedelta(seconds=ttl_seconds),
+            }},
+            upsert=True,
+        )
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of NPC responses keyed on quantized cognitive state.
+
+    Each key holds up to `variants` responses. Until a key is full, lookups
+    generate a new variant; after that they pick one at random so NPCs in the
+    same state don't all say the same sentence. Concurrent misses for the same
+    key share a single generation unless `coalesce` is off.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, variants=3, store=None, clock=time.monotonic,
+                 coalesce=True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.variants = variants
+        self.coalesce = coalesce
+        self.store = store
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self.hits = 0
+        self.misses = 0
+        self.store_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["expires_at"] <= self.clock():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry["variants"]
+
+    def _remember(self, key, variants):
+        self._entries[key] = {"variants": variants, "expires_at": self.clock() + self.ttl_seconds}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_generate(self, key, generate):
+        variants = self._lookup(key)
+
+        if variants is None and self.store is not None:
+            stored = await self.store.load(key)
+            if stored:
+                self.store_hits += 1
+                variants = stored
+                self._remember(key, variants)
+
+        if variants is not None and len(variants) >= self.variants:
+            self.hits += 1
+            return random.choice(variants)
+
+        if self.coalesce and key in self._in_flight:
+            self.hits += 1
+            return await asyncio.shield(self._in_flight[key])
+
+        self.misses += 1
+        if self.coalesce:
+            task = asyncio.ensure_future(generate())
+            self._in_flight[key] = task
+            try:
+                text = await task
+            finally:
+                self._in_flight.pop(key, None)
+        else:
+            text = await generate()
+
+        # Failed generations (fallback text) are never cached
+        if text is None:
+            return None
+
+        variants = list(self._lookup(key) or variants or [])
+        if text not in variants:
+            variants.append(text)
+        variants = variants[-self.variants:]
+        self._remember(key, variants)
+        if self.store is not None:
+            await self.store.save(key, variants, self.ttl_seconds)
+        return text
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "store_hits": self.store_hits,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("NPC_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("NPC_CACHE_TTL_SECONDS", "3600")),
+    variants=int(os.getenv("NPC_CACHE_VARIANTS", "3")),
+    coalesce=os.getenv("NPC_CACHE_COALESCE", "1") == "1",
+)
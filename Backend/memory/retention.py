@@ -1,15 +1,23 @@
 import math
 import time
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
+import numpy as np
 from pymongo import MongoClient
 
+from timeutil import parse_timestamp, utcnow
+
 
 S_FAST = 1.47   
 S_SLOW = 4.07  
 TRANSITION_THRESHOLD = 0.40  
 STOP_THRESHOLD = 0.30       
 
+# Phase codes used by the batch API
+PHASE_FAST = 1
+PHASE_SLOW = 2
+PHASE_LABELS = {PHASE_FAST: "Phase 1 (Fast)", PHASE_SLOW: "Phase 2 (Slow)"}
+
 def calculate_retention(p_factor, days=0, **kwargs):
    
     p_factor = max(0.5, min(1.5, p_factor))
@@ -30,9 +38,59 @@ def calculate_retention(p_factor, days=0, **kwargs):
     
     return round(max(STOP_THRESHOLD, r_slow), 4), "Phase 2 (Slow)", time_in_slow
 
+def calculate_retention_batch(p_factors, days, decimals=4):
+    """
+    Vectorized calculate_retention for whole NPC populations.
+
+    Returns (retention, phase_codes, phase_time) arrays. Values match the
+    scalar path exactly: same clamps, 0.40 transition, 0.30 floor and 4-dp
+    rounding. phase_time mirrors the scalar third value (elapsed days in
+    Phase 1, time spent in the slow phase in Phase 2). decimals=None skips
+    the rounding (memory.retention_table samples the unrounded curve).
+    """
+    p_factors = np.clip(np.asarray(p_factors, dtype=np.float64), 0.5, 1.5)
+    days = np.maximum(0.0, np.asarray(days, dtype=np.float64))
+    p_factors, days = np.broadcast_arrays(p_factors, days)
+
+    # PHASE 1: Fast decay until 40%
+    r_fast = p_factors * np.exp(-days / S_FAST)
+    is_fast = r_fast >= TRANSITION_THRESHOLD
+
+    # PHASE 2: Continue from EXACT transition point
+    t_transition = -S_FAST * np.log(TRANSITION_THRESHOLD / p_factors)
+    time_in_slow = days - t_transition
+    r_slow = np.maximum(STOP_THRESHOLD, TRANSITION_THRESHOLD * np.exp(-time_in_slow / S_SLOW))
+
+    retention = np.where(is_fast, r_fast, r_slow)
+    if decimals is not None:
+        retention = np.round(retention, decimals)
+    phase_codes = np.where(is_fast, PHASE_FAST, PHASE_SLOW).astype(np.int8)
+    phase_time = np.where(is_fast, days, time_in_slow)
+    return retention, phase_codes, phase_time
+
+def calculate_retention_from_timestamps_batch(p_factors, created_ats, now=None, game_time_scale=60, table=None):
+    """
+    Batch retention from creation timestamps; returns (retention, phase_codes, game_days).
+
+    With `table` (a RetentionTable) retention is interpolated from it instead,
+    within the table's max_error. Phases stay exact either way.
+    """
+    # Same tz-awareness as the stored timestamps (aware UTC from Mongo, or naive)
+    now = now or datetime.now(created_ats[0].tzinfo if len(created_ats) else None)
+    game_days = np.fromiter(
+        ((now - created_at).total_seconds() / game_time_scale for created_at in created_ats),
+        dtype=np.float64,
+        count=len(created_ats),
+    )
+    if table is not None:
+        retention, phase_codes = table.lookup(p_factors, game_days)
+        return retention, phase_codes, game_days
+    retention, phase_codes, phase_time = calculate_retention_batch(p_factors, game_days)
+    return retention, phase_codes, game_days
+
 def calculate_retention_from_timestamp(p_factor, created_at, game_time_scale=60, **kwargs):
     
-    time_delta = datetime.now() - created_at
+    time_delta = datetime.now(created_at.tzinfo) - created_at
     real_seconds = time_delta.total_seconds()
     game_days = real_seconds / game_time_scale  # 60sec = 1 game day
     
@@ -45,8 +103,48 @@ def calculate_retention_from_timestamp(p_factor, created_at, game_time_scale=60,
         "slow_time": round(slow_time, 2) if phase == "Phase 2 (Slow)" else 0
     }, phase
 
+def time_to_threshold(p_factor, threshold):
+    """
+    Game-days until retention first reaches `threshold`, solved exactly from
+    the two-phase model. 0 if retention starts at or below it, inf if the
+    curve never gets there (anything under the 0.30 floor).
+    """
+    p_factor = max(0.5, min(1.5, p_factor))
+    
+    if threshold >= TRANSITION_THRESHOLD:
+        if threshold >= p_factor:
+            return 0.0
+        return -S_FAST * math.log(threshold / p_factor)
+    
+    if threshold < STOP_THRESHOLD:
+        return math.inf
+    
+    t_transition = -S_FAST * math.log(TRANSITION_THRESHOLD / p_factor)
+    return t_transition + S_SLOW * math.log(TRANSITION_THRESHOLD / threshold)
+
+def next_transition(p_factor, days=0):
+    """(threshold, game_day) of the next threshold crossing after `days`, or None."""
+    for threshold in (TRANSITION_THRESHOLD, STOP_THRESHOLD):
+        crossing = time_to_threshold(p_factor, threshold)
+        if crossing > days:
+            return threshold, crossing
+    return None
+
+def transition_fields(p_factor, created_at, now=None, game_time_scale=60):
+    """Mongo fields describing the next threshold crossing in wall-clock time."""
+    now = now or datetime.now(created_at.tzinfo)
+    days = (now - created_at).total_seconds() / game_time_scale
+    upcoming = next_transition(p_factor, days)
+    if upcoming is None:
+        return {"next_transition_at": None, "next_transition_threshold": None}
+    threshold, crossing_day = upcoming
+    return {
+        "next_transition_at": created_at + timedelta(seconds=crossing_day * game_time_scale),
+        "next_transition_threshold": threshold,
+    }
+
 def start_monitor(report_id):
-    client = MongoClient("mongodb://localhost:27017")
+    client = MongoClient("mongodb://localhost:27017", tz_aware=True)
     db = client["bigfive"]
     collection = db["ocean_scores"]
     candidate = collection.find_one({"report_id": report_id})
@@ -56,7 +154,7 @@ def start_monitor(report_id):
         return
 
     p_factor = candidate["p_factor"]
-    start_time = datetime.fromisoformat(candidate.get("saved_at", datetime.now().isoformat()))
+    start_time = parse_timestamp(candidate.get("saved_at")) or utcnow()
 
     print(f"\n TWO-PHASE MONITOR STARTED | ID: {report_id}")
     print(f" P-Factor: {p_factor:.2f} ({p_factor*100:.0f}%)")
@@ -107,7 +205,7 @@ def start_monitor(report_id):
         print("\n Monitor stopped by user.")
 
 if __name__ == "__main__":
-    client = MongoClient("mongodb://localhost:27017")
+    client = MongoClient("mongodb://localhost:27017", tz_aware=True)
     db = client["bigfive"]
     latest = db["ocean_scores"].find_one(sort=[("saved_at", -1)])
     
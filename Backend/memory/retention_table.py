@@ -0,0 +1,238 @@
+"""
+Precomputed retention lookup table.
+
+calculate_retention depends only on p_factor (clamped to [0.5, 1.5]) and
+elapsed game days. Past the day the strongest memory reaches the 0.30 floor,
+every NPC sits at 0.30. The whole curve family therefore fits in a small 2-D
+grid, and population-scale ticks become a bilinear lookup instead of
+exp/log per NPC.
+
+The grid is refined until the interpolation error, measured against the
+exact formula on a probe grid 4x finer than the table, is within
+`max_error`. Error concentrates at the 0.40 / 0.30 kinks, where it shrinks
+only linearly with the spacing: 1e-3 takes a 129 x 257 grid (0.26 MB),
+1e-4 a 2049 x 2049 one (34 MB).
+
+The lookup is not free either (four gathers per NPC). Compare both paths on
+the target machine with `python -m benchmarks.retention_table` before
+enabling it; that also prints the accuracy report.
+
+Tables are written as a plain .npy file plus a .json sidecar with the axes,
+and are opened with mmap_mode="r". Every worker maps the same pages from
+the OS cache instead of holding its own copy.
+
+The table is opt-in per call: pass it as `table=` to
+memory.retention.calculate_retention_from_timestamps_batch. default_table()
+maps the one at RETENTION_TABLE_PATH for callers that want it; nothing loads
+it implicitly, so the scalar and batch endpoints agree unless a caller asks
+for the approximation. Phases are never interpolated. They come from the
+closed-form transition day, so they match the exact path even near 0.40.
+
+    python -m memory.retention_table retention_table.npy --max-error 1e-3
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from memory.retention import (
+    PHASE_FAST,
+    PHASE_SLOW,
+    S_FAST,
+    STOP_THRESHOLD,
+    TRANSITION_THRESHOLD,
+    calculate_retention_batch,
+    time_to_threshold,
+)
+
+P_MIN, P_MAX = 0.5, 1.5
+FORMAT_VERSION = 1
+
+
+def exact_retention(p_factors, days):
+    """Unrounded retention: the curve the table samples and is checked against."""
+    return calculate_retention_batch(p_factors, days, decimals=None)[0]
+
+
+class RetentionTable:
+
+    def __init__(self, values, days_max, max_error=None):
+        self.values = values
+        self.p_count, self.day_count = values.shape
+        self.days_max = float(days_max)
+        self.max_error = max_error
+        self._p_scale = (self.p_count - 1) / (P_MAX - P_MIN)
+        self._day_scale = (self.day_count - 1) / self.days_max
+        self._flat = values.reshape(-1)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def interpolate(self, p_factors, days):
+        """Unrounded retention by bilinear interpolation; arguments broadcast together."""
+        x = np.clip(np.atleast_1d(np.asarray(p_factors, dtype=np.float64)), P_MIN, P_MAX)
+        # Beyond days_max every curve is on the 0.30 floor, so clamping is exact
+        y = np.clip(np.atleast_1d(np.asarray(days, dtype=np.float64)), 0.0, self.days_max)
+        if x.shape != y.shape:
+            x, y = (np.broadcast_to(v, np.broadcast_shapes(x.shape, y.shape)).copy() for v in (x, y))
+        x -= P_MIN
+        x *= self._p_scale
+        y *= self._day_scale
+
+        i = np.minimum(x.astype(np.intp), self.p_count - 2)
+        j = np.minimum(y.astype(np.intp), self.day_count - 2)
+        x -= i
+        y -= j
+
+        # Flat indices and in-place arithmetic: this runs once per tick over the
+        # whole population, and temporaries dominate its cost
+        flat = self._flat
+        k = i * self.day_count
+        k += j
+        top, top_next = flat.take(k), flat.take(k + 1)
+        k += self.day_count
+        bottom, bottom_next = flat.take(k), flat.take(k + 1)
+        top_next -= top
+        top_next *= y
+        top += top_next
+        bottom_next -= bottom
+        bottom_next *= y
+        bottom += bottom_next
+        bottom -= top
+        bottom *= x
+        top += bottom
+        return top
+
+    def lookup(self, p_factors, days):
+        """(retention, phase_codes) like calculate_retention_batch, within max_error."""
+        retention = self.interpolate(p_factors, days)
+        # time_to_threshold(p, 0.40), vectorized: Phase 1 up to and including the
+        # transition day, as r_fast >= 0.40 on the exact path
+        p = np.clip(np.asarray(p_factors, dtype=np.float64), P_MIN, P_MAX)
+        elapsed = np.maximum(0.0, np.asarray(days, dtype=np.float64))
+        t_transition = -S_FAST * np.log(TRANSITION_THRESHOLD / p)
+        phase_codes = np.where(elapsed <= t_transition, PHASE_FAST, PHASE_SLOW).astype(np.int8)
+        return np.round(retention, 4), np.atleast_1d(phase_codes)
+
+    def measure_error(self, refine=4):
+        """Max |table - exact| on a grid `refine` times finer than the table."""
+        p = np.linspace(P_MIN, P_MAX, (self.p_count - 1) * refine + 1)
+        days = np.linspace(0.0, self.days_max, (self.day_count - 1) * refine + 1)
+        worst = 0.0
+        # Row blocks keep the probe's memory bounded
+        for start in range(0, len(p), 64):
+            block = p[start:start + 64, None]
+            error = np.abs(self.interpolate(block, days[None, :]) - exact_retention(block, days[None, :]))
+            worst = max(worst, float(error.max()))
+        return worst
+
+    # -- persistence --------------------------------------------------------
+
+    def save(self, path):
+        np.save(path, np.ascontiguousarray(self.values))
+        with open(_sidecar(path), "w", encoding="utf-8") as handle:
+            json.dump({
+                "version": FORMAT_VERSION,
+                "p_min": P_MIN,
+                "p_max": P_MAX,
+                "days_max": self.days_max,
+                "shape": list(self.values.shape),
+                "max_error": self.max_error,
+            }, handle, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(_sidecar(path), encoding="utf-8") as handle:
+            meta = json.load(handle)
+        if meta.get("version") != FORMAT_VERSION or (meta["p_min"], meta["p_max"]) != (P_MIN, P_MAX):
+            raise ValueError(f"{path}: incompatible retention table (rebuild it)")
+        values = np.load(path, mmap_mode="r" if mmap else None)
+        if list(values.shape) != meta["shape"]:
+            raise ValueError(f"{path}: shape {values.shape} does not match its sidecar")
+        return cls(values, meta["days_max"], meta.get("max_error"))
+
+
+def _sidecar(path):
+    return os.fspath(path) + ".json"
+
+
+def floor_day():
+    """Game day by which every p_factor has reached the 0.30 floor."""
+    return time_to_threshold(P_MAX, STOP_THRESHOLD)
+
+
+def _axis_errors(p, days):
+    # Linear-interpolation error at cell midpoints along each axis, with the
+    # other axis sampled 4x finer than its nodes
+    fine_days = np.linspace(0.0, days[-1], (len(days) - 1) * 4 + 1)
+    fine_p = np.linspace(P_MIN, P_MAX, (len(p) - 1) * 4 + 1)
+    along_p = exact_retention(p[:, None], fine_days[None, :])
+    mid_p = exact_retention(((p[:-1] + p[1:]) / 2)[:, None], fine_days[None, :])
+    along_days = exact_retention(fine_p[:, None], days[None, :])
+    mid_days = exact_retention(fine_p[:, None], ((days[:-1] + days[1:]) / 2)[None, :])
+    p_error = np.abs((along_p[:-1] + along_p[1:]) / 2 - mid_p).max()
+    day_error = np.abs((along_days[:, :-1] + along_days[:, 1:]) / 2 - mid_days).max()
+    return float(p_error), float(day_error)
+
+
+def build(max_error=1e-3, p_count=17, day_count=65, max_cells=20_000_000):
+    """
+    Smallest power-of-two grid whose interpolation error, measured by
+    measure_error(), is within max_error.
+
+    Each axis is first refined on its own until its error is below
+    max_error, then the full grid is checked. The kinks at 0.40 and 0.30 sit
+    at a different day for every p_factor, so both axes need them resolved.
+    """
+    days_max = float(np.ceil(floor_day() * 100) / 100)
+    while True:
+        if p_count * day_count > max_cells:
+            raise ValueError(f"max_error {max_error} needs a grid over {max_cells} cells")
+        p = np.linspace(P_MIN, P_MAX, p_count)
+        days = np.linspace(0.0, days_max, day_count)
+        p_error, day_error = _axis_errors(p, days)
+        if p_error > max_error or day_error > max_error:
+            if p_error > max_error:
+                p_count = p_count * 2 - 1
+            if day_error > max_error:
+                day_count = day_count * 2 - 1
+            continue
+
+        table = RetentionTable(exact_retention(p[:, None], days[None, :]), days_max)
+        error = table.measure_error()
+        if error <= max_error:
+            table.max_error = error
+            return table
+        if p_error >= day_error:
+            p_count = p_count * 2 - 1
+        else:
+            day_count = day_count * 2 - 1
+
+
+_default = {}
+
+
+def default_table():
+    """The table at RETENTION_TABLE_PATH, mapped once per process, or None; pass it as `table=`."""
+    path = os.getenv("RETENTION_TABLE_PATH")
+    if not path:
+        return None
+    table = _default.get(path)
+    if table is None:
+        table = _default[path] = RetentionTable.load(path)
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the retention lookup table")
+    parser.add_argument("path", help="output .npy (a .json sidecar is written next to it)")
+    parser.add_argument("--max-error", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    table = build(args.max_error)
+    table.save(args.path)
+    print(f"Retention table {table.p_count} x {table.day_count} ({table.nbytes / 1e6:.2f} MB), "
+          f"days 0..{table.days_max}, max error {table.max_error:.2e} -> {args.path}")
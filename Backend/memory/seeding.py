@@ -0,0 +1,69 @@
+"""
+Deterministic randomness for the memory model.
+
+Confidence and reconstruction add a ±0.15 variation to retention. Seeding
+that variation from (report_id, game_day) makes an NPC's state reproducible:
+the same NPC on the same game day always gets the same labels. Results can
+then be cached, batch-verified against the scalar path, and replayed in
+benchmarks.
+
+seeded_uniform() is a counter-based generator (splitmix64), so scalar and
+vectorized callers get bit-identical values for the same seed. Single
+draws go through seeded_uniform_one(), the same step in plain integers:
+building numpy arrays for one value costs more than the draw itself.
+"""
+
+import hashlib
+
+import numpy as np
+
+_MASK64 = (1 << 64) - 1
+_UNIT = 1.0 / (1 << 53)
+
+CONFIDENCE_SALT = 0x636F6E66  # "conf"
+RECONSTRUCTION_SALT = 0x7265636F  # "reco"
+
+
+def derive_seed(report_id, game_day=0):
+    key = f"{report_id}:{int(game_day)}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def derive_seeds(report_ids, game_days):
+    return np.array([derive_seed(r, d) for r, d in zip(report_ids, game_days)], dtype=np.uint64)
+
+
+def _splitmix64(x):
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _splitmix64_int(x):
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+def seeded_uniform_one(seed, low, high, salt=0):
+    """seeded_uniform for a single seed, without numpy."""
+    unit = (_splitmix64_int((int(seed) & _MASK64) ^ salt) >> 11) * _UNIT
+    return low + (high - low) * unit
+
+
+def seeded_uniform(seeds, low, high, salt=0):
+    seeds = np.atleast_1d(np.asarray(seeds, dtype=np.uint64))
+    with np.errstate(over="ignore"):
+        bits = _splitmix64(seeds ^ np.uint64(salt))
+    # Top 53 bits -> [0, 1)
+    unit = (bits >> np.uint64(11)).astype(np.float64) * _UNIT
+    return low + (high - low) * unit
+
+
+def variations(count, spread, seeds=None, rng=None, salt=0):
+    if seeds is not None:
+        return seeded_uniform(seeds, -spread, spread, salt)
+    rng = rng if rng is not None else np.random.default_rng()
+    return rng.uniform(-spread, spread, size=count)
@@ -0,0 +1,517 @@
+"""
+In-memory stand-in for the Motor client, selected by `memory://` URLs (see
+database.get_client).
+
+Implements the subset of the collection API the backend uses: queries with
+the common operators, sorts in BSON type order, projections, updates, bulk
+writes, index bookkeeping and explain-style plan hints. Write errors are
+pymongo's own (DuplicateKeyError, BulkWriteError), so code that handles
+them behaves the same against a real mongod.
+
+Every operation yields to the event loop, plus an optional simulated
+round-trip latency (`memory://?latency_ms=5`).
+"""
+
+import asyncio
+import copy
+from collections import deque
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import (
+    BulkWriteResult,
+    DeleteResult,
+    InsertManyResult,
+    InsertOneResult,
+    UpdateResult,
+)
+
+_MISSING = object()
+
+# BSON comparison order for mixed-type sorts
+_TYPE_RANK = [
+    (type(None), 1),
+    (bool, 8),
+    (int, 2),
+    (float, 2),
+    (str, 3),
+    (dict, 4),
+    (list, 5),
+    (ObjectId, 7),
+    (datetime, 9),
+]
+
+
+def _type_rank(value):
+    if value is _MISSING:
+        return 1
+    for kind, rank in _TYPE_RANK:
+        if isinstance(value, kind):
+            return rank
+    return 10
+
+
+def _get_path(doc, path):
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return _MISSING
+    return value
+
+
+def _set_path(doc, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset_path(doc, path):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _compare(value, op, target):
+    if value is _MISSING or value is None or target is None:
+        return False
+    if _type_rank(value) != _type_rank(target):
+        return False
+    try:
+        if op == "$lt":
+            return value < target
+        if op == "$lte":
+            return value <= target
+        if op == "$gt":
+            return value > target
+        return value >= target
+    except TypeError:
+        return False
+
+
+def _equals(value, target):
+    if value is _MISSING:
+        return target is None
+    if isinstance(value, list) and not isinstance(target, list):
+        return target in value
+    return value == target
+
+
+def _match_condition(value, condition):
+    if not (isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition)):
+        return _equals(value, condition)
+
+    for op, target in condition.items():
+        if op == "$in":
+            if not any(_equals(value, t) for t in target):
+                return False
+        elif op == "$nin":
+            if any(_equals(value, t) for t in target):
+                return False
+        elif op == "$ne":
+            if _equals(value, target):
+                return False
+        elif op == "$exists":
+            if (value is not _MISSING) != bool(target):
+                return False
+        elif op in ("$lt", "$lte", "$gt", "$gte"):
+            if not _compare(value, op, target):
+                return False
+        else:
+            raise ValueError(f"Unsupported query operator: {op}")
+    return True
+
+
+def match(doc, query):
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(match(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(match(doc, sub) for sub in condition):
+                return False
+        elif not _match_condition(_get_path(doc, key), condition):
+            return False
+    return True
+
+
+def _apply_update(doc, update, inserting=False):
+    for op, fields in update.items():
+        if op == "$set":
+            for path, value in fields.items():
+                _set_path(doc, path, copy.deepcopy(value))
+        elif op == "$unset":
+            for path in fields:
+                _unset_path(doc, path)
+        elif op == "$inc":
+            for path, amount in fields.items():
+                current = _get_path(doc, path)
+                _set_path(doc, path, (0 if current is _MISSING else current) + amount)
+        elif op == "$setOnInsert":
+            if inserting:
+                for path, value in fields.items():
+                    _set_path(doc, path, copy.deepcopy(value))
+        else:
+            raise ValueError(f"Unsupported update operator: {op}")
+
+
+def _seed_from_filter(query):
+    doc = {}
+    for key, condition in (query or {}).items():
+        if key.startswith("$"):
+            continue
+        if isinstance(condition, dict) and any(k.startswith("$") for k in condition):
+            continue
+        _set_path(doc, key, copy.deepcopy(condition))
+    return doc
+
+
+def _normalize_sort(sort, direction=None):
+    if sort is None:
+        return []
+    if isinstance(sort, str):
+        return [(sort, direction if direction is not None else 1)]
+    return list(sort)
+
+
+def _sort_docs(docs, sort):
+    for key, direction in reversed(sort):
+        docs.sort(
+            key=lambda d: (_type_rank(_get_path(d, key)), _sort_value(_get_path(d, key))),
+            reverse=direction < 0,
+        )
+    return docs
+
+
+def _sort_value(value):
+    if value is _MISSING or value is None:
+        return 0
+    if isinstance(value, (dict, list)):
+        return str(value)
+    return value
+
+
+def _project(doc, projection):
+    if not projection:
+        return doc
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+
+    include_id = projection.get("_id", 1)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+
+    if fields and all(fields.values()):
+        result = {}
+        for path in fields:
+            value = _get_path(doc, path)
+            if value is not _MISSING:
+                _set_path(result, path, value)
+    else:
+        result = dict(doc)
+        for path in fields:
+            _unset_path(result, path)
+
+    if include_id and "_id" in doc:
+        result["_id"] = doc["_id"]
+    else:
+        result.pop("_id", None)
+    return result
+
+
+class MemoryCursor:
+
+    def __init__(self, collection, query=None, projection=None, sort=None, limit=0, skip=0):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort = _normalize_sort(sort)
+        self._limit = limit
+        self._skip = skip
+        self._buffer = None
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def skip(self, skip):
+        self._skip = skip
+        return self
+
+    def _materialize(self):
+        docs = [d for d in self._collection._docs if match(d, self._query)]
+        _sort_docs(docs, self._sort)
+        if self._skip:
+            docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [_project(copy.deepcopy(d), self._projection) for d in docs]
+
+    def batch_size(self, size):
+        return self
+
+    def _plan_index(self):
+        # Rough stand-in for the query planner: an index is usable when its
+        # leading key is constrained by the filter, or when it serves the sort
+        fields = [key for key in self._query if not key.startswith("$")]
+        for name, spec in self._collection._indexes.items():
+            keys = spec["key"]
+            if keys[0][0] in fields:
+                return name
+            if not fields and self._sort:
+                reverse = [(k, -d) for k, d in self._sort]
+                if keys[:len(self._sort)] in (self._sort, reverse):
+                    return name
+        return None
+
+    async def explain(self):
+        await self._collection._round_trip()
+        name = self._plan_index()
+        if name is None:
+            plan = {"stage": "COLLSCAN"}
+        else:
+            plan = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": name}}
+        return {"queryPlanner": {"winningPlan": plan}}
+
+    async def to_list(self, length=None):
+        await self._collection._round_trip()
+        docs = self._materialize()
+        return docs if length is None else docs[:length]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._buffer is None:
+            await self._collection._round_trip()
+            self._buffer = deque(self._materialize())
+        if not self._buffer:
+            raise StopAsyncIteration
+        return self._buffer.popleft()
+
+
+class MemoryCollection:
+
+    def __init__(self, name, latency=0.0):
+        self.name = name
+        self.latency = latency
+        self._docs = []
+        self._ids = set()
+        self._indexes = {"_id_": {"key": [("_id", 1)]}}
+
+    async def _round_trip(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        else:
+            await asyncio.sleep(0)
+
+    def find(self, filter=None, projection=None, sort=None, limit=0, skip=0):
+        return MemoryCursor(self, filter, projection, sort, limit, skip)
+
+    async def find_one(self, filter=None, projection=None, sort=None):
+        docs = await self.find(filter, projection, sort, limit=1).to_list()
+        return docs[0] if docs else None
+
+    async def count_documents(self, filter=None):
+        await self._round_trip()
+        return sum(1 for d in self._docs if match(d, filter))
+
+    def _insert(self, document):
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        if document["_id"] in self._ids:
+            message = f"E11000 duplicate key error collection: {self.name} index: _id_ dup key: {{ _id: {document['_id']!r} }}"
+            raise DuplicateKeyError(message, 11000, {"code": 11000, "errmsg": message, "keyValue": {"_id": document["_id"]}})
+        self._ids.add(document["_id"])
+        self._docs.append(copy.deepcopy(document))
+        return document["_id"]
+
+    def _write_all(self, write, count, ordered, result):
+        # Server semantics: ordered writes stop at the first error, unordered
+        # ones run everything; either way errors surface as one BulkWriteError
+        write_errors = []
+        for index in range(count):
+            try:
+                write(index)
+            except DuplicateKeyError as e:
+                write_errors.append({"index": index, "code": e.code, "errmsg": str(e), "keyValue": e.details["keyValue"]})
+                if ordered:
+                    break
+        if write_errors:
+            raise BulkWriteError({**result, "writeErrors": write_errors, "writeConcernErrors": []})
+
+    async def insert_one(self, document):
+        await self._round_trip()
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents, ordered=True):
+        await self._round_trip()
+        result = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []}
+        inserted_ids = []
+
+        def insert(index):
+            inserted_ids.append(self._insert(documents[index]))
+            result["nInserted"] += 1
+
+        self._write_all(insert, len(documents), ordered, result)
+        return InsertManyResult(inserted_ids, True)
+
+    def _update(self, filter, update, upsert=False, many=False):
+        matched = modified = 0
+        for doc in self._docs:
+            if match(doc, filter):
+                before = copy.deepcopy(doc)
+                _apply_update(doc, update)
+                matched += 1
+                modified += doc != before
+                if not many:
+                    break
+
+        raw = {"n": matched, "nModified": modified, "ok": 1.0, "updatedExisting": matched > 0}
+        if matched == 0 and upsert:
+            doc = _seed_from_filter(filter)
+            _apply_update(doc, update, inserting=True)
+            raw["upserted"] = self._insert(doc)
+            raw["n"] = 1
+        return raw
+
+    async def update_one(self, filter, update, upsert=False):
+        await self._round_trip()
+        return UpdateResult(self._update(filter, update, upsert), True)
+
+    async def update_many(self, filter, update, upsert=False):
+        await self._round_trip()
+        return UpdateResult(self._update(filter, update, upsert, many=True), True)
+
+    async def find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False,
+                                  return_document=ReturnDocument.BEFORE):
+        await self._round_trip()
+        # Single-threaded event loop: match + update below is atomic like the server's
+        docs = [d for d in self._docs if match(d, filter)]
+        _sort_docs(docs, _normalize_sort(sort))
+        if docs:
+            doc = docs[0]
+            before = copy.deepcopy(doc)
+            _apply_update(doc, update)
+            result = doc if return_document == ReturnDocument.AFTER else before
+            return _project(copy.deepcopy(result), projection)
+        if upsert:
+            doc = _seed_from_filter(filter)
+            _apply_update(doc, update, inserting=True)
+            self._insert(doc)
+            if return_document == ReturnDocument.AFTER:
+                return _project(copy.deepcopy(doc), projection)
+        return None
+
+    def _delete(self, filter, many=False):
+        removed = 0
+        kept = []
+        for doc in self._docs:
+            if (many or not removed) and match(doc, filter):
+                self._ids.discard(doc["_id"])
+                removed += 1
+            else:
+                kept.append(doc)
+        self._docs = kept
+        return {"n": removed, "ok": 1.0}
+
+    async def delete_one(self, filter):
+        await self._round_trip()
+        return DeleteResult(self._delete(filter), True)
+
+    async def delete_many(self, filter):
+        await self._round_trip()
+        return DeleteResult(self._delete(filter, many=True), True)
+
+    async def bulk_write(self, requests, ordered=True):
+        await self._round_trip()
+        result = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []}
+
+        def write(index):
+            op = requests[index]
+            if isinstance(op, InsertOne):
+                self._insert(op._doc)
+                result["nInserted"] += 1
+            elif isinstance(op, (UpdateOne, UpdateMany)):
+                raw = self._update(op._filter, op._doc, op._upsert, many=isinstance(op, UpdateMany))
+                if "upserted" in raw:
+                    result["nUpserted"] += 1
+                    result["upserted"].append({"index": index, "_id": raw["upserted"]})
+                else:
+                    result["nMatched"] += raw["n"]
+                    result["nModified"] += raw["nModified"]
+            elif isinstance(op, (DeleteOne, DeleteMany)):
+                result["nRemoved"] += self._delete(op._filter, many=isinstance(op, DeleteMany))["n"]
+            else:
+                raise ValueError(f"Unsupported bulk operation: {op!r}")
+
+        self._write_all(write, len(requests), ordered, result)
+        return BulkWriteResult(result, True)
+
+    async def create_index(self, keys, **kwargs):
+        keys = _normalize_sort(keys)
+        name = kwargs.pop("name", None) or "_".join(f"{k}_{d}" for k, d in keys)
+        self._indexes[name] = {"key": keys, **kwargs}
+        return name
+
+    async def create_indexes(self, indexes):
+        return [await self.create_index(index.document["key"].items(), **{
+            k: v for k, v in index.document.items() if k != "key"
+        }) for index in indexes]
+
+    async def index_information(self):
+        return copy.deepcopy(self._indexes)
+
+    async def drop_index(self, name):
+        self._indexes.pop(name, None)
+
+    async def drop_indexes(self):
+        self._indexes = {"_id_": {"key": [("_id", 1)]}}
+
+    async def drop(self):
+        self._docs = []
+        self._ids = set()
+
+
+class MemoryDatabase:
+
+    def __init__(self, name, latency=0.0):
+        self.name = name
+        self.latency = latency
+        self._collections = {}
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name, self.latency)
+        return self._collections[name]
+
+    async def list_collection_names(self):
+        return list(self._collections)
+
+
+class MemoryClient:
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self._databases = {}
+
+    def __getitem__(self, name):
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(name, self.latency)
+        return self._databases[name]
+
+    async def server_info(self):
+        return {"version": "memory", "ok": 1.0}
+
+    def close(self):
+        pass
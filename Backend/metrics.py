@@ -0,0 +1,223 @@
+"""
+In-process performance metrics in Prometheus text format.
+
+    http_request_duration_seconds    per route template, method and status
+    pipeline_stage_duration_seconds  p-factor / retention / confidence /
+                                     Mongo / LLM stages of the write and
+                                     generate pipelines
+    llm_attempts_total               every model call, by outcome
+    llm_fallthrough_total            extra models launched after the first
+                                     (hedge, error, timeout)
+    llm_fallback_total               canned responses served instead of a model
+
+Request latency is measured up to the start of the response, so a
+long-lived SSE stream counts as the time to open it rather than its lifetime.
+Routes are labelled by their template ("/api/get-ocean-scores/{report_id}"),
+which keeps the label set bounded.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, "") for name in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram:
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        series = self._series.get(tuple(labels.get(name, "") for name in self.labelnames))
+        return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            snapshot = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        bounds = self.buckets + (float("inf"),)
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                le = (("le", _number(bound)),)
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {count}"
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"metric '{metric.name}' already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Time to response start per route.", ("method", "route", "status")
+)
+STAGE_LATENCY = registry.histogram(
+    "pipeline_stage_duration_seconds", "Time spent in each request pipeline stage.", ("pipeline", "stage")
+)
+LLM_ATTEMPTS = registry.counter(
+    "llm_attempts_total", "LLM model calls by outcome.", ("model", "outcome")
+)
+LLM_FALLTHROUGH = registry.counter(
+    "llm_fallthrough_total", "Models launched after the first one for a request.", ("reason",)
+)
+LLM_FALLBACKS = registry.counter(
+    "llm_fallback_total", "Canned responses served because no model answered.", ("path",)
+)
+
+
+def pipeline_timer(pipeline):
+    """`timed = pipeline_timer("save"); with timed("p_factor"): ...`"""
+    def timed(stage):
+        return STAGE_LATENCY.time(pipeline=pipeline, stage=stage)
+    return timed
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording REQUEST_LATENCY for every HTTP request."""
+
+    def __init__(self, app, histogram=REQUEST_LATENCY):
+        self.app = app
+        self.histogram = histogram
+        self._route_paths = {}
+
+    def _route(self, scope):
+        # The router leaves the matched endpoint in the scope; map it back to its template
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            for route in getattr(scope.get("app"), "routes", ()):
+                if getattr(route, "endpoint", None) is endpoint:
+                    path = route.path
+                    break
+            else:
+                path = "unmatched"
+            self._route_paths[endpoint] = path
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500, "recorded": False}
+
+        def record():
+            if not status["recorded"]:
+                status["recorded"] = True
+                self.histogram.observe(
+                    time.perf_counter() - started,
+                    method=scope["method"], route=self._route(scope), status=status["code"],
+                )
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                record()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Raised before a response was started
+            record()
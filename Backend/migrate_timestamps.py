@@ -0,0 +1,83 @@
+"""
+Convert legacy ISO-string timestamps to BSON dates in UTC.
+
+Older documents stored `datetime.now().isoformat()` strings, which are naive
+server-local time. This rewrites each field listed in TIMESTAMP_FIELDS that
+still holds a string to an aware UTC datetime. It is safe to re-run: only
+string values are selected (`$gte: ""` matches strings only, by BSON type
+bracketing), so migrated documents are skipped. The API reads both forms
+(timeutil.parse_timestamp) while this runs.
+
+Usage (from Backend/):
+    python migrate_timestamps.py --dry-run
+    python migrate_timestamps.py
+    python migrate_timestamps.py --utc     # legacy strings were written in UTC
+"""
+
+import argparse
+import asyncio
+import os
+
+from pymongo import UpdateOne
+
+from timeutil import parse_timestamp
+
+TIMESTAMP_FIELDS = {
+    "ocean_scores": ["saved_at", "generation_timestamp", "generation_started_at"],
+    "tasks": ["created_at"],
+    "cognitive_state": ["saved_at"],
+}
+
+
+async def migrate_field(collection, field, naive_is_local=True, batch_size=1000, dry_run=False):
+    """Returns (converted, failed) counts for one field."""
+    converted = failed = 0
+    operations = []
+    async for doc in collection.find({field: {"$gte": ""}}, [field]):
+        try:
+            value = parse_timestamp(doc[field], naive_is_local=naive_is_local)
+        except ValueError:
+            failed += 1
+            continue
+        converted += 1
+        if dry_run:
+            continue
+        # Match the old value too, so a concurrent rewrite of the field wins
+        operations.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: value}}))
+        if len(operations) >= batch_size:
+            await collection.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+    return converted, failed
+
+
+async def migrate(db, naive_is_local=True, batch_size=1000, dry_run=False, fields=TIMESTAMP_FIELDS):
+    report = {}
+    for collection, names in fields.items():
+        for field in names:
+            report[f"{collection}.{field}"] = await migrate_field(
+                db[collection], field, naive_is_local, batch_size, dry_run
+            )
+    return report
+
+
+async def main(args):
+    from database import get_client
+
+    client = get_client(os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    db = client["bigfive"]
+    report = await migrate(db, naive_is_local=not args.utc, batch_size=args.batch_size, dry_run=args.dry_run)
+
+    verb = "would convert" if args.dry_run else "converted"
+    for name, (converted, failed) in report.items():
+        note = f" ({failed} unparseable, left as-is)" if failed else ""
+        print(f"🕒 {name:36} {verb} {converted}{note}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert ISO-string timestamps to BSON UTC dates")
+    parser.add_argument("--dry-run", action="store_true", help="count what would change, write nothing")
+    parser.add_argument("--utc", action="store_true", help="treat naive legacy strings as UTC instead of local time")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
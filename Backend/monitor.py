@@ -1,94 +1,54 @@
-import requests
-import time
-import os
-from datetime import datetime
-from pymongo import MongoClient
-from memory.retention import calculate_retention_from_timestamp
-
-client = MongoClient("mongodb://localhost:27017")
-db = client["bigfive"]
-collection = db["ocean_scores"]
+import asyncio
+import sys
+from generation import generate_for_report, ocean_collection
+from scheduler import DegradationScheduler
 
 def get_retention_status(retention):
     if retention >= 0.40: return {"level": "clear", "emoji": ""}
     if retention >= 0.30: return {"level": "uncertain", "emoji": ""}
     return {"level": "reconstruction", "emoji": "🛑"}
 
-def watch_degradation(report_id, game_time_scale=60):
-   
-    last_day_announced = 0
-
-    while True:
-        candidate = collection.find_one({"report_id": report_id})
-        if not candidate:
-            print(" Candidate not found.")
-            break
-
-        created_at = datetime.fromisoformat(candidate["saved_at"])
-        retention, debug, phase = calculate_retention_from_timestamp(
-            p_factor=candidate["p_factor"],
-            created_at=created_at,
-            game_time_scale=game_time_scale
-        )
-
-        g_days_raw = debug["game_days"] 
-        real_secs = debug['real_seconds']
-        interpretation = get_retention_status(retention)
-
-        # 1.0 g_days = 24 hours
-        total_game_hours = g_days_raw * 24
+async def watch_degradation(report_ids=None):
+    
+    # One scheduler for every NPC: wakes only at day boundaries and 40% / 30%
+    # crossings and triggers the linguistic engine in-process (no self-HTTP)
+    async def on_event(event):
+        result = await generate_for_report(event["report_id"])
+        if result is None:
+            print(f" Candidate not found: {event['report_id']}")
+            return
         
-        display_days = int(g_days_raw)
-        display_hours = int(total_game_hours % 24)
-        display_minutes = int((total_game_hours * 60) % 60)
-
-        # Notify when a full day passes
-        current_day_int = int(g_days_raw)
-        if current_day_int > last_day_announced:
-            print(f"\n NEW DAY: Day {current_day_int} has started!")
-            print(f" TRIGGERING LINGUISTIC ENGINE...")
-            
-            try:
-                # Trigger linguistic generation via API
-                resp = requests.post(f"http://localhost:8000/api/generate-npc-response/{report_id}")
-                if resp.status_code == 200:
-                    data = resp.json()
-                    print(f" NPC SAYS: {data['response']}")
-                else:
-                    print(f" Generation failed: {resp.status_code}")
-            except Exception as e:
-                print(f" API Error: {str(e)}")
-            
-            last_day_announced = current_day_int
-            time.sleep(1)
-
-        os.system('cls' if os.name == 'nt' else 'clear')
+        retention = result["metadata"]["retention_val"]
+        interpretation = get_retention_status(retention)
         
-        # Real Timer
-        mins = int(real_secs // 60)
-        secs = int(real_secs % 60)
-
-        print("="*50)
-        print(f" MADE ENGINE: LIVE DEGRADATION MONITOR")
-        print("="*50)
-        print(f"Report ID:    {report_id}")
+        if event["kind"] == "day":
+            print(f"\n NEW DAY: Day {event['game_day']} has started for {event['report_id']}!")
+        else:
+            print(f"\n THRESHOLD: {event['report_id']} crossed {event['threshold']*100:.0f}%")
+        print(f" RETENTION:    {retention*100:.2f}% {interpretation['emoji']}")
+        print(f" STATUS:       {interpretation['level'].upper()}")
+        print(f" NPC SAYS: {result['response']}")
         
-        print(f"Game Clock:   Day {display_days} | {display_hours:02d}:{display_minutes:02d}") 
-        print(f"Real Timer:   {mins}m {secs}s (60s = 1 Day)")
-        print(f"P-Factor:     {status['p_factor']:.4f}")
-        print(f"RETENTION:    {retention*100:.2f}% {interpretation['emoji']}")
-        print(f"STATUS:       {interpretation['level'].upper()}")
-        print("-"*50)
-
-        bar_length = 20
-        filled = int(retention * bar_length)
-        bar = "" * filled + "-" * (bar_length - filled)
-        print(f"[{bar}]")
-
-        if retention <= 0.30:
+        if event["kind"] == "threshold" and event["threshold"] <= 0.30:
             print(f"\n THRESHOLD REACHED: Memory degraded to 30%.")
-            print(f" Total Time: Day {display_days}, {display_hours}h {display_minutes}m")
             print(f"  Reconstruction is now required.")
-            break
-
-        time.sleep(1)
\ No newline at end of file
+    
+    scheduler = DegradationScheduler(on_event)
+    tracked = await scheduler.load(ocean_collection, report_ids)
+    if not tracked:
+        print(" Candidate not found.")
+        return
+    
+    print("="*50)
+    print(f" MADE ENGINE: LIVE DEGRADATION MONITOR")
+    print("="*50)
+    print(f"Tracking {tracked} NPC(s) (60s = 1 Day)")
+    
+    await scheduler.run(stop_when_idle=True)
+    print(f"\n All tracked NPCs reached the reconstruction threshold. {scheduler.metrics()}")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(watch_degradation(sys.argv[1:] or None))
+    except KeyboardInterrupt:
+        print("\n Monitor stopped by user.")
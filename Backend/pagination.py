@@ -0,0 +1,69 @@
+"""
+Keyset pagination helpers for saved_at-ordered listings.
+
+Pages are ordered newest first on (saved_at, _id). The cursor is an opaque
+token holding the last document's sort key, so each page is a bounded,
+index-friendly range query instead of an ever-growing skip.
+
+saved_at is a BSON date; documents not yet migrated still hold ISO strings.
+Mongo sorts every date above every string, so a descending walk covers the
+dates first and then the legacy strings. The cursor records which kind it
+stopped on.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from bson import ObjectId
+
+from jsonutil import json_default
+from timeutil import parse_timestamp
+
+SORT = [("saved_at", -1), ("_id", -1)]
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(doc):
+    saved_at = doc["saved_at"]
+    if isinstance(saved_at, datetime):
+        payload = {"d": saved_at.isoformat(), "id": str(doc["_id"])}
+    else:
+        payload = {"s": saved_at, "id": str(doc["_id"])}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(token):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        last_id = ObjectId(payload["id"])
+        saved_at = parse_timestamp(payload["d"]) if "d" in payload else payload["s"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+    after = [
+        {"saved_at": {"$lt": saved_at}},
+        {"saved_at": saved_at, "_id": {"$lt": last_id}},
+    ]
+    if isinstance(saved_at, datetime):
+        # Every legacy string sorts after every date
+        after.append({"saved_at": {"$gte": ""}})
+    return {"$or": after}
+
+
+def parse_fields(fields):
+    if not fields:
+        return None
+    # saved_at and _id are always returned: they make up the cursor
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    return list(dict.fromkeys(["saved_at", *requested]))
+
+
+def to_json(doc):
+    doc["_id"] = str(doc["_id"])
+    return doc
+
+
+async def ndjson_lines(cursor):
+    async for doc in cursor:
+        yield json.dumps(to_json(doc), default=json_default) + "\n"
@@ -1,4 +1,8 @@
 import math
+import numpy as np
+
+# Trait order for the batch API
+TRAITS = ('openness', 'conscientiousness', 'extraversion', 'agreeableness', 'neuroticism')
 
 def calculate_p_factor(normalized_scores):
     
@@ -14,6 +18,24 @@ def calculate_p_factor(normalized_scores):
     return max(0.5, min(1.5, round(p_factor, 4)))
 
 
+def calculate_p_factor_batch(normalized_scores):
+    """
+    Vectorized calculate_p_factor for many assessments at once.
+
+    Accepts a list of normalized-score dicts or an (n, 5) array in TRAITS
+    order; returns an array identical to calling calculate_p_factor per item.
+    """
+    if len(normalized_scores) and isinstance(normalized_scores[0], dict):
+        normalized_scores = [[scores.get(trait, 0.5) for trait in TRAITS] for scores in normalized_scores]
+    scores = np.asarray(normalized_scores, dtype=np.float64).reshape(-1, len(TRAITS))
+    
+    # Same term order as the scalar formula so results match bit for bit
+    O, C, E, A, N = scores.T
+    p_factor = 1.0 + (0.235 * O) + (0.229 * C) + (0.170 * E) + (0.076 * A) - (0.192 * N)
+    
+    return np.clip(np.round(p_factor, 4), 0.5, 1.5)
+
+
 def calculate_p_factor_with_breakdown(normalized_scores):
     
     O = normalized_scores.get('openness', 0.5)
@@ -0,0 +1,230 @@
+"""
+Event-driven degradation scheduler.
+
+Replaces the per-NPC `while True` monitors with one asyncio task and a heap
+keyed on each NPC's next event: the next game-day boundary or the next
+0.40 / 0.30 threshold crossing (solved in closed form, see
+memory.retention.next_transition). Nothing is polled; the loop sleeps until
+the earliest event is due. Tracking stops once an NPC reaches the 30% floor.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+from datetime import datetime, timedelta, timezone
+
+from app_logging import fields, get_logger
+from memory.retention import STOP_THRESHOLD, next_transition
+from timeutil import parse_timestamp, utcnow
+
+logger = get_logger("scheduler")
+
+
+class Clock:
+
+    def now(self):
+        return utcnow()
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+class FakeClock(Clock):
+    """Virtual clock for tests: sleeping advances time instantly."""
+
+    def __init__(self, start=None):
+        self.current = start or datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def now(self):
+        return self.current
+
+    def advance(self, seconds):
+        self.current += timedelta(seconds=seconds)
+
+    async def sleep(self, seconds):
+        self.advance(seconds)
+        await asyncio.sleep(0)
+
+
+class DegradationScheduler:
+
+    def __init__(self, on_event, clock=None, game_time_scale=60, max_concurrency=16):
+        self.on_event = on_event
+        self.clock = clock or Clock()
+        self.game_time_scale = game_time_scale
+        self.max_concurrency = max_concurrency
+        self._heap = []
+        self._npcs = {}
+        self._versions = {}
+        self._sequence = itertools.count()
+        # Version tokens are unique across all NPCs and never reused, so a heap
+        # entry can only match the tracking it was scheduled for
+        self._tokens = itertools.count(1)
+        self._wakeup = asyncio.Event()
+        self._running = False
+        self.fired = 0
+        self.failed = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._total_lag = 0.0
+
+    # -- tracking -----------------------------------------------------------
+
+    def _game_days(self, npc, when):
+        return (when - npc["created_at"]).total_seconds() / self.game_time_scale
+
+    def _at_game_day(self, npc, day):
+        return npc["created_at"] + timedelta(seconds=day * self.game_time_scale)
+
+    def _next_event(self, npc, now, after_day=None):
+        days = self._game_days(npc, now)
+        if after_day is not None:
+            days = max(days, after_day)
+        upcoming = next_transition(npc["p_factor"], days)
+        if upcoming is None:
+            return None
+
+        threshold, crossing_day = upcoming
+        next_day = math.floor(days) + 1
+        if next_day < crossing_day:
+            return self._at_game_day(npc, next_day), {"kind": "day", "game_day": next_day}
+        return self._at_game_day(npc, crossing_day), {
+            "kind": "threshold", "threshold": threshold, "game_day": crossing_day
+        }
+
+    def _schedule(self, report_id, now, after_day=None):
+        npc = self._npcs[report_id]
+        upcoming = self._next_event(npc, now, after_day)
+        if upcoming is None:
+            self.untrack(report_id)
+            return
+        when, detail = upcoming
+        heapq.heappush(self._heap, (when, next(self._sequence), report_id, self._versions[report_id], detail))
+
+    def track(self, report_id, p_factor, created_at):
+        # Re-tracking takes a new version so stale heap entries are skipped
+        self._versions[report_id] = next(self._tokens)
+        self._npcs[report_id] = {"p_factor": p_factor, "created_at": created_at}
+        self._schedule(report_id, self.clock.now())
+        self._wakeup.set()
+        return self._versions.get(report_id)
+
+    def untrack(self, report_id, version=None):
+        # With a version, only that tracking is dropped (not a later re-track)
+        if version is not None and self._versions.get(report_id) != version:
+            return
+        # Leftover heap entries carry a token nothing will match again: drop the entry
+        self._npcs.pop(report_id, None)
+        self._versions.pop(report_id, None)
+
+    def tracking(self, report_id):
+        return report_id in self._npcs
+
+    @property
+    def running(self):
+        return self._running
+
+    async def load(self, collection, report_ids=None):
+        query = {"report_id": {"$in": list(report_ids)}} if report_ids else {}
+        cursor = collection.find(
+            query,
+            {"report_id": 1, "p_factor": 1, "saved_at": 1},
+            sort=[("report_id", 1), ("saved_at", -1)],
+        )
+        seen = set()
+        async for doc in cursor:
+            if doc["report_id"] in seen:
+                continue
+            seen.add(doc["report_id"])
+            self.track(doc["report_id"], doc["p_factor"], parse_timestamp(doc["saved_at"]))
+        return len(seen)
+
+    # -- dispatch -----------------------------------------------------------
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, _, report_id, version, detail = heapq.heappop(self._heap)
+            if self._versions.get(report_id) == version and report_id in self._npcs:
+                due.append((when, report_id, detail))
+        return due
+
+    async def _fire(self, semaphore, when, report_id, detail):
+        async with semaphore:
+            fired_at = self.clock.now()
+            lag = (fired_at - when).total_seconds()
+            event = {
+                "report_id": report_id,
+                "scheduled_at": when,
+                "fired_at": fired_at,
+                "lag_seconds": lag,
+                **detail,
+            }
+            try:
+                await self.on_event(event)
+            except Exception:
+                self.failed += 1
+                logger.exception("scheduler event failed", extra=fields(report_id=report_id))
+
+            self.fired += 1
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self._total_lag += lag
+
+            if detail["kind"] == "threshold" and detail["threshold"] <= STOP_THRESHOLD:
+                self.untrack(report_id)
+            elif report_id in self._npcs:
+                self._schedule(report_id, fired_at, after_day=detail["game_day"])
+
+    async def run_pending(self):
+        due = self._pop_due(self.clock.now())
+        if due:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            await asyncio.gather(*(self._fire(semaphore, *item) for item in due))
+        return len(due)
+
+    def _seconds_until_next(self):
+        while self._heap:
+            when, _, report_id, version, _ = self._heap[0]
+            if self._versions.get(report_id) == version and report_id in self._npcs:
+                return max(0.0, (when - self.clock.now()).total_seconds())
+            heapq.heappop(self._heap)
+        return None
+
+    async def run(self, stop_when_idle=False):
+        self._running = True
+        while self._running:
+            await self.run_pending()
+            delay = self._seconds_until_next()
+            if delay is None and stop_when_idle:
+                break
+            self._wakeup.clear()
+
+            sleeper = asyncio.ensure_future(self.clock.sleep(delay)) if delay is not None else None
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            pending = {task for task in (sleeper, waiter) if task is not None}
+            try:
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in pending:
+                    task.cancel()
+        self._running = False
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
+
+    # -- metrics ------------------------------------------------------------
+
+    def metrics(self):
+        return {
+            "running": self._running,
+            "tracked_npcs": len(self._npcs),
+            "queue_depth": len(self._heap),
+            "events_fired": self.fired,
+            "events_failed": self.failed,
+            "last_lag_seconds": round(self.last_lag, 4),
+            "max_lag_seconds": round(self.max_lag, 4),
+            "avg_lag_seconds": round(self._total_lag / self.fired, 4) if self.fired else 0.0,
+        }
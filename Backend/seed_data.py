@@ -1,16 +1,26 @@
 from pymongo import MongoClient
-from datetime import datetime
+from datetime import timedelta
+import argparse
 import os
+import random
+import time
 from dotenv import load_dotenv
 
+from pfactor import calculate_p_factor
+from memory.retention import transition_fields
+from timeutil import utcnow
+
 # Load environment variables
 load_dotenv()
 
 # MongoDB Connection
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
-client = MongoClient(MONGO_URL)
+client = MongoClient(MONGO_URL, tz_aware=True)
 db = client["bigfive"]
 ocean_collection = db["ocean_scores"]
+tasks_collection = db["tasks"]
+
+TRAITS = ["openness", "conscientiousness", "extraversion", "agreeableness", "neuroticism"]
 
 # Sample Data provided by user
 sample_data = {
@@ -32,7 +42,7 @@ sample_data = {
     "agreeableness": 0.8,
     "neuroticism": 0.5166666666666667
   },
-  "saved_at": datetime.now().isoformat()
+  "saved_at": utcnow()
 }
 
 def seed_database():
@@ -54,5 +64,65 @@ def seed_database():
     except Exception as e:
         print(f"❌ Error seeding database: {e}")
 
+def make_npc_document(index, rng, now, max_age_days=30):
+    # Synthetic NPC shaped like a save-ocean-scores document
+    raw = {trait: rng.randint(24, 120) for trait in TRAITS}
+    normalized = {trait: score / 120 for trait, score in raw.items()}
+    p_factor = calculate_p_factor(normalized)
+    saved_at = now - timedelta(seconds=rng.uniform(0, max_age_days * 86400))
+    return {
+        "report_id": f"seed-{index:07d}",
+        "timestamp": saved_at.isoformat().replace("+00:00", "Z"),
+        "p_factor": p_factor,
+        "priority_mock": 0.32,
+        "ocean_scores": raw,
+        "ocean_normalized": normalized,
+        "saved_at": saved_at,
+        "last_linguistic_response": "Initial data ingestion and personality assessment.",
+        **transition_fields(p_factor, saved_at, now=now)
+    }
+
+def make_task_document(report_id, rng, now):
+    return {
+        "task_name": f"Task {rng.randint(1, 999)}",
+        "importance_kk": round(rng.uniform(0.1, 1.0), 2),
+        "required_time_trk": round(rng.uniform(0.5, 8.0), 2),
+        "available_time_tak": round(rng.uniform(1.0, 24.0), 2),
+        "report_id": report_id,
+        "created_at": now - timedelta(seconds=rng.uniform(0, 86400))
+    }
+
+def seed_population(count, batch_size=10000, tasks_per_npc=0, seed=42):
+    rng = random.Random(seed)
+    now = utcnow()
+    started = time.perf_counter()
+    
+    for offset in range(0, count, batch_size):
+        npcs = [make_npc_document(i, rng, now) for i in range(offset, min(count, offset + batch_size))]
+        ocean_collection.insert_many(npcs, ordered=False)
+        
+        if tasks_per_npc:
+            tasks = [make_task_document(npc["report_id"], rng, now) for npc in npcs for _ in range(tasks_per_npc)]
+            tasks_collection.insert_many(tasks, ordered=False)
+        
+        done = min(count, offset + batch_size)
+        print(f"\r🌱 Seeded {done}/{count} NPCs ({done / (time.perf_counter() - started):.0f}/s)", end="")
+    
+    print(f"\n🎉 Seeded {count} NPCs in {time.perf_counter() - started:.1f}s")
+
 if __name__ == "__main__":
-    seed_database()
+    parser = argparse.ArgumentParser(description="Seed the MADE database")
+    parser.add_argument("--count", type=int, default=0, help="Number of synthetic NPCs to insert (e.g. 1000000)")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--tasks-per-npc", type=int, default=0)
+    parser.add_argument("--drop", action="store_true", help="Remove previously seeded NPCs first")
+    args = parser.parse_args()
+    
+    if args.drop:
+        ocean_collection.delete_many({"report_id": {"$regex": "^seed-"}})
+        tasks_collection.delete_many({"report_id": {"$regex": "^seed-"}})
+    
+    if args.count:
+        seed_population(args.count, args.batch_size, args.tasks_per_npc)
+    else:
+        seed_database()
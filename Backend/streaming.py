@@ -0,0 +1,95 @@
+"""
+Server-sent events fan-out for live retention.
+
+Each degradation event (game-day tick or threshold crossing) is computed once
+by the scheduler and published here; every subscriber watching that
+report_id gets the same payload through its own bounded queue. Slow clients
+drop their oldest events instead of holding up the publisher.
+
+event_stream subscribes when the response body starts, not when the route
+returns, so a client that disconnects before streaming starts leaves nothing
+registered behind.
+"""
+
+import asyncio
+import json
+
+from jsonutil import json_default
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=json_default)}\n\n"
+
+
+class Subscription:
+
+    def __init__(self, report_ids, max_queue=100):
+        self.report_ids = set(report_ids)
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def push(self, event, data):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait((event, data))
+
+
+class RetentionBroadcaster:
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscribers = {}
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, report_ids):
+        subscription = Subscription(report_ids, self.max_queue)
+        for report_id in subscription.report_ids:
+            self._subscribers.setdefault(report_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        for report_id in subscription.report_ids:
+            watchers = self._subscribers.get(report_id)
+            if watchers is not None:
+                watchers.discard(subscription)
+                if not watchers:
+                    del self._subscribers[report_id]
+
+    def has_subscribers(self, report_id):
+        return report_id in self._subscribers
+
+    def publish(self, report_id, event, data):
+        watchers = self._subscribers.get(report_id, ())
+        for subscription in watchers:
+            subscription.push(event, data)
+        self.published += 1
+        self.delivered += len(watchers)
+        return len(watchers)
+
+    def stats(self):
+        return {
+            "watched_reports": len(self._subscribers),
+            "subscriptions": len({s for watchers in self._subscribers.values() for s in watchers}),
+            "events_published": self.published,
+            "events_delivered": self.delivered,
+        }
+
+
+async def event_stream(broadcaster, report_ids, initial_states, is_disconnected, heartbeat_seconds=15):
+    subscription = broadcaster.subscribe(report_ids)
+    try:
+        for state in initial_states:
+            yield sse_event("snapshot", state)
+
+        while not await is_disconnected():
+            try:
+                event, data = await asyncio.wait_for(subscription.queue.get(), heartbeat_seconds)
+            except asyncio.TimeoutError:
+                # SSE comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            yield sse_event(event, data)
+    finally:
+        broadcaster.unsubscribe(subscription)
@@ -0,0 +1,59 @@
+import io
+import json
+import logging
+import unittest
+
+from app_logging import SamplingFilter, configure_logging, fields, get_logger, shutdown_logging
+from memory.confidece import calculate_confidence
+
+
+class TestAppLogging(unittest.TestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+
+    def tearDown(self):
+        configure_logging(level="INFO", json_format=False, sample_rate=1.0, levels={})
+
+    def output(self):
+        shutdown_logging()
+        return self.stream.getvalue()
+
+    def test_hot_paths_are_quiet_by_default(self):
+        configure_logging(level="INFO", levels={}, stream=self.stream)
+        calculate_confidence(0.5, seed=1)
+        get_logger("api").info("saved ocean scores", extra=fields(report_id="npc-1"))
+        output = self.output()
+        self.assertNotIn("confidence", output)
+        self.assertIn("api: saved ocean scores report_id=npc-1", output)
+
+    def test_debug_detail_per_logger(self):
+        configure_logging(level="INFO", levels={"memory": "DEBUG"}, stream=self.stream)
+        calculate_confidence(0.5, seed=1)
+        get_logger("api").debug("not shown")
+        output = self.output()
+        self.assertIn("memory.confidence: confidence retention=0.5", output)
+        self.assertNotIn("not shown", output)
+
+    def test_json_format_with_exception(self):
+        configure_logging(level="INFO", json_format=True, levels={}, stream=self.stream)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            get_logger("jobs").exception("job failed", extra=fields(job_id="j1"))
+        record = json.loads(self.output().strip())
+        self.assertEqual((record["level"], record["logger"], record["job_id"]), ("ERROR", "jobs", "j1"))
+        self.assertIn("ValueError: boom", record["exc"])
+
+    def test_sampling_only_thins_debug(self):
+        draws = iter([0.1, 0.9, 0.1, 0.9])
+        sampler = SamplingFilter(rate=0.5, rng=lambda: next(draws))
+        debug = logging.LogRecord("made.x", logging.DEBUG, __file__, 1, "m", None, None)
+        warning = logging.LogRecord("made.x", logging.WARNING, __file__, 1, "m", None, None)
+        kept = [sampler.filter(debug) for _ in range(4)]
+        self.assertEqual(kept, [True, False, True, False])
+        self.assertTrue(sampler.filter(warning))
+        self.assertEqual(sampler.dropped, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
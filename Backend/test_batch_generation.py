@@ -0,0 +1,62 @@
+import asyncio
+import os
+import unittest
+from datetime import timedelta
+
+os.environ.setdefault("MONGO_URL", "memory://")
+
+import main
+from memory.retention import TRANSITION_THRESHOLD
+from timeutil import utcnow
+
+
+def report(report_id, p_factor, minutes_ago, **extra):
+    return {"report_id": report_id, "p_factor": p_factor, "saved_at": utcnow() - timedelta(minutes=minutes_ago), **extra}
+
+
+class TestBatchGeneration(unittest.TestCase):
+    def setUp(self):
+        asyncio.run(main.ocean_collection.delete_many({}))
+
+    def test_partial_misses_and_transition_fields(self):
+        stale = utcnow() - timedelta(hours=1)
+
+        async def scenario():
+            await main.ocean_collection.insert_many([
+                # Stored crossing is an hour in the past; regeneration must move it forward
+                report("a", 1.2, 0, next_transition_at=stale, next_transition_threshold=TRANSITION_THRESHOLD),
+                report("b", 0.9, 10),
+            ])
+            result = await main.generate_responses(main.NpcBatchRequest(report_ids=["a", "ghost", "b", "a"]))
+            docs = await main.ocean_collection.find({}, sort=[("report_id", 1)]).to_list(length=None)
+            return result, docs
+
+        result, docs = asyncio.run(scenario())
+        self.assertEqual(result["missing"], ["ghost"])
+        self.assertEqual([entry["report_id"] for entry in result["results"]], ["a", "b"])
+
+        single = {}
+        for doc in docs:
+            self.assertEqual(doc["last_linguistic_response"], result["results"][docs.index(doc)]["response"])
+            self.assertIn("generation_timestamp", doc)
+            single[doc["report_id"]] = doc
+        # Same fields generate_for_report writes: the crossing is in the future again
+        self.assertEqual(single["a"]["next_transition_threshold"], TRANSITION_THRESHOLD)
+        self.assertGreater(single["a"]["next_transition_at"], utcnow())
+        self.assertIn("next_transition_at", single["b"])
+
+    def test_single_and_batch_write_the_same_fields(self):
+        async def scenario():
+            await main.ocean_collection.insert_many([report("a", 1.1, 1), report("b", 1.1, 1)])
+            await main.generate_for_report("a")
+            await main.generate_responses(main.NpcBatchRequest(report_ids=["b"]))
+            return await main.ocean_collection.find({}, sort=[("report_id", 1)]).to_list(length=None)
+
+        single, batch = asyncio.run(scenario())
+        self.assertEqual(set(single), set(batch))
+        self.assertEqual(single["next_transition_threshold"], batch["next_transition_threshold"])
+        self.assertLess(abs((single["next_transition_at"] - batch["next_transition_at"]).total_seconds()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+import random
+import unittest
+from unittest import mock
+
+os.environ.setdefault("MONGO_URL", "memory://")
+
+from starlette.requests import Request
+
+import main
+from job_queue import JobQueue, SQLiteJobStore
+from pfactor import TRAITS, calculate_p_factor, calculate_p_factor_batch
+
+
+def make_request(body, content_type, chunk_size=64):
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+
+    async def receive():
+        chunk = chunks.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/save-ocean-scores/batch",
+        "headers": [(b"content-type", content_type.encode())],
+    }
+    return Request(scope, receive)
+
+
+def isolated_job_queue(test, **options):
+    # main's handlers on a private store, retried without backoff; drain() runs it to completion
+    queue = JobQueue(SQLiteJobStore(":memory:"), main.job_queue.handlers, on_dead_letter=main.handle_dead_job,
+                     base_delay=0.0, **options)
+    patcher = mock.patch.object(main, "job_queue", queue)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return queue
+
+
+def assessment(report_id, value=0.5):
+    scores = {trait: value for trait in TRAITS}
+    return {
+        "report_id": report_id,
+        "timestamp": "2026-01-31T08:03:22.735Z",
+        "ocean_scores": {trait: value * 120 for trait in TRAITS},
+        "ocean_normalized": scores,
+    }
+
+
+class TestBulkIngest(unittest.TestCase):
+    def setUp(self):
+        asyncio.run(main.ocean_collection.delete_many({}))
+
+    def test_p_factor_batch_matches_scalar(self):
+        rng = random.Random(3)
+        items = [{trait: rng.uniform(-0.2, 1.2) for trait in TRAITS} for _ in range(5000)]
+        batch = calculate_p_factor_batch(items)
+        self.assertEqual(batch.tolist(), [calculate_p_factor(item) for item in items])
+
+    def test_json_array_with_per_item_errors(self):
+        items = [assessment("a"), {"report_id": "bad"}, assessment("b", 0.8)]
+        request = make_request(json.dumps(items).encode(), "application/json")
+
+        async def scenario():
+            result = await main.save_ocean_scores_batch(request)
+            docs = await main.ocean_collection.find({}, sort=[("report_id", 1)]).to_list(length=None)
+            return result, docs
+
+        result, docs = asyncio.run(scenario())
+        self.assertEqual(result["inserted"], 2)
+        self.assertEqual([e["index"] for e in result["errors"]], [1])
+        self.assertEqual(result["errors"][0]["report_id"], "bad")
+        self.assertEqual([d["report_id"] for d in docs], ["a", "b"])
+        self.assertTrue(all(d["generation_status"] == "pending" for d in docs))
+
+    def test_ndjson_stream_in_chunks(self):
+        lines = [json.dumps(assessment(f"npc-{i}")) for i in range(25)] + ["{not json"]
+        request = make_request("\n".join(lines).encode(), "application/x-ndjson", chunk_size=50)
+
+        original = main.INGEST_CHUNK_SIZE
+        main.INGEST_CHUNK_SIZE = 10
+        try:
+            result = asyncio.run(main.save_ocean_scores_batch(request))
+        finally:
+            main.INGEST_CHUNK_SIZE = original
+
+        self.assertEqual(result["received"], 26)
+        self.assertEqual(result["inserted"], 25)
+        self.assertEqual(result["errors"][0]["index"], 25)
+
+    def test_oversized_ndjson_batch_stores_nothing(self):
+        lines = [json.dumps(assessment(f"npc-{i}")) for i in range(7)]
+        request = make_request("\n".join(lines).encode(), "application/x-ndjson", chunk_size=50)
+
+        originals = main.INGEST_CHUNK_SIZE, main.MAX_INGEST_BATCH
+        main.INGEST_CHUNK_SIZE, main.MAX_INGEST_BATCH = 2, 5
+        try:
+            with self.assertRaises(main.HTTPException) as caught:
+                asyncio.run(main.save_ocean_scores_batch(request))
+        finally:
+            main.INGEST_CHUNK_SIZE, main.MAX_INGEST_BATCH = originals
+
+        self.assertEqual(caught.exception.status_code, 413)
+        self.assertEqual(asyncio.run(main.ocean_collection.count_documents({})), 0)
+
+    def test_deferred_generation_fills_pending_documents(self):
+        queue = isolated_job_queue(self)
+        request = make_request(json.dumps([assessment("a"), assessment("b")]).encode(), "application/json")
+
+        async def scenario():
+            await main.save_ocean_scores_batch(request)
+            queued = await queue.store.counts()
+            await queue.drain()
+            return queued, await main.ocean_collection.find({}, sort=[("report_id", 1)]).to_list(length=None)
+
+        queued, docs = asyncio.run(scenario())
+        # Durable jobs, one per stored document
+        self.assertEqual(queued["queued"], 2)
+        self.assertEqual([doc["generation_status"] for doc in docs], ["done", "done"])
+        self.assertTrue(all(doc.get("last_linguistic_response") for doc in docs))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import asyncio
+import unittest
+
+from memory.client_pool import ModelPool
+from memory.linguistic import generate_npc_response_async
+from test_linguistic_async import fake_factory
+
+
+class ManualClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def generate(pool, names):
+    return asyncio.run(generate_npc_response_async(
+        "The security breach", "High Confidence", "Phase 1 (Fast)", 0.85,
+        model_names=names, pool=pool, cache=None, limiter=None, hedge_delay=1.0
+    ))
+
+
+class TestModelPool(unittest.TestCase):
+    def test_handles_are_built_once_and_configure_is_lazy(self):
+        calls, configured = [], []
+        pool = ModelPool(fake_factory({"a": (0.001, None)}, calls), configure=lambda: configured.append(1))
+        self.assertEqual(configured, [])
+        for _ in range(3):
+            self.assertEqual(generate(pool, ["a"]), "a says hi")
+        self.assertEqual(calls, ["a"])
+        self.assertEqual(configured, [1])
+        self.assertEqual((pool.created, pool.reused), (1, 2))
+
+    def test_retired_model_is_skipped_until_ttl(self):
+        clock = ManualClock()
+        calls = []
+        specs = {"old": (0.001, "404 models/old is not found"), "new": (0.001, None)}
+        pool = ModelPool(fake_factory(specs, calls), dead_ttl=60, clock=clock)
+
+        self.assertEqual(generate(pool, ["old", "new"]), "new says hi")
+        self.assertEqual(generate(pool, ["old", "new"]), "new says hi")
+        self.assertEqual(calls, ["old", "new"])
+        self.assertEqual(pool.stats()["dead_models"], ["old"])
+
+        clock.now += 60
+        self.assertEqual(pool.order(["old", "new"]), ["new", "old"])
+
+    def test_last_success_is_tried_first(self):
+        pool = ModelPool(lambda name: name)
+        pool.record_success("b")
+        self.assertEqual(pool.order(["a", "b", "c"]), ["b", "a", "c"])
+
+    def test_all_dead_falls_back_to_full_list(self):
+        pool = ModelPool(lambda name: name)
+        pool.record_error("a", Exception("404 not found"))
+        pool.record_error("b", Exception("model b is deprecated"))
+        self.assertEqual(pool.order(["a", "b"]), ["a", "b"])
+
+    def test_transient_errors_do_not_mark_dead(self):
+        pool = ModelPool(lambda name: name)
+        pool.record_error("a", Exception("429 quota exceeded"))
+        pool.record_error("a", asyncio.TimeoutError())
+        self.assertFalse(pool.is_dead("a"))
+
+
+if __name__ == '__main__':
+    unittest.main()
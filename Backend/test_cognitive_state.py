@@ -0,0 +1,90 @@
+import asyncio
+import unittest
+from datetime import timedelta
+
+from cognitive_state import CognitiveStateView, next_refresh_day, retention_band
+from database import get_client
+from memory.confidece import calculate_confidence
+from memory.retention import calculate_retention, time_to_threshold
+from memory.seeding import derive_seed
+from scheduler import FakeClock
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestCognitiveStateView(unittest.TestCase):
+    def setUp(self):
+        self.db = get_client("memory://")["bigfive"]
+        self.clock = FakeClock()
+        self.view = CognitiveStateView(self.db["cognitive_state"], clock=self.clock)
+
+    def stored(self, report_id):
+        return run(self.db["cognitive_state"].find_one({"report_id": report_id}))
+
+    def test_state_matches_the_per_request_pipeline(self):
+        created_at = self.clock.now() - timedelta(seconds=75)
+        run(self.view.track("npc", 1.1, created_at))
+
+        state = self.stored("npc")
+        retention, phase, _ = calculate_retention(1.1, 75 / 60)
+        conf_val, conf_label = calculate_confidence(retention, seed=derive_seed("npc", 75 / 60))
+        self.assertEqual((state["retention"], state["phase"]), (retention, phase))
+        self.assertEqual((state["confidence_score"], state["confidence_label"]), (conf_val, conf_label))
+        self.assertEqual(state["retention_band"], retention_band(retention))
+        self.assertEqual(state["next_transition_threshold"], 0.40)
+
+    def test_ticker_only_writes_changed_buckets(self):
+        start = self.clock.now()
+        run(self.view.track_many((f"npc-{i}", 0.5 + i / 100, start) for i in range(100)))
+        self.assertEqual(self.view.written, 100)
+
+        # Nothing can change before the earliest scheduled refresh
+        self.clock.advance(0.01)
+        self.assertEqual(run(self.view.refresh_due()), 0)
+
+        for _ in range(200):
+            self.clock.advance(5)
+            run(self.view.refresh_due())
+        stats = self.view.stats()
+        self.assertLess(stats["written"], stats["recomputed"])
+
+        # Stored state stays in the same bucket as a fresh computation
+        now = self.clock.now()
+        for i in (0, 50, 99):
+            state = self.stored(f"npc-{i}")
+            fresh = self.view.compute([f"npc-{i}"], [0.5 + i / 100], [start], now)[0]
+            self.assertEqual(self.view.bucket(state), self.view.bucket(fresh))
+
+    def test_refresh_is_scheduled_at_band_edges_and_day_boundaries(self):
+        # p=1.0 at day 0: band 1.0 -> next edge is the 0.95 crossing, well before day 1
+        self.assertAlmostEqual(next_refresh_day(1.0, 0.0, 0.95), time_to_threshold(1.0, 0.95), places=2)
+        # At the 0.30 floor only the day boundary remains
+        self.assertAlmostEqual(next_refresh_day(1.0, 20.3, 0.30), 21.0, places=2)
+
+    def test_rebuild_writes_only_missing_or_changed_states(self):
+        ocean = self.db["ocean_scores"]
+        saved_at = self.clock.now()
+        run(ocean.insert_many([
+            {"report_id": f"npc-{i}", "p_factor": 1.0, "saved_at": saved_at.isoformat()} for i in range(5)
+        ]))
+        run(self.db["cognitive_state"].insert_one({"report_id": "gone", "phase": "Phase 1 (Fast)"}))
+
+        first = run(self.view.rebuild(ocean))
+        self.assertEqual(first, {"tracked": 5, "written": 5, "removed": 1})
+
+        restarted = CognitiveStateView(self.db["cognitive_state"], clock=self.clock)
+        self.assertEqual(run(restarted.rebuild(ocean))["written"], 0)
+
+    def test_untrack_removes_state(self):
+        run(self.view.track("npc", 1.0, self.clock.now()))
+        run(self.view.untrack("npc"))
+        self.assertIsNone(self.stored("npc"))
+        self.assertFalse(self.view.tracking("npc"))
+        self.clock.advance(600)
+        self.assertEqual(run(self.view.refresh_due()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
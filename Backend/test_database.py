@@ -0,0 +1,102 @@
+import asyncio
+import unittest
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from database import get_client
+from memory_mongo import match
+
+
+class TestMemoryBackend(unittest.TestCase):
+    def setUp(self):
+        self.client = get_client("memory://")
+        self.collection = self.client["bigfive"]["ocean_scores"]
+
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_insert_and_find_latest(self):
+        async def scenario():
+            await self.collection.insert_one({"report_id": "a", "saved_at": "2026-01-01T00:00:00"})
+            await self.collection.insert_one({"report_id": "a", "saved_at": "2026-01-02T00:00:00"})
+            await self.collection.insert_one({"report_id": "b", "saved_at": "2026-01-03T00:00:00"})
+            return await self.collection.find_one({"report_id": "a"}, sort=[("saved_at", -1)])
+
+        latest = self.run_async(scenario())
+        self.assertEqual(latest["saved_at"], "2026-01-02T00:00:00")
+
+    def test_update_and_delete(self):
+        async def scenario():
+            result = await self.collection.insert_one({"report_id": "a", "p_factor": 1.0})
+            await self.collection.update_one({"_id": result.inserted_id}, {"$set": {"p_factor": 1.2}})
+            updated = await self.collection.find_one({"report_id": "a"})
+            deleted = await self.collection.delete_one({"report_id": "a"})
+            missing = await self.collection.delete_one({"report_id": "a"})
+            return updated, deleted, missing
+
+        updated, deleted, missing = self.run_async(scenario())
+        self.assertEqual(updated["p_factor"], 1.2)
+        self.assertEqual(deleted.deleted_count, 1)
+        self.assertEqual(missing.deleted_count, 0)
+
+    def test_returned_documents_are_copies(self):
+        async def scenario():
+            await self.collection.insert_one({"report_id": "a", "ocean_scores": {"openness": 10}})
+            first = await self.collection.find_one({"report_id": "a"})
+            first["ocean_scores"]["openness"] = 99
+            return await self.collection.find_one({"report_id": "a"})
+
+        self.assertEqual(self.run_async(scenario())["ocean_scores"]["openness"], 10)
+
+    def test_duplicate_id_raises_pymongo_errors(self):
+        async def insert_twice():
+            await self.collection.insert_one({"_id": 1})
+            await self.collection.insert_one({"_id": 1})
+
+        with self.assertRaises(DuplicateKeyError) as caught:
+            self.run_async(insert_twice())
+        self.assertEqual(caught.exception.code, 11000)
+
+    def test_insert_many_reports_write_errors_like_the_server(self):
+        async def scenario(ordered):
+            collection = self.client["bigfive"][f"dupes_{ordered}"]
+            await collection.insert_one({"_id": 2})
+            try:
+                await collection.insert_many([{"_id": 1}, {"_id": 2}, {"_id": 3}], ordered=ordered)
+            except BulkWriteError as e:
+                return e.details, sorted(doc["_id"] for doc in await collection.find({}).to_list())
+
+        # Ordered stops at the duplicate, unordered writes the rest
+        details, ids = self.run_async(scenario(True))
+        self.assertEqual([(error["index"], error["code"]) for error in details["writeErrors"]], [(1, 11000)])
+        self.assertEqual((details["nInserted"], ids), (1, [1, 2]))
+        details, ids = self.run_async(scenario(False))
+        self.assertEqual([error["index"] for error in details["writeErrors"]], [1])
+        self.assertEqual((details["nInserted"], ids), (2, [1, 2, 3]))
+
+    def test_bulk_write_duplicate_insert(self):
+        async def scenario():
+            await self.collection.insert_one({"_id": "a", "n": 0})
+            await self.collection.bulk_write(
+                [InsertOne({"_id": "a"}), UpdateOne({"_id": "a"}, {"$set": {"n": 1}})], ordered=False
+            )
+
+        with self.assertRaises(BulkWriteError) as caught:
+            self.run_async(scenario())
+        self.assertEqual(caught.exception.details["writeErrors"][0]["index"], 0)
+        self.assertEqual(caught.exception.details["nModified"], 1)
+
+    def test_query_operators(self):
+        doc = {"report_id": "a", "p_factor": 1.1, "tags": ["x", "y"]}
+        self.assertTrue(match(doc, {"report_id": {"$in": ["a", "b"]}}))
+        self.assertTrue(match(doc, {"p_factor": {"$gte": 1.0, "$lt": 1.2}}))
+        self.assertTrue(match(doc, {"tags": "x"}))
+        self.assertTrue(match(doc, {"$or": [{"report_id": "z"}, {"p_factor": {"$gt": 1.0}}]}))
+        self.assertTrue(match(doc, {"missing": {"$exists": False}}))
+        self.assertFalse(match(doc, {"report_id": {"$ne": "a"}}))
+        self.assertFalse(match(doc, {"p_factor": {"$lt": "1.5"}}))
+
+
+if __name__ == '__main__':
+    unittest.main()
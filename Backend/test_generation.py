@@ -0,0 +1,195 @@
+import asyncio
+import os
+import subprocess
+import sys
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+os.environ.setdefault("MONGO_URL", "memory://")
+
+import generation
+import main
+from job_queue import DEAD, DONE
+from test_bulk_ingest import assessment, isolated_job_queue
+from timeutil import utcnow
+
+
+class TestDeferredSave(unittest.TestCase):
+    def setUp(self):
+        asyncio.run(main.ocean_collection.delete_many({}))
+        self.queue = isolated_job_queue(self, max_attempts=3)
+
+    def generate_with(self, generate):
+        # Initial generation (main) and generate_for_report (generation) both call the LLM
+        for module in (main, generation):
+            patcher = mock.patch.object(module, "generate_npc_response_async", generate)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def save_and_drain(self, report_id="a"):
+        async def scenario():
+            result = await main.save_ocean_scores(main.OceanData(**assessment(report_id)), defer_generation=True)
+            await self.queue.drain()
+            doc = await main.ocean_collection.find_one({"report_id": report_id})
+            return result, doc
+
+        return asyncio.run(scenario())
+
+    def test_save_returns_pending_and_worker_fills_response(self):
+        async def generate(*args, **kwargs):
+            return "I remember the assessment."
+
+        self.generate_with(generate)
+        result, doc = self.save_and_drain()
+        self.assertEqual(result["data"]["generation_status"], "pending")
+        self.assertEqual(doc["generation_status"], "done")
+        self.assertEqual(doc["last_linguistic_response"], "I remember the assessment.")
+        self.assertEqual(doc["generation_attempts"], 1)
+
+    def test_job_carries_the_state_it_generates_for(self):
+        seen = []
+
+        async def generate(base_memory, confidence_label, phase, retention_pct, **kwargs):
+            seen.append((confidence_label, phase, retention_pct))
+            return "Noted."
+
+        async def scenario():
+            await main.save_ocean_scores(main.OceanData(**assessment("a")), defer_generation=True)
+            job = await self.queue.store.lease("inspect", 0)
+            await self.queue.drain()
+            return job
+
+        self.generate_with(generate)
+        job = asyncio.run(scenario())
+        state = job["payload"]["state"]
+        self.assertEqual(job["kind"], main.INITIAL_GENERATION_JOB)
+        self.assertEqual(state, main.npc_state("a", state and asyncio.run(
+            main.ocean_collection.find_one({"report_id": "a"}))["p_factor"]))
+        self.assertEqual(seen, [(state["confidence_label"], state["phase"], state["retention_val"])])
+
+    def test_failed_generation_is_retried(self):
+        responses = [None, "Second time lucky."]
+
+        async def generate(*args, **kwargs):
+            return responses.pop(0)
+
+        self.generate_with(generate)
+        _, doc = self.save_and_drain()
+        self.assertEqual(doc["generation_status"], "done")
+        self.assertEqual(doc["generation_attempts"], 2)
+
+    def test_exhausted_retries_store_fallback(self):
+        async def generate(*args, **kwargs):
+            return None
+
+        self.generate_with(generate)
+        _, doc = self.save_and_drain()
+        self.assertEqual(doc["generation_status"], "fallback")
+        self.assertEqual(doc["generation_attempts"], 3)
+        self.assertTrue(doc["last_linguistic_response"])
+        self.assertEqual(asyncio.run(self.queue.store.counts())[DEAD], 1)
+
+    def test_completed_document_is_not_regenerated(self):
+        calls = []
+
+        async def generate(*args, **kwargs):
+            calls.append(1)
+            return "Once only."
+
+        async def scenario():
+            result = await main.ocean_collection.insert_one({
+                "report_id": "a", "p_factor": 1.0, "generation_status": "pending", "generation_attempts": 0
+            })
+            await main.complete_initial_generation(result.inserted_id)
+            await main.complete_initial_generation(result.inserted_id)
+
+        self.generate_with(generate)
+        asyncio.run(scenario())
+        self.assertEqual(len(calls), 1)
+
+    def test_claim_abandoned_by_a_dead_worker_is_taken_over(self):
+        async def generate(*args, **kwargs):
+            return "Picked up again."
+
+        async def scenario():
+            abandoned = utcnow() - timedelta(seconds=main.JOB_VISIBILITY_TIMEOUT_SECONDS + 1)
+            busy = utcnow()
+            result = await main.ocean_collection.insert_many([
+                {"report_id": "a", "p_factor": 1.0, "generation_status": "generating", "generation_started_at": abandoned},
+                {"report_id": "b", "p_factor": 1.0, "generation_status": "generating", "generation_started_at": busy},
+            ])
+            for document_id in result.inserted_ids:
+                await main.complete_initial_generation(document_id)
+            return await main.ocean_collection.find({}, sort=[("report_id", 1)]).to_list(length=None)
+
+        self.generate_with(generate)
+        taken_over, busy = asyncio.run(scenario())
+        self.assertEqual(taken_over["generation_status"], "done")
+        self.assertEqual(busy["generation_status"], "generating")
+
+    def test_startup_recovery_enqueues_each_document_once(self):
+        stale = (datetime.now() - timedelta(seconds=main.GENERATION_STALE_SECONDS + 60)).isoformat()
+        fresh = datetime.now().isoformat()
+
+        async def scenario():
+            await main.ocean_collection.insert_many([
+                {"report_id": "pending", "p_factor": 1.0, "generation_status": "pending"},
+                {"report_id": "stale", "p_factor": 1.0, "generation_status": "generating", "generation_started_at": stale},
+                {"report_id": "busy", "p_factor": 1.0, "generation_status": "generating", "generation_started_at": fresh},
+                {"report_id": "done", "p_factor": 1.0, "generation_status": "done"},
+            ])
+            first = await main.recover_pending_generations()
+            second = await main.recover_pending_generations()
+            return first, second, await self.queue.store.counts()
+
+        first, second, counts = asyncio.run(scenario())
+        self.assertEqual((first, second), (2, 2))
+        # Re-running recovery found the same documents but queued nothing new
+        self.assertEqual(counts["queued"], 2)
+
+
+class TestEnqueueRoute(unittest.TestCase):
+    def setUp(self):
+        asyncio.run(main.ocean_collection.delete_many({}))
+        self.queue = isolated_job_queue(self)
+
+    def enqueue(self, report_id):
+        return main.enqueue_npc_response(report_id, base_memory="The last assigned task",
+                                         importance_kk=None, required_time_trk=None, available_time_tak=None)
+
+    def test_rejects_enqueue_without_workers(self):
+        with self.assertRaises(main.HTTPException) as caught:
+            asyncio.run(self.enqueue("a"))
+        self.assertEqual(caught.exception.status_code, 503)
+
+    def test_enqueued_job_snapshots_state_and_runs(self):
+        async def scenario():
+            await main.ocean_collection.insert_one({"report_id": "a", "p_factor": 1.2, "saved_at": utcnow()})
+            self.queue.start()
+            try:
+                result = await self.enqueue("a")
+                with self.assertRaises(main.HTTPException) as missing:
+                    await self.enqueue("ghost")
+            finally:
+                await self.queue.stop()
+            await self.queue.drain()
+            return result, missing.exception, await self.queue.store.counts()
+
+        result, missing, counts = asyncio.run(scenario())
+        self.assertEqual(result["state"]["phase"], "Phase 1 (Fast)")
+        self.assertIn("confidence_label", result["state"])
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(counts[DONE], 1)
+
+
+class TestSharedModule(unittest.TestCase):
+    def test_monitor_does_not_load_the_api(self):
+        probe = "import sys, monitor; print('main' in sys.modules, 'fastapi' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), env={**os.environ, "MONGO_URL": "memory://"})
+        self.assertEqual(result.stdout.split()[-2:], ["False", "False"])
+
+
+if __name__ == '__main__':
+    unittest.main()
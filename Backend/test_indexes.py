@@ -0,0 +1,57 @@
+import asyncio
+import os
+import unittest
+from unittest import mock
+
+os.environ.setdefault("MONGO_URL", "memory://")
+
+import main
+from database import get_client
+from indexes import INDEXES, ensure_indexes, verify_query_plans
+
+
+class TestEnsureIndexes(unittest.TestCase):
+    def setUp(self):
+        self.db = get_client("memory://")["index_bootstrap"]
+
+    def test_creates_every_declared_index(self):
+        async def scenario():
+            await ensure_indexes(self.db)
+            return {collection: await self.db[collection].index_information() for collection in INDEXES}
+
+        info = asyncio.run(scenario())
+        for collection, models in INDEXES.items():
+            self.assertEqual(set(info[collection]) - {"_id_"}, {model.document["name"] for model in models})
+        self.assertEqual(info["npc_response_cache"]["expires_at_ttl"]["expireAfterSeconds"], 0)
+        self.assertTrue(info["cognitive_state"]["report_id_1"]["unique"])
+        self.assertEqual(info["ocean_scores"]["next_transition_at_1"]["key"], [("next_transition_at", 1)])
+
+    def test_rerun_is_a_no_op(self):
+        async def scenario():
+            first = await ensure_indexes(self.db)
+            before = await self.db["ocean_scores"].index_information()
+            second = await ensure_indexes(self.db)
+            return first, second, before, await self.db["ocean_scores"].index_information()
+
+        first, second, before, after = asyncio.run(scenario())
+        self.assertEqual(first, second)
+        self.assertEqual(before, after)
+
+    def test_hot_queries_use_an_index(self):
+        async def scenario():
+            await ensure_indexes(self.db)
+            return await verify_query_plans(self.db)
+
+        for entry in asyncio.run(scenario()):
+            self.assertTrue(entry["uses_index"], entry["query"])
+
+    def test_startup_survives_an_unreachable_database(self):
+        failing = mock.AsyncMock(side_effect=ConnectionError("mongo unreachable"))
+        with mock.patch.object(main, "ensure_indexes", failing), self.assertLogs("made.api", "ERROR") as logs:
+            asyncio.run(main.create_indexes())
+        failing.assert_awaited_once()
+        self.assertIn("index bootstrap failed", logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
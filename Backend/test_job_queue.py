@@ -0,0 +1,235 @@
+import asyncio
+import os
+import unittest
+
+os.environ.setdefault("MONGO_URL", "memory://")
+
+from database import get_client
+from job_queue import DEAD, DONE, LEASED, QUEUED, JobQueue, MongoJobStore, SQLiteJobStore, job_priority
+
+
+class ManualClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class QuotaError(Exception):
+    status_code = 429
+
+
+class JobStoreContract:
+    """Runs against both backends; subclasses provide make_store()."""
+
+    def setUp(self):
+        self.clock = ManualClock()
+        self.store = self.make_store()
+
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_lease_order_follows_priority_then_age(self):
+        async def scenario():
+            await self.store.put("npc_response", {"report_id": "low"}, priority=0.5)
+            self.clock.now += 1
+            await self.store.put("npc_response", {"report_id": "high"}, priority=4.0)
+            self.clock.now += 1
+            await self.store.put("npc_response", {"report_id": "low-later"}, priority=0.5)
+            return [(await self.store.lease("w", 60))["payload"]["report_id"] for _ in range(3)]
+
+        self.assertEqual(self.run_async(scenario()), ["high", "low", "low-later"])
+
+    def test_expired_lease_is_reclaimed_and_stale_owner_cannot_ack(self):
+        async def scenario():
+            await self.store.put("npc_response", {"report_id": "a"})
+            first = await self.store.lease("w1", 30)
+            hidden = await self.store.lease("w2", 30)
+            self.clock.now += 31
+            second = await self.store.lease("w2", 30)
+            stale_ack = await self.store.ack(first["id"], "w1")
+            fresh_ack = await self.store.ack(second["id"], "w2")
+            return hidden, second, stale_ack, fresh_ack, await self.store.counts()
+
+        hidden, second, stale_ack, fresh_ack, counts = self.run_async(scenario())
+        self.assertIsNone(hidden)
+        self.assertEqual(second["attempts"], 2)
+        self.assertTrue(second["reclaimed"])
+        self.assertFalse(stale_ack)
+        self.assertTrue(fresh_ack)
+        self.assertEqual(counts[DONE], 1)
+
+    def test_crashing_job_is_dead_lettered_when_its_last_lease_expires(self):
+        dead = []
+
+        async def crash(payload):
+            # Stands in for a worker that dies mid-job: the lease is never settled
+            raise asyncio.CancelledError
+
+        async def on_dead_letter(job, error):
+            dead.append((job["payload"]["report_id"], error))
+
+        async def scenario():
+            queue = JobQueue(self.store, {"npc_response": crash}, max_attempts=2, visibility_timeout=30,
+                             on_dead_letter=on_dead_letter)
+            await queue.put("npc_response", {"report_id": "a"})
+            runs = 0
+            for _ in range(5):
+                try:
+                    if not await queue.run_once():
+                        break
+                except asyncio.CancelledError:
+                    runs += 1
+                self.clock.now += 31
+            return runs, queue, await self.store.counts()
+
+        runs, queue, counts = self.run_async(scenario())
+        self.assertEqual(runs, 2)
+        self.assertEqual(counts[DEAD], 1)
+        self.assertEqual(queue.expired_leases, 1)
+        self.assertEqual(dead, [("a", "lease expired on attempt 2 of 2")])
+
+    def test_put_with_a_job_id_is_idempotent(self):
+        async def scenario():
+            first = await self.store.put("npc_response", {"n": 1}, job_id="initial:a")
+            again = await self.store.put("npc_response", {"n": 2}, job_id="initial:a")
+            ids = await self.store.put_many("npc_response", [{"n": 3}, {"n": 4}], job_ids=["initial:a", "initial:b"])
+            leased = [await self.store.lease("w", 30) for _ in range(3)]
+            return first, again, ids, leased
+
+        first, again, ids, leased = self.run_async(scenario())
+        self.assertEqual((first, again, ids), ("initial:a", "initial:a", ["initial:a", "initial:b"]))
+        self.assertEqual(sorted(job["payload"]["n"] for job in leased if job), [1, 4])
+        self.assertIsNone(leased[2])
+
+    def test_release_delays_next_lease(self):
+        async def scenario():
+            await self.store.put("npc_response", {"report_id": "a"})
+            job = await self.store.lease("w", 30)
+            await self.store.release(job["id"], "w", 10, "boom")
+            too_early = await self.store.lease("w", 30)
+            self.clock.now += 10
+            return too_early, await self.store.lease("w", 30)
+
+        too_early, job = self.run_async(scenario())
+        self.assertIsNone(too_early)
+        self.assertEqual(job["last_error"], "boom")
+
+    def test_retry_then_success(self):
+        calls = []
+
+        async def flaky(payload):
+            calls.append(payload["report_id"])
+            if len(calls) == 1:
+                raise RuntimeError("model timeout")
+
+        async def scenario():
+            queue = JobQueue(self.store, {"npc_response": flaky}, base_delay=0)
+            await queue.put("npc_response", {"report_id": "a"})
+            await queue.drain()
+            return queue, await self.store.counts()
+
+        queue, counts = self.run_async(scenario())
+        self.assertEqual(calls, ["a", "a"])
+        self.assertEqual((queue.retried, queue.succeeded), (1, 1))
+        self.assertEqual(counts[DONE], 1)
+
+    def test_repeated_429_is_dead_lettered(self):
+        async def limited(payload):
+            raise QuotaError("quota exceeded")
+
+        async def scenario():
+            queue = JobQueue(self.store, {"npc_response": limited}, base_delay=0, max_rate_limited=3, max_attempts=10)
+            await queue.put("npc_response", {"report_id": "a"})
+            await queue.drain()
+            return queue, await self.store.counts(), await self.store.dead_letters()
+
+        queue, counts, dead = self.run_async(scenario())
+        self.assertEqual(queue.rate_limited, 3)
+        self.assertEqual(counts[DEAD], 1)
+        self.assertEqual(dead[0]["rate_limited"], 2)
+        self.assertEqual(dead[0]["attempts"], 3)
+
+    def test_other_failures_dead_letter_after_max_attempts(self):
+        async def broken(payload):
+            raise RuntimeError("bad payload")
+
+        async def scenario():
+            queue = JobQueue(self.store, {"npc_response": broken}, base_delay=0, max_attempts=2)
+            await queue.put("npc_response", {"report_id": "a"})
+            await queue.put("unknown", {})
+            await queue.drain()
+            return await self.store.counts()
+
+        counts = self.run_async(scenario())
+        self.assertEqual(counts[DEAD], 2)
+        self.assertEqual(counts[QUEUED] + counts[LEASED], 0)
+
+    def test_concurrent_workers_run_each_job_once(self):
+        seen = []
+
+        async def handler(payload):
+            await asyncio.sleep(0)
+            seen.append(payload["n"])
+
+        async def scenario():
+            queue = JobQueue(self.store, {"npc_response": handler}, concurrency=8)
+            for n in range(50):
+                await queue.put("npc_response", {"n": n})
+            await queue.drain()
+
+        self.run_async(scenario())
+        self.assertEqual(sorted(seen), list(range(50)))
+
+
+class TestSQLiteJobStore(JobStoreContract, unittest.TestCase):
+    def make_store(self):
+        return SQLiteJobStore(":memory:", clock=self.clock)
+
+
+class TestMongoJobStore(JobStoreContract, unittest.TestCase):
+    def make_store(self):
+        return MongoJobStore(get_client("memory://")["bigfive"]["jobs"], clock=self.clock)
+
+
+class TestJobWorkers(unittest.TestCase):
+    def test_idle_polls_back_off_to_the_cap(self):
+        queue = JobQueue(SQLiteJobStore(":memory:"), {}, poll_interval=1.0, max_poll_interval=30.0)
+        self.assertEqual([queue.idle_delay(n) for n in range(1, 8)], [1, 2, 4, 8, 16, 30, 30])
+
+    def test_put_wakes_a_backed_off_worker(self):
+        done = []
+
+        async def scenario():
+            finished = asyncio.Event()
+
+            async def handler(payload):
+                done.append(payload["n"])
+                finished.set()
+
+            # Poll intervals far longer than the test: only the wakeup can get the job run
+            queue = JobQueue(SQLiteJobStore(":memory:"), {"npc_response": handler}, concurrency=2,
+                             poll_interval=3600.0, max_poll_interval=3600.0)
+            queue.start()
+            try:
+                for _ in range(5):
+                    await asyncio.sleep(0)
+                await queue.put("npc_response", {"n": 1})
+                await asyncio.wait_for(finished.wait(), 60)
+            finally:
+                await queue.stop()
+
+        asyncio.run(scenario())
+        self.assertEqual(done, [1])
+
+
+class TestJobPriority(unittest.TestCase):
+    def test_priority_uses_task_formula(self):
+        self.assertEqual(job_priority(0.8, 2.0, 5.0), 0.32)
+        self.assertEqual(job_priority(0.8, 2.0, 0), 10.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import asyncio
+import time
+import unittest
+
+from memory.linguistic import generate_npc_response_async
+from memory.llm_backend import FakeBackend, FakeModel
+from metrics import LLM_ATTEMPTS, LLM_FALLBACKS, LLM_FALLTHROUGH
+
+
+# A model that never answers on its own; the guard below turns a hang into a failure
+NEVER = 3600.0
+
+
+class RecordingModel(FakeModel):
+    """FakeModel that logs when each attempt starts, finishes, fails or is cancelled."""
+
+    def __init__(self, backend, model_name, events):
+        super().__init__(backend, model_name)
+        self.events = events
+
+    async def generate_content_async(self, prompt):
+        self.events.append(("start", self.model_name))
+        try:
+            response = await super().generate_content_async(prompt)
+        except asyncio.CancelledError:
+            self.events.append(("cancelled", self.model_name))
+            raise
+        except Exception:
+            self.events.append(("failed", self.model_name))
+            raise
+        self.events.append(("done", self.model_name))
+        return response
+
+
+def fake_factory(specs, calls=None, events=None):
+    # specs: model name -> (latency seconds, error message or None)
+    backend = FakeBackend(
+        model_names=list(specs),
+        models={name: {"latency": latency, "error": error} for name, (latency, error) in specs.items()},
+        reply=lambda model_name, prompt: f'"{model_name} says hi"',
+    )
+    events = [] if events is None else events
+
+    def factory(model_name):
+        if calls is not None:
+            calls.append(model_name)
+        return RecordingModel(backend, model_name, events)
+    return factory
+
+
+def generate(factory, names, **kwargs):
+    async def scenario():
+        # Deadlock guard only: the tests assert on ordering, not on elapsed time
+        return await asyncio.wait_for(generate_npc_response_async(
+            "The security breach", "High Confidence", "Phase 1 (Fast)", 0.85,
+            model_names=names, model_factory=factory, cache=None, limiter=None, **kwargs
+        ), 60)
+    return asyncio.run(scenario())
+
+
+class TestAsyncLinguisticEngine(unittest.TestCase):
+    def test_first_model_success(self):
+        events = []
+        factory = fake_factory({"a": (0.0, None), "b": (0.0, None)}, events=events)
+        text = generate(factory, ["a", "b"], hedge_delay=NEVER)
+        self.assertEqual(text, "a says hi")
+        self.assertEqual(events, [("start", "a"), ("done", "a")])
+
+    def test_hedged_attempt_wins_over_slow_model(self):
+        events = []
+        factory = fake_factory({"slow": (NEVER, None), "fast": (0.0, None)}, events=events)
+        text = generate(factory, ["slow", "fast"], hedge_delay=0.01, timeout=NEVER)
+        self.assertEqual(text, "fast says hi")
+        self.assertEqual(events[:3], [("start", "slow"), ("start", "fast"), ("done", "fast")])
+        self.assertIn(("cancelled", "slow"), events)
+        self.assertNotIn(("done", "slow"), events)
+
+    def test_failure_falls_through_without_waiting_for_hedge(self):
+        events = []
+        fallthrough = LLM_FALLTHROUGH.value(reason="error")
+        errors = LLM_ATTEMPTS.value(model="broken", outcome="error")
+        factory = fake_factory({"broken": (0.0, "404 not found"), "ok": (0.0, None)}, events=events)
+        # With a one-hour hedge delay, only the failure can start the next model
+        text = generate(factory, ["broken", "ok"], hedge_delay=NEVER)
+        self.assertEqual(text, "ok says hi")
+        self.assertEqual(events, [("start", "broken"), ("failed", "broken"), ("start", "ok"), ("done", "ok")])
+        self.assertEqual(LLM_FALLTHROUGH.value(reason="error"), fallthrough + 1)
+        self.assertEqual(LLM_ATTEMPTS.value(model="broken", outcome="error"), errors + 1)
+
+    def test_timeout_moves_to_next_model(self):
+        events = []
+        factory = fake_factory({"hung": (NEVER, None), "ok": (0.0, None)}, events=events)
+        text = generate(factory, ["hung", "ok"], timeout=0.01, hedge_delay=NEVER)
+        self.assertEqual(text, "ok says hi")
+        self.assertEqual(events, [("start", "hung"), ("cancelled", "hung"), ("start", "ok"), ("done", "ok")])
+
+    def test_quota_error_stops_trying_and_uses_fallback(self):
+        events = []
+        fallbacks = LLM_FALLBACKS.value(path="async")
+        factory = fake_factory({"a": (0.0, "429 quota exceeded"), "b": (0.0, None)}, events=events)
+        text = generate(factory, ["a", "b"], hedge_delay=NEVER)
+        self.assertEqual(events, [("start", "a"), ("failed", "a")])
+        self.assertIn("The security breach", text)
+        self.assertEqual(LLM_FALLBACKS.value(path="async"), fallbacks + 1)
+
+    def test_parallel_attempts_return_the_fastest(self):
+        events = []
+        specs = {f"m{i}": (NEVER, None) for i in range(4)}
+        specs["m4"] = (0.0, None)
+        text = generate(fake_factory(specs, events=events), list(specs), hedge_delay=0)
+        self.assertEqual(text, "m4 says hi")
+        self.assertEqual(events[:6], [("start", f"m{i}") for i in range(5)] + [("done", "m4")])
+        self.assertEqual(sorted(e for e in events if e[0] == "cancelled"), [("cancelled", f"m{i}") for i in range(4)])
+
+
+class TestFakeBackend(unittest.TestCase):
+    def run_backend(self, backend, count, **kwargs):
+        async def scenario():
+            return [await generate_npc_response_async(
+                f"Task {i % 3}", "High Confidence", "Phase 1 (Fast)", 0.85,
+                pool=backend.pool, model_names=backend.model_names, cache=None, limiter=None,
+                hedge_delay=1.0, **kwargs
+            ) for i in range(count)]
+        return asyncio.run(scenario())
+
+    def test_replies_are_deterministic_per_prompt(self):
+        first = self.run_backend(FakeBackend(latency=0.001), 6)
+        second = self.run_backend(FakeBackend(latency=0.001), 6)
+        self.assertEqual(first, second)
+        self.assertEqual(first[0], first[3])
+        self.assertIn("Task 1", first[1])
+
+    def test_injected_rate_limits_reach_the_fallback(self):
+        backend = FakeBackend(latency=0.001, rate_limit_rate=1.0)
+        texts = self.run_backend(backend, 3)
+        self.assertEqual(backend.calls, ["fake-primary"] * 3)
+        self.assertTrue(all("[fake-" not in text for text in texts))
+
+    def test_injected_latency(self):
+        started = time.perf_counter()
+        self.run_backend(FakeBackend(latency=0.05), 2)
+        self.assertGreaterEqual(time.perf_counter() - started, 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
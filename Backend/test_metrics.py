@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+
+from fastapi import FastAPI
+
+from metrics import Histogram, MetricsMiddleware, MetricsRegistry
+
+
+def call(app, path):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "headers": [], "client": ("test", 1), "server": ("test", 80),
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"]
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = MetricsRegistry()
+        latency = registry.histogram("stage_seconds", "Stage time.", ("stage",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            latency.observe(value, stage="llm")
+
+        lines = registry.render().splitlines()
+        self.assertEqual(lines[:2], ["# HELP stage_seconds Stage time.", "# TYPE stage_seconds histogram"])
+        self.assertIn('stage_seconds_bucket{stage="llm",le="0.1"} 1', lines)
+        self.assertIn('stage_seconds_bucket{stage="llm",le="1.0"} 3', lines)
+        self.assertIn('stage_seconds_bucket{stage="llm",le="+Inf"} 4', lines)
+        self.assertIn('stage_seconds_sum{stage="llm"} 4.05', lines)
+        self.assertIn('stage_seconds_count{stage="llm"} 4', lines)
+
+    def test_counter_labels_are_escaped(self):
+        registry = MetricsRegistry()
+        attempts = registry.counter("attempts_total", "Attempts.", ("model",))
+        attempts.inc(model='odd"name')
+        attempts.inc(2, model='odd"name')
+        self.assertIn('attempts_total{model="odd\\"name"} 3', registry.render())
+        with self.assertRaises(ValueError):
+            registry.counter("attempts_total", "Again.")
+
+    def test_timer_records_on_error(self):
+        latency = Histogram("t", "T.", ("stage",))
+        with self.assertRaises(RuntimeError):
+            with latency.time(stage="mongo_insert"):
+                raise RuntimeError("down")
+        self.assertEqual(latency.count(stage="mongo_insert"), 1)
+
+
+class TestMetricsMiddleware(unittest.TestCase):
+    def test_requests_are_labelled_by_route_template(self):
+        latency = Histogram("requests", "Requests.", ("method", "route", "status"))
+        app = FastAPI()
+
+        @app.get("/reports/{report_id}")
+        async def get_report(report_id: str):
+            return {"report_id": report_id}
+
+        app.add_middleware(MetricsMiddleware, histogram=latency)
+
+        self.assertEqual(call(app, "/reports/a"), 200)
+        self.assertEqual(call(app, "/reports/b"), 200)
+        self.assertEqual(call(app, "/missing"), 404)
+
+        self.assertEqual(latency.count(method="GET", route="/reports/{report_id}", status=200), 2)
+        self.assertEqual(latency.count(method="GET", route="unmatched", status=404), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
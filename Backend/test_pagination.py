@@ -0,0 +1,81 @@
+import asyncio
+import json
+import os
+import unittest
+from datetime import timedelta
+
+os.environ.setdefault("MONGO_URL", "memory://")
+
+import main
+from timeutil import utcnow
+
+
+def list_scores(limit=None, cursor=None, fields=None, format="json"):
+    # Called directly, so every query parameter is passed explicitly
+    return asyncio.run(main.get_all_ocean_scores(limit=limit, cursor=cursor, projection_fields=fields, format=format))
+
+
+class TestAllOceanScoresRoute(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        now = utcnow()
+        docs = [
+            {"report_id": f"npc-{i}", "p_factor": 1.0, "ocean_normalized": {"O": 0.5}, "saved_at": now - timedelta(seconds=i)}
+            for i in range(7)
+        ]
+        # Same saved_at: the _id tie-break must still split them across pages
+        docs.append({"report_id": "npc-tie", "p_factor": 1.0, "saved_at": docs[3]["saved_at"]})
+        # Not migrated yet: listed after every BSON date
+        docs.append({"report_id": "npc-legacy", "p_factor": 1.0, "saved_at": "2025-01-01T00:00:00"})
+
+        async def seed():
+            await main.ocean_collection.delete_many({})
+            await main.ocean_collection.insert_many(docs)
+        asyncio.run(seed())
+
+    def test_cursor_round_trip_visits_every_document_once(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = list_scores(limit=2, cursor=cursor)
+            pages += 1
+            seen.extend(doc["report_id"] for doc in page["data"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(pages, 5)
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(seen), 9)
+        self.assertEqual(seen[:3], ["npc-0", "npc-1", "npc-2"])
+        self.assertEqual(seen[-1], "npc-legacy")
+
+    def test_projection_keeps_cursor_fields(self):
+        page = list_scores(limit=3, fields="report_id, p_factor")
+        for doc in page["data"]:
+            self.assertEqual(set(doc), {"_id", "saved_at", "report_id", "p_factor"})
+        # The cursor still works off a projected page
+        following = list_scores(limit=3, cursor=page["next_cursor"], fields="report_id")
+        self.assertEqual(len(following["data"]), 3)
+        self.assertFalse({doc["_id"] for doc in page["data"]} & {doc["_id"] for doc in following["data"]})
+
+    def test_invalid_cursor_is_a_400(self):
+        with self.assertRaises(main.HTTPException) as caught:
+            list_scores(cursor="not-a-cursor")
+        self.assertEqual(caught.exception.status_code, 400)
+
+    def test_ndjson_streams_one_document_per_line(self):
+        async def collect():
+            response = await main.get_all_ocean_scores(limit=None, cursor=None, projection_fields="report_id", format="ndjson")
+            return response.media_type, [chunk async for chunk in response.body_iterator]
+
+        media_type, chunks = asyncio.run(collect())
+        self.assertEqual(media_type, "application/x-ndjson")
+        docs = [json.loads(line) for line in "".join(chunks).splitlines()]
+        self.assertEqual(len(docs), 9)
+        self.assertEqual(docs[0]["report_id"], "npc-0")
+        self.assertIsInstance(docs[0]["_id"], str)
+        self.assertIsInstance(docs[0]["saved_at"], str)
+        self.assertNotIn("p_factor", docs[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import asyncio
+import unittest
+
+from memory.linguistic import generate_npc_response_async
+from memory.llm_backend import FakeBackend
+from memory.prompts import TEMPLATES, TokenUsage, render_prompt, style_bucket
+from memory.ratelimit import estimate_tokens
+
+
+def legacy_prompt(base_memory, confidence_label, phase, retention_pct):
+    # The original inline f-string, minus indentation, for comparison
+    if retention_pct < 0.30:
+        style_guide = "Use Gist-only language. Do not provide specific details. Sound vague and focus only on the general idea. Example: 'I don't have the details, but the general idea was...'"
+    elif phase == "Phase 2 (Slow)" or retention_pct < 0.40:
+        style_guide = "Use Reconstructive language. Sound uncertain and speculative. Use fillers like 'I think', 'maybe', 'if I recall correctly'. Example: 'If I recall correctly, I think it was...'"
+    else:
+        style_guide = "Use Direct Recall language. Sound clear, precise, and certain about the facts. Example: 'I clearly remember it happened at...'"
+    text = f"""
+    You are an AI NPC in a high-fidelity simulation. 
+    Your current cognitive state is:
+    - Memory Retention: {min(1.0, retention_pct) * 100:.1f}%
+    - Confidence Level: {confidence_label}
+    - Decay Phase: {phase}
+    
+    Style Guide: {style_guide}
+    
+    Memory to recall: "{base_memory}"
+    
+    Response requirements:
+    1. Stay in character as a futuristic NPC.
+    2. Do NOT mention your retention percentage or confidence level explicitly in the spoken text.
+    3. Reflect the required linguistic style perfectly based on the Style Guide.
+    4. Keep the response concise (1-2 sentences).
+    
+    NPC Response:
+    """
+    return [line.strip() for line in text.strip().splitlines()]
+
+
+CASES = [
+    ("The security breach", "High Confidence", "Phase 1 (Fast)", 0.85),
+    ("The security breach", "Low Confidence", "Phase 2 (Slow)", 0.45),
+    ("The security breach", "Low Confidence", "Phase 1 (Fast)", 0.38),
+    ("The security breach", "Confused", "Phase 2 (Slow)", 0.25),
+]
+
+
+class TestPromptTemplates(unittest.TestCase):
+    def test_templates_match_legacy_wording(self):
+        for case in CASES:
+            prompt, _, _, truncated = render_prompt(*case, budget=0)
+            self.assertEqual([line.strip() for line in prompt.strip().splitlines()], legacy_prompt(*case))
+            self.assertFalse(truncated)
+
+    def test_style_buckets(self):
+        self.assertEqual([style_bucket(phase, r) for _, _, phase, r in CASES],
+                         ["direct", "reconstructive", "reconstructive", "gist"])
+
+    def test_token_count_tracks_rendered_prompt(self):
+        for case in CASES:
+            prompt, bucket, tokens, _ = render_prompt(*case, budget=0)
+            self.assertLessEqual(abs(tokens - estimate_tokens(prompt)), len(TEMPLATES[bucket].fields))
+
+    def test_dropping_indentation_saves_tokens(self):
+        prompt, _, tokens, _ = render_prompt(*CASES[0], budget=0)
+        legacy_tokens = estimate_tokens("\n    ".join([""] + legacy_prompt(*CASES[0])) + "\n    ")
+        self.assertLess(tokens, legacy_tokens)
+
+    def test_budget_truncates_memory(self):
+        memory = "The reactor logs " * 200
+        prompt, _, tokens, truncated = render_prompt(memory, "High Confidence", "Phase 1 (Fast)", 0.85, budget=300)
+        self.assertTrue(truncated)
+        self.assertLessEqual(tokens, 300)
+        self.assertIn('..."', prompt)
+
+
+class TestTokenUsage(unittest.TestCase):
+    def test_usage_is_recorded_per_generation(self):
+        backend = FakeBackend(latency=0.001)
+        usage = TokenUsage()
+
+        async def scenario():
+            for case in CASES:
+                await generate_npc_response_async(*case, pool=backend.pool, model_names=backend.model_names,
+                                                  cache=None, limiter=None, usage=usage)
+
+        asyncio.run(scenario())
+        stats = usage.stats()
+        self.assertEqual((stats["prompts"], stats["responses"]), (4, 4))
+        self.assertEqual({b: c["prompts"] for b, c in stats["by_bucket"].items()},
+                         {"gist": 1, "reconstructive": 2, "direct": 1})
+        self.assertGreater(stats["avg_prompt_tokens"], stats["avg_response_tokens"])
+
+
+if __name__ == '__main__':
+    unittest.main()
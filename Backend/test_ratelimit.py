@@ -0,0 +1,127 @@
+import asyncio
+import unittest
+
+from memory.linguistic import QuotaExceeded, generate_npc_response_async
+from memory.ratelimit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, QuotaLimiter, TokenBucket
+from test_linguistic_async import fake_factory
+
+
+class ManualClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_refills_at_rate_up_to_capacity(self):
+        clock = ManualClock()
+        bucket = TokenBucket(60, clock=clock)
+        self.assertTrue(all(bucket.try_acquire() for _ in range(60)))
+        self.assertFalse(bucket.try_acquire())
+        self.assertAlmostEqual(bucket.wait_time(), 1.0)
+        clock.now += 1.0
+        self.assertTrue(bucket.try_acquire())
+        clock.now += 3600
+        bucket.wait_time()
+        self.assertEqual(bucket.tokens, 60)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_open_half_open_close(self):
+        clock = ManualClock()
+        breaker = CircuitBreaker(threshold=1, cooldown=30, clock=clock)
+        breaker.record_rate_limited()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow())
+
+        clock.now += 30
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertFalse(breaker.allow())  # one trial at a time
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(breaker.opens, 1)
+
+    def test_failed_trial_reopens(self):
+        clock = ManualClock()
+        breaker = CircuitBreaker(threshold=3, cooldown=10, clock=clock)
+        for _ in range(3):
+            breaker.record_rate_limited()
+        clock.now += 10
+        self.assertTrue(breaker.allow())
+        breaker.record_rate_limited()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertEqual(breaker.opens, 2)
+
+
+class TestQuotaLimiter(unittest.TestCase):
+    def test_selection_spills_over_when_model_is_throttled(self):
+        limiter = QuotaLimiter(rpm=2, clock=ManualClock())
+        picks = [limiter.select(["a", "b"]) for _ in range(5)]
+        self.assertEqual(picks, ["a", "a", "b", "b", None])
+        self.assertEqual(limiter.stats()["throttled"], 4)
+
+    def test_tokens_per_minute_budget(self):
+        limiter = QuotaLimiter(rpm=100, tpm=1000, clock=ManualClock())
+        self.assertTrue(limiter.try_acquire("a", tokens=600))
+        self.assertFalse(limiter.try_acquire("a", tokens=600))
+
+    def test_acquire_waits_for_refill_within_budget(self):
+        clock = ManualClock()
+        limiter = QuotaLimiter(rpm=60, clock=clock)
+        for _ in range(60):
+            limiter.select(["a"])
+        model = asyncio.run(limiter.acquire(["a"], max_wait=2.0, sleep=clock.sleep))
+        self.assertEqual(model, "a")
+        self.assertAlmostEqual(clock.now, 1.0)
+        self.assertIsNone(asyncio.run(limiter.acquire(["a"], max_wait=0.5, sleep=clock.sleep)))
+
+
+class TestLimitedGeneration(unittest.TestCase):
+    def generate(self, factory, limiter, **kwargs):
+        return asyncio.run(generate_npc_response_async(
+            "The security breach", "High Confidence", "Phase 1 (Fast)", 0.85,
+            model_names=["a", "b"], model_factory=factory, cache=None, limiter=limiter,
+            hedge_delay=1.0, **kwargs
+        ))
+
+    def test_quota_error_opens_breaker_and_routes_to_next_model(self):
+        clock = ManualClock()
+        limiter = QuotaLimiter(rpm=100, breaker_cooldown=60, clock=clock)
+        calls = []
+        factory = fake_factory({"a": (0.001, "429 quota exceeded"), "b": (0.001, None)}, calls)
+
+        first = self.generate(factory, limiter)
+        second = self.generate(factory, limiter)
+        clock.now += 60
+        self.generate(factory, limiter)
+
+        self.assertIn("The security breach", first)
+        self.assertEqual(second, "b says hi")
+        self.assertEqual(calls, ["a", "b", "a"])  # half-open trial after the cooldown
+        stats = limiter.stats()
+        self.assertEqual((stats["breaker_opens"], stats["fallbacks"]), (2, 2))
+        self.assertEqual(stats["models"]["a"]["short_circuited"], 1)
+
+    def test_exhausted_quota_skips_the_api_call(self):
+        limiter = QuotaLimiter(rpm=1, clock=ManualClock())
+        calls = []
+        factory = fake_factory({"a": (0.001, None), "b": (0.001, None)}, calls)
+        self.generate(factory, limiter)
+        self.generate(factory, limiter)
+
+        with self.assertRaises(QuotaExceeded):
+            self.generate(factory, limiter, fallback=False)
+        self.assertEqual(calls, ["a", "b"])
+        self.assertEqual(limiter.stats()["fallbacks"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
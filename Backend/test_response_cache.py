@@ -0,0 +1,122 @@
+import asyncio
+import unittest
+
+from database import get_client
+from memory.response_cache import MongoResponseStore, ResponseCache, cache_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def counting_generator(prefix="reply"):
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return f"{prefix} {len(calls)}"
+
+    return generate, calls
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_keys_use_the_prompt_style_buckets(self):
+        self.assertEqual(cache_key("m", "Low Confidence", "Phase 1 (Fast)", 0.25)[3], "gist")
+        self.assertEqual(cache_key("m", "Low Confidence", "Phase 1 (Fast)", 0.30)[3], "reconstructive")
+        self.assertEqual(cache_key("m", "Low Confidence", "Phase 1 (Fast)", 0.39)[3], "reconstructive")
+        self.assertEqual(cache_key("m", "Low Confidence", "Phase 1 (Fast)", 0.40)[3], "direct")
+        self.assertEqual(cache_key("m", "Low Confidence", "Phase 2 (Slow)", 0.45)[3], "reconstructive")
+        self.assertEqual(
+            cache_key("m", "Low Confidence", "Phase 1 (Fast)", 0.55),
+            cache_key("m", "Low Confidence", "Phase 1 (Fast)", 0.95),
+        )
+
+    def test_fills_variants_then_serves_hits(self):
+        cache = ResponseCache(variants=2)
+        generate, calls = counting_generator()
+        key = cache_key("m", "High Confidence", "Phase 1 (Fast)", 0.9)
+
+        async def scenario():
+            return [await cache.get_or_generate(key, generate) for _ in range(10)]
+
+        replies = asyncio.run(scenario())
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(set(replies), {"reply 1", "reply 2"})
+        self.assertEqual(cache.stats()["hits"], 8)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_concurrent_misses_share_one_generation(self):
+        cache = ResponseCache(variants=1)
+        generate, calls = counting_generator()
+        key = cache_key("m", "Confused", "Phase 2 (Slow)", 0.2)
+
+        async def scenario():
+            return await asyncio.gather(*(cache.get_or_generate(key, generate) for _ in range(20)))
+
+        replies = asyncio.run(scenario())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(set(replies), {"reply 1"})
+
+    def test_ttl_and_lru_eviction(self):
+        clock = FakeClock()
+        cache = ResponseCache(max_entries=2, ttl_seconds=10, variants=1, clock=clock)
+        generate, calls = counting_generator()
+        keys = [cache_key(f"m{i}", "High Confidence", "Phase 1 (Fast)", 0.9) for i in range(3)]
+
+        async def scenario():
+            for key in keys:
+                await cache.get_or_generate(key, generate)
+            await cache.get_or_generate(keys[0], generate)  # evicted -> miss
+            clock.now = 11
+            await cache.get_or_generate(keys[2], generate)  # expired -> miss
+
+        asyncio.run(scenario())
+        self.assertEqual(len(calls), 5)
+        self.assertEqual(cache.stats()["evictions"], 2)
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_coalescing_can_be_turned_off(self):
+        generate, calls = counting_generator()
+        cache = ResponseCache(ttl_seconds=0, variants=1, coalesce=False)
+        key = cache_key("m", "High Confidence", "Phase 1 (Fast)", 0.9)
+
+        async def scenario():
+            return await asyncio.gather(*(cache.get_or_generate(key, generate) for _ in range(3)))
+
+        asyncio.run(scenario())
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(cache.stats()["hits"], 0)
+
+    def test_failed_generation_is_not_cached(self):
+        cache = ResponseCache(variants=1)
+
+        async def failing():
+            return None
+
+        key = cache_key("m", "High Confidence", "Phase 1 (Fast)", 0.9)
+        self.assertIsNone(asyncio.run(cache.get_or_generate(key, failing)))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_mongo_store_shared_between_caches(self):
+        store = MongoResponseStore(get_client("memory://")["bigfive"]["npc_response_cache"])
+        first = ResponseCache(variants=1, store=store)
+        second = ResponseCache(variants=1, store=store)
+        generate, calls = counting_generator()
+        key = cache_key("m", "High Confidence", "Phase 1 (Fast)", 0.9)
+
+        async def scenario():
+            await first.get_or_generate(key, generate)
+            return await second.get_or_generate(key, generate)
+
+        self.assertEqual(asyncio.run(scenario()), "reply 1")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(second.stats()["store_hits"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
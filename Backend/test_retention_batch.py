@@ -0,0 +1,55 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from memory.retention import (
+    PHASE_LABELS,
+    calculate_retention,
+    calculate_retention_batch,
+    calculate_retention_from_timestamp,
+    calculate_retention_from_timestamps_batch,
+)
+
+
+class TestRetentionBatch(unittest.TestCase):
+    def assert_matches_scalar(self, p_factors, days):
+        retention, phases, phase_time = calculate_retention_batch(p_factors, days)
+        for i, (p, d) in enumerate(zip(p_factors, days)):
+            r, phase, t = calculate_retention(p, d)
+            self.assertEqual(retention[i], r, f"p={p}, days={d}")
+            self.assertEqual(PHASE_LABELS[int(phases[i])], phase)
+            self.assertAlmostEqual(phase_time[i], t, places=12)
+
+    def test_matches_scalar_on_random_population(self):
+        rng = random.Random(42)
+        p_factors = [rng.uniform(0.3, 1.7) for _ in range(20000)]
+        days = [rng.uniform(-1.0, 8.0) for _ in range(20000)]
+        self.assert_matches_scalar(p_factors, days)
+
+    def test_edge_cases(self):
+        # Clamps, negative days, the 0.40 transition and the 0.30 floor
+        p_factors = [0.1, 2.0, 0.5, 0.4, 1.0, 1.5, 1.0, 1.0]
+        days = [0.0, 0.0, 0.0, -3.0, 1.47 * np.log(2.5), 1.0, 50.0, 1e6]
+        self.assert_matches_scalar(p_factors, days)
+
+    def test_broadcasts_scalar_p_factor(self):
+        retention, phases, _ = calculate_retention_batch(1.2, [0.0, 1.0, 2.0, 10.0])
+        self.assertEqual(retention.shape, (4,))
+        self.assertEqual(retention[-1], 0.30)
+
+    def test_timestamps_batch_matches_scalar(self):
+        now = datetime.now()
+        created = [now - timedelta(seconds=s) for s in (0, 30, 90, 240)]
+        retention, phases, game_days = calculate_retention_from_timestamps_batch(
+            [1.1] * 4, created, now=now
+        )
+        for i, created_at in enumerate(created):
+            r, debug, phase = calculate_retention_from_timestamp(1.1, created_at)
+            self.assertEqual(retention[i], r)
+            self.assertEqual(PHASE_LABELS[int(phases[i])], phase)
+
+
+if __name__ == '__main__':
+    unittest.main()
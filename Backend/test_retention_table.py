@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import numpy as np
+
+from memory import retention_table
+from memory.retention import (
+    TRANSITION_THRESHOLD,
+    calculate_retention_batch,
+    calculate_retention_from_timestamps_batch,
+    time_to_threshold,
+)
+from memory.retention_table import RetentionTable, build, exact_retention
+
+
+class TestRetentionTable(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.table = build(1e-3)
+        rng = np.random.default_rng(7)
+        cls.p_factors = rng.uniform(0.3, 1.7, 50_000)
+        cls.days = rng.uniform(-1.0, 8.0, 50_000)
+
+    def test_error_is_within_the_requested_bound(self):
+        self.assertLessEqual(self.table.max_error, 1e-3)
+        error = np.abs(self.table.interpolate(self.p_factors, self.days) - exact_retention(self.p_factors, self.days))
+        self.assertLessEqual(error.max(), 1e-3)
+
+    def test_tighter_bound_builds_a_finer_grid(self):
+        coarse = build(1e-2)
+        self.assertLess(coarse.values.size, self.table.values.size)
+        self.assertLessEqual(coarse.max_error, 1e-2)
+
+    def test_nodes_and_floor_are_exact(self):
+        exact, phases, _ = calculate_retention_batch([0.5, 1.5, 1.0, 1.0], [0.0, 0.0, 5.0, 500.0])
+        looked_up, looked_up_phases = self.table.lookup([0.5, 1.5, 1.0, 1.0], [0.0, 0.0, 5.0, 500.0])
+        np.testing.assert_array_equal(looked_up, exact)
+        np.testing.assert_array_equal(looked_up_phases, phases)
+        self.assertEqual(looked_up[-1], 0.30)
+
+    def test_save_and_load_memory_maps_the_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "retention.npy")
+            self.table.save(path)
+            loaded = RetentionTable.load(path)
+            self.assertIsInstance(loaded.values, np.memmap)
+            self.assertEqual(loaded.max_error, self.table.max_error)
+            np.testing.assert_array_equal(
+                loaded.interpolate(self.p_factors, self.days), self.table.interpolate(self.p_factors, self.days)
+            )
+            del loaded
+
+    def test_load_rejects_a_mismatched_sidecar(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "retention.npy")
+            self.table.save(path)
+            np.save(path, np.zeros((3, 3)))
+            with self.assertRaises(ValueError):
+                RetentionTable.load(path)
+
+    def test_phases_match_the_exact_path(self):
+        _, exact_phases, _ = calculate_retention_batch(self.p_factors, self.days)
+        _, phases = self.table.lookup(self.p_factors, self.days)
+        np.testing.assert_array_equal(phases, exact_phases)
+
+        # Interpolated retention can land on either side of 0.40 right next to the kink
+        p_factors = np.linspace(0.5, 1.5, 101)
+        crossing = np.array([time_to_threshold(p, TRANSITION_THRESHOLD) for p in p_factors])
+        for offset in (-1e-6, 1e-6):
+            _, exact_phases, _ = calculate_retention_batch(p_factors, crossing + offset)
+            _, phases = self.table.lookup(p_factors, crossing + offset)
+            np.testing.assert_array_equal(phases, exact_phases)
+
+    def test_timestamp_batch_uses_the_table_only_when_passed(self):
+        now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        created_ats = [now - timedelta(minutes=m) for m in (0, 30, 90, 400)]
+        p_factors = [0.7, 1.1, 1.3, 0.9]
+        exact, exact_phases, _ = calculate_retention_batch(p_factors, [0.0, 30.0, 90.0, 400.0])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "retention.npy")
+            self.table.save(path)
+            with mock.patch.dict(os.environ, {"RETENTION_TABLE_PATH": path}), \
+                    mock.patch.dict(retention_table._default, clear=True):
+                # A configured path alone does not switch the batch path over
+                default, _, _ = calculate_retention_from_timestamps_batch(p_factors, created_ats, now=now)
+                table = retention_table.default_table()
+                self.assertIs(table, retention_table.default_table())
+                looked_up, phases, game_days = calculate_retention_from_timestamps_batch(
+                    p_factors, created_ats, now=now, table=table
+                )
+                del table
+                retention_table._default.clear()
+
+        np.testing.assert_array_equal(default, exact)
+        np.testing.assert_allclose(looked_up, exact, atol=1e-3 + 1e-4)
+        np.testing.assert_array_equal(phases, exact_phases)
+        np.testing.assert_allclose(game_days, [0.0, 30.0, 90.0, 400.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
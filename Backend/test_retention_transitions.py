@@ -0,0 +1,107 @@
+import asyncio
+import math
+import os
+import unittest
+from datetime import datetime, timedelta
+
+os.environ.setdefault("MONGO_URL", "memory://")
+
+import main
+from memory.retention import (
+    STOP_THRESHOLD,
+    TRANSITION_THRESHOLD,
+    calculate_retention,
+    next_transition,
+    time_to_threshold,
+    transition_fields,
+)
+
+
+class TestTransitionTimes(unittest.TestCase):
+    def test_crossings_match_simulated_curve(self):
+        for p_factor in (0.5, 0.8, 1.0, 1.25, 1.5):
+            t_transition = time_to_threshold(p_factor, TRANSITION_THRESHOLD)
+            _, before, _ = calculate_retention(p_factor, t_transition - 1e-6)
+            _, after, _ = calculate_retention(p_factor, t_transition + 1e-6)
+            self.assertEqual(before, "Phase 1 (Fast)")
+            self.assertEqual(after, "Phase 2 (Slow)")
+
+            t_stop = time_to_threshold(p_factor, STOP_THRESHOLD)
+            self.assertGreater(calculate_retention(p_factor, t_stop - 1e-3)[0], STOP_THRESHOLD)
+            self.assertEqual(calculate_retention(p_factor, t_stop + 1e-3)[0], STOP_THRESHOLD)
+
+    def test_out_of_range_thresholds(self):
+        self.assertEqual(time_to_threshold(1.0, 1.2), 0.0)
+        self.assertEqual(time_to_threshold(1.0, 0.2), math.inf)
+
+    def test_next_transition_sequence(self):
+        p_factor = 1.1
+        threshold, first = next_transition(p_factor, 0)
+        self.assertEqual(threshold, TRANSITION_THRESHOLD)
+        threshold, second = next_transition(p_factor, first)
+        self.assertEqual(threshold, STOP_THRESHOLD)
+        self.assertIsNone(next_transition(p_factor, second))
+
+    def test_transition_fields_in_wall_clock_time(self):
+        created_at = datetime(2026, 1, 1)
+        fields = transition_fields(1.0, created_at, now=created_at, game_time_scale=60)
+        expected = created_at + timedelta(seconds=time_to_threshold(1.0, TRANSITION_THRESHOLD) * 60)
+        self.assertEqual(fields["next_transition_at"], expected)
+
+        done = transition_fields(1.0, created_at, now=created_at + timedelta(days=1))
+        self.assertIsNone(done["next_transition_at"])
+
+
+class TestUpcomingTransitionsRoute(unittest.TestCase):
+    def setUp(self):
+        asyncio.run(main.ocean_collection.delete_many({}))
+
+    def test_stale_crossings_do_not_crowd_out_upcoming_ones(self):
+        now = main.utcnow()
+
+        def saved(report_id, seconds_ago):
+            # Fields as stored at save time, never advanced since
+            saved_at = now - timedelta(seconds=seconds_ago)
+            return {"report_id": report_id, "p_factor": 1.0, "saved_at": saved_at,
+                    **transition_fields(1.0, saved_at, now=saved_at)}
+
+        async def scenario():
+            await main.ocean_collection.insert_many(
+                [saved(f"stale-{i}", 600 + i) for i in range(5)]  # long past the floor
+                + [saved("second", 100), saved("fresh", 0)]  # 0.40 passed, 0.30 ahead / 0.40 ahead
+            )
+            # The route only reads; the background sweep does the advancing
+            before = await main.upcoming_transitions(within_seconds=120, limit=2)
+            advanced = await main.advance_overdue_transitions(now)
+            result = await main.upcoming_transitions(within_seconds=120, limit=2)
+            stale = await main.ocean_collection.find({"report_id": {"$in": [f"stale-{i}" for i in range(5)]}}).to_list(length=None)
+            return before, advanced, result, stale
+
+        before, advanced, result, stale = asyncio.run(scenario())
+        self.assertEqual([t["report_id"] for t in before["transitions"]], ["fresh"])
+        self.assertEqual(advanced, 6)
+        self.assertEqual([t["report_id"] for t in result["transitions"]], ["second", "fresh"])
+        self.assertEqual([t["threshold"] for t in result["transitions"]], [STOP_THRESHOLD, TRANSITION_THRESHOLD])
+        self.assertTrue(all(t["seconds_until"] >= 0 for t in result["transitions"]))
+        self.assertTrue(all(doc["next_transition_at"] is None for doc in stale))
+
+    def test_sweep_advances_the_oldest_crossings_first(self):
+        now = main.utcnow()
+
+        def overdue(report_id, seconds_ago):
+            return {"report_id": report_id, "p_factor": 1.0, "saved_at": now - timedelta(seconds=600),
+                    "next_transition_at": now - timedelta(seconds=seconds_ago), "next_transition_threshold": 0.4}
+
+        async def scenario():
+            await main.ocean_collection.insert_many([overdue("recent", 10), overdue("oldest", 300), overdue("older", 100)])
+            advanced = await main.advance_overdue_transitions(now, limit=2)
+            left = await main.ocean_collection.find({"next_transition_at": {"$lt": now}}).to_list(length=None)
+            return advanced, left
+
+        advanced, left = asyncio.run(scenario())
+        self.assertEqual(advanced, 2)
+        self.assertEqual([doc["report_id"] for doc in left], ["recent"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import asyncio
+import random
+import unittest
+from datetime import timedelta
+
+from database import get_client
+from memory.retention import STOP_THRESHOLD, TRANSITION_THRESHOLD, time_to_threshold
+from scheduler import DegradationScheduler, FakeClock
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+
+    async def __call__(self, event):
+        self.events.append(event)
+
+
+class TestDegradationScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.recorder = Recorder()
+        self.scheduler = DegradationScheduler(self.recorder, clock=self.clock)
+
+    def test_event_sequence_for_one_npc(self):
+        self.scheduler.track("npc", 1.0, self.clock.now())
+        asyncio.run(self.scheduler.run(stop_when_idle=True))
+
+        summary = [(e["kind"], e.get("threshold"), e["game_day"]) for e in self.recorder.events]
+        self.assertEqual(summary, [
+            ("day", None, 1),
+            ("threshold", TRANSITION_THRESHOLD, time_to_threshold(1.0, TRANSITION_THRESHOLD)),
+            ("day", None, 2),
+            ("threshold", STOP_THRESHOLD, time_to_threshold(1.0, STOP_THRESHOLD)),
+        ])
+        self.assertEqual(self.scheduler.metrics()["tracked_npcs"], 0)
+        self.assertEqual(self.scheduler.metrics()["max_lag_seconds"], 0)
+
+    def test_thousands_of_npcs_fire_in_order(self):
+        rng = random.Random(7)
+        start = self.clock.now()
+        for i in range(2000):
+            offset = timedelta(seconds=rng.uniform(0, 10))
+            self.scheduler.track(f"npc-{i}", rng.uniform(0.5, 1.5), start - offset)
+        self.assertEqual(self.scheduler.metrics()["queue_depth"], 2000)
+
+        asyncio.run(self.scheduler.run(stop_when_idle=True))
+
+        fired_at = [e["scheduled_at"] for e in self.recorder.events]
+        self.assertEqual(fired_at, sorted(fired_at))
+        stops = [e for e in self.recorder.events if e.get("threshold") == STOP_THRESHOLD]
+        self.assertEqual(len(stops), 2000)
+        self.assertEqual(self.scheduler.metrics()["queue_depth"], 0)
+
+    def test_lag_is_measured_against_schedule(self):
+        self.scheduler.track("npc", 1.0, self.clock.now())
+        self.clock.advance(60 + 30)  # day 1 boundary was 30s ago
+        fired = asyncio.run(self.scheduler.run_pending())
+        self.assertEqual(fired, 1)
+        self.assertAlmostEqual(self.scheduler.metrics()["last_lag_seconds"], 30.0, places=3)
+
+    def test_untrack_drops_pending_events(self):
+        self.scheduler.track("npc", 1.0, self.clock.now())
+        self.scheduler.untrack("npc")
+        asyncio.run(self.scheduler.run(stop_when_idle=True))
+        self.assertEqual(self.recorder.events, [])
+        self.assertEqual(self.scheduler._versions, {})
+
+    def test_retrack_after_untrack_ignores_old_entries(self):
+        self.scheduler.track("npc", 1.0, self.clock.now())
+        self.scheduler.untrack("npc")
+        self.scheduler.track("npc", 1.0, self.clock.now())
+        self.clock.advance(60)
+        self.assertEqual(asyncio.run(self.scheduler.run_pending()), 1)
+
+    def test_load_tracks_latest_document_per_report(self):
+        collection = get_client("memory://")["bigfive"]["ocean_scores"]
+        now = self.clock.now()
+
+        async def scenario():
+            await collection.insert_many([
+                {"report_id": "a", "p_factor": 0.5, "saved_at": (now - timedelta(hours=1)).isoformat()},
+                {"report_id": "a", "p_factor": 1.5, "saved_at": now.isoformat()},
+                {"report_id": "b", "p_factor": 1.0, "saved_at": now.isoformat()},
+            ])
+            return await self.scheduler.load(collection)
+
+        self.assertEqual(asyncio.run(scenario()), 2)
+        self.assertEqual(self.scheduler._npcs["a"]["p_factor"], 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
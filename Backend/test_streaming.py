@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+import unittest
+from unittest import mock
+
+os.environ.setdefault("MONGO_URL", "memory://")
+
+from starlette.requests import Request
+
+import main
+from memory.retention import calculate_retention
+from scheduler import DegradationScheduler, FakeClock
+from streaming import RetentionBroadcaster, event_stream
+from timeutil import utcnow
+
+
+class TestRetentionBroadcaster(unittest.TestCase):
+    def test_one_publish_fans_out_to_every_subscriber(self):
+        broadcaster = RetentionBroadcaster()
+        first = broadcaster.subscribe(["a", "b"])
+        second = broadcaster.subscribe(["a"])
+        other = broadcaster.subscribe(["c"])
+
+        delivered = broadcaster.publish("a", "day", {"retention_val": 0.5})
+
+        self.assertEqual(delivered, 2)
+        self.assertEqual(first.queue.get_nowait(), ("day", {"retention_val": 0.5}))
+        self.assertEqual(second.queue.get_nowait(), ("day", {"retention_val": 0.5}))
+        self.assertTrue(other.queue.empty())
+
+    def test_slow_subscriber_drops_oldest(self):
+        broadcaster = RetentionBroadcaster(max_queue=2)
+        subscription = broadcaster.subscribe(["a"])
+        for day in range(4):
+            broadcaster.publish("a", "day", {"game_day": day})
+
+        self.assertEqual(subscription.dropped, 2)
+        self.assertEqual(subscription.queue.get_nowait()[1]["game_day"], 2)
+
+    def test_stream_sends_snapshot_then_events_and_unsubscribes(self):
+        broadcaster = RetentionBroadcaster()
+        disconnected = []
+
+        async def is_disconnected():
+            return bool(disconnected)
+
+        async def scenario():
+            stream = event_stream(broadcaster, ["a"], [{"report_id": "a"}], is_disconnected)
+            self.assertFalse(broadcaster.has_subscribers("a"))
+            chunks = [await stream.__anext__()]
+            broadcaster.publish("a", "threshold", {"threshold": 0.4})
+            chunks.append(await stream.__anext__())
+            disconnected.append(True)
+            await stream.aclose()
+            return chunks
+
+        snapshot, tick = asyncio.run(scenario())
+        self.assertTrue(snapshot.startswith("event: snapshot\n"))
+        self.assertEqual(json.loads(tick.split("data: ")[1]), {"threshold": 0.4})
+        self.assertFalse(broadcaster.has_subscribers("a"))
+
+
+class TestStreamRoute(unittest.TestCase):
+    def setUp(self):
+        asyncio.run(main.ocean_collection.delete_many({}))
+        self.scheduler = main.degradation_scheduler
+        self.addCleanup(setattr, self.scheduler, "_running", False)
+        # Fresh ticker per test: a virtual clock, and no task left over from another event loop
+        self.ticker = DegradationScheduler(main.publish_stream_tick, clock=FakeClock(utcnow()))
+        for patcher in (mock.patch.object(main, "stream_ticker", self.ticker),
+                        mock.patch.object(main, "_stream_ticker_task", None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def open_stream(self, report_ids):
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+        request = Request({"type": "http", "method": "GET", "path": "/api/stream/retention", "headers": []}, receive)
+        return main.stream_retention(request, report_ids)
+
+    def test_streams_hold_npcs_on_a_running_scheduler(self):
+        self.scheduler._running = True
+
+        async def scenario():
+            await main.ocean_collection.insert_one({"report_id": "a", "p_factor": 1.0, "saved_at": utcnow()})
+            first = (await self.open_stream("a")).body_iterator
+            second = (await self.open_stream("a")).body_iterator
+            await first.__anext__()
+            await second.__anext__()
+            tracked = [self.scheduler.tracking("a")]
+            await first.aclose()
+            tracked.append(self.scheduler.tracking("a"))
+            await second.aclose()
+            tracked.append(self.scheduler.tracking("a"))
+            return tracked
+
+        # Tracked while either stream is open, dropped after the last one closes
+        self.assertEqual(asyncio.run(scenario()), [True, True, False])
+        self.assertEqual(main._stream_holds, {})
+
+    def test_default_config_streams_ticks_without_the_scheduler(self):
+        # DEGRADATION_SCHEDULER is off by default: the stream ticker drives the events
+        self.assertFalse(self.scheduler.running)
+
+        async def scenario():
+            await main.ocean_collection.insert_one({"report_id": "b", "p_factor": 1.0, "saved_at": self.ticker.clock.now()})
+            stream = (await self.open_stream("b")).body_iterator
+            snapshot = await stream.__anext__()
+            tick = await asyncio.wait_for(stream.__anext__(), 60)
+            tracked = [self.scheduler.tracking("b")]
+            await stream.aclose()
+            tracked.append(self.ticker.tracking("b"))
+            return snapshot, tick, tracked
+
+        snapshot, tick, tracked = asyncio.run(scenario())
+        self.assertTrue(snapshot.startswith("event: snapshot\n"))
+        self.assertTrue(tick.startswith("event: day\n"))
+        data = json.loads(tick.split("data: ")[1])
+        retention_val, phase, _ = calculate_retention(1.0, days=1)
+        self.assertEqual((data["game_day"], data["retention_val"], data["phase"]), (1, retention_val, phase))
+        self.assertIn("confidence_label", data)
+        self.assertIsNone(data["response"])
+        # Never put on the LLM scheduler; off the ticker once the stream closes
+        self.assertEqual(tracked, [False, False])
+        self.assertEqual(main._stream_holds, {})
+
+    def test_unstarted_stream_holds_nothing(self):
+        async def scenario():
+            await main.ocean_collection.insert_one({"report_id": "d", "p_factor": 1.0, "saved_at": utcnow()})
+            # Client gone before the body starts: the generator never runs
+            await self.open_stream("d")
+            return self.ticker.tracking("d"), main.retention_broadcaster.has_subscribers("d")
+
+        self.assertEqual(asyncio.run(scenario()), (False, False))
+        self.assertEqual(main._stream_holds, {})
+
+    def test_closing_a_stream_keeps_npcs_tracked_elsewhere(self):
+        self.scheduler._running = True
+
+        async def scenario():
+            await main.ocean_collection.insert_one({"report_id": "c", "p_factor": 1.0, "saved_at": utcnow()})
+            self.scheduler.track("c", 1.0, utcnow())  # e.g. by save-ocean-scores
+            stream = (await self.open_stream("c")).body_iterator
+            await stream.__anext__()
+            await stream.aclose()
+            return self.scheduler.tracking("c")
+
+        self.assertTrue(asyncio.run(scenario()))
+        self.scheduler.untrack("c")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from database import get_client
+from migrate_timestamps import migrate
+from pagination import SORT, decode_cursor, encode_cursor
+from timeutil import parse_timestamp
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestParseTimestamp(unittest.TestCase):
+    def test_accepts_dates_and_legacy_strings(self):
+        moment = datetime(2026, 1, 31, 8, 3, 22, tzinfo=timezone.utc)
+        self.assertEqual(parse_timestamp(moment), moment)
+        self.assertEqual(parse_timestamp(moment.replace(tzinfo=None)), moment)
+        self.assertEqual(parse_timestamp("2026-01-31T08:03:22Z"), moment)
+        self.assertEqual(parse_timestamp("2026-01-31T10:03:22+02:00"), moment)
+        self.assertEqual(parse_timestamp("2026-01-31T08:03:22", naive_is_local=False), moment)
+        self.assertIsNone(parse_timestamp(None))
+
+    def test_naive_strings_are_local_time(self):
+        local = datetime(2026, 1, 31, 8, 3, 22)
+        self.assertEqual(parse_timestamp(local.isoformat()), local.astimezone(timezone.utc))
+
+
+class TestMigration(unittest.TestCase):
+    def setUp(self):
+        self.db = get_client("memory://")["bigfive"]
+
+    def test_strings_become_utc_dates_and_rerun_is_a_no_op(self):
+        migrated = datetime(2026, 2, 1, tzinfo=timezone.utc)
+        run(self.db["ocean_scores"].insert_many([
+            {"report_id": "a", "saved_at": "2026-01-01T00:00:00", "generation_timestamp": "2026-01-01T00:00:05"},
+            {"report_id": "b", "saved_at": migrated},
+            {"report_id": "c", "saved_at": "not a date"},
+        ]))
+        run(self.db["tasks"].insert_one({"report_id": "a", "created_at": "2026-01-01T00:00:00Z"}))
+
+        self.assertEqual(run(migrate(self.db, dry_run=True))["ocean_scores.saved_at"], (1, 1))
+        self.assertIsInstance(run(self.db["ocean_scores"].find_one({"report_id": "a"}))["saved_at"], str)
+
+        report = run(migrate(self.db, naive_is_local=False))
+        self.assertEqual(report["ocean_scores.saved_at"], (1, 1))
+        self.assertEqual(report["tasks.created_at"], (1, 0))
+
+        a = run(self.db["ocean_scores"].find_one({"report_id": "a"}))
+        self.assertEqual(a["saved_at"], datetime(2026, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual(a["generation_timestamp"], datetime(2026, 1, 1, 0, 0, 5, tzinfo=timezone.utc))
+        task = run(self.db["tasks"].find_one({"report_id": "a"}))
+        self.assertEqual(task["created_at"], datetime(2026, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual(run(self.db["ocean_scores"].find_one({"report_id": "b"}))["saved_at"], migrated)
+
+        self.assertEqual(run(migrate(self.db))["ocean_scores.saved_at"], (0, 1))
+
+
+class TestMixedPagination(unittest.TestCase):
+    def test_pages_walk_dates_then_legacy_strings(self):
+        collection = get_client("memory://")["bigfive"]["ocean_scores"]
+        start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        run(collection.insert_many(
+            [{"_id": ObjectId(), "saved_at": start + timedelta(minutes=i)} for i in range(3)]
+            + [{"_id": ObjectId(), "saved_at": f"2026-01-0{i + 1}T00:00:00"} for i in range(3)]
+        ))
+
+        seen = []
+        query = {}
+        while True:
+            page = run(collection.find(query, sort=SORT, limit=2).to_list(length=None))
+            if not page:
+                break
+            seen.extend(doc["saved_at"] for doc in page)
+            query = decode_cursor(encode_cursor(page[-1]))
+
+        self.assertEqual(len(seen), 6)
+        self.assertTrue(all(isinstance(value, datetime) for value in seen[:3]))
+        self.assertEqual(seen[3:], ["2026-01-03T00:00:00", "2026-01-02T00:00:00", "2026-01-01T00:00:00"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+"""
+UTC timestamp helpers.
+
+Timestamps are stored as native BSON dates in UTC (saved_at, created_at,
+generation_timestamp, ...). The Mongo client is opened with tz_aware=True,
+so reads come back as aware UTC datetimes.
+
+Documents written before the migration hold ISO strings from
+`datetime.now().isoformat()`, which is naive server-local time. Until
+migrate_timestamps.py has run, every read goes through parse_timestamp(),
+which accepts either form.
+"""
+
+from datetime import datetime, timezone
+
+UTC = timezone.utc
+
+
+def utcnow():
+    return datetime.now(UTC)
+
+
+def parse_timestamp(value, naive_is_local=True):
+    """
+    Aware UTC datetime from a stored timestamp (BSON date or legacy ISO
+    string), or None.
+
+    Naive datetimes are UTC (that is what BSON dates are). Naive strings are
+    legacy server-local time unless `naive_is_local` is False.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=UTC) if value.tzinfo is None else value.astimezone(UTC)
+    text = value.strip()
+    if text.endswith(("Z", "z")):
+        text = text[:-1] + "+00:00"
+    parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is None:
+        # astimezone() on a naive value reads it as local time
+        return parsed.astimezone(UTC) if naive_is_local else parsed.replace(tzinfo=UTC)
+    return parsed.astimezone(UTC)